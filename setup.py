@@ -19,10 +19,12 @@ setup(
         'scikit-learn>=1.3',
         'tqdm>=4.65',
         ],
+    extras_require={
+        'profile': ['pyinstrument'],
+    },
     entry_points={
         'console_scripts': [
-            'generate_Ecurves=src.scripts.E_curves:main',
-            'evaluate_model=src.scripts.model_eval:main'
+            'transonic=src.transonic.main:interface'
         ],
     },
     classifiers=[
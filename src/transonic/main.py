@@ -1,41 +1,121 @@
-import pandas as pd
+import os
 import os.path as path
 import sys
-import PyQt5
+import numpy as np
+import pandas as pd
 
-from PyQt5 import QtCore, QtGui, uic, QtWidgets
-from PyQt5.QtWidgets import QApplication
-from tqdm import tqdm
-from src.transonic.scripts.E_curves import *
-from src.transonic.modules.system_class import System
+# Only what the headless CLI needs is imported here: Qt is imported by 
+# gui_main and matplotlib by the plot stage (see plotter.new_figure)
+from src.transonic.scripts.E_curves import generate_curves
 from src.transonic.modules.utilities import (
     parse_args, 
     solve, 
     load_config, 
     get_model_class, 
     load_DOE, 
-    create_results_folder
+    create_results_folder,
+    resolve_workers,
+    config_overrides
+)
+from src.transonic.modules.batch import run_batch
+from src.transonic.modules.plotter import plot_jobs, render_plots
+from src.transonic.modules.profiling import run_profile, activate, stage
+from src.transonic.modules.model_registry import get_spec, model_names
+from src.transonic.modules.surrogate import (
+    Surrogate,
+    SURROGATE_FILE,
+    train_surrogate
 )
-from src.transonic.scripts.model_eval import *
-from src.transonic.scripts.gui import MainWindow
 
-def interface() -> int:
+def interface(argv=None) -> int:
 
-    args = parse_args()
+    args = parse_args(argv)
     if args.gui:
-        if hasattr(QtCore.Qt, 'AA_EnableHighDpiScaling'):
-            PyQt5.QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_EnableHighDpiScaling, True)
-
-        if hasattr(QtCore.Qt, 'AA_UseHighDpiPixmaps'):
-            PyQt5.QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_UseHighDpiPixmaps, True)
         print("GUI mode engaged.")
         gui_main()
+    elif args.command == 'run':
+        run_batch(args.configs, workers=args.workers, 
+                  use_cache=not args.no_cache, 
+                  rebuild_curves=args.rebuild_curves, output=args.output,
+                  overrides=config_overrides(args))
+    elif args.command == 'plot':
+        jobs = [job for results_dir in args.results_dirs 
+                for job in plot_jobs(results_dir, args.plots, args.dpi, 
+                                     args.format)]
+        render_plots(jobs, resolve_workers({}, args.workers))
+    elif args.command == 'models':
+        list_models()
+    elif args.command == 'surrogate':
+        surrogate_main(args)
     else:
         print("CLI mode engaged.")
-        cli_main()
+        cli_main(config_path=args.config, workers=args.workers, 
+                 rebuild_curves=args.rebuild_curves, 
+                 use_cache=not args.no_cache, overrides=config_overrides(args))
     return 0
 
+def list_models() -> None:
+    '''
+    Prints the registered models and their declared metadata.
+    '''
+
+    for name in model_names():
+        spec = get_spec(name)
+        features = [feature for feature, supported in 
+                    [('vectorized', spec.vectorized), 
+                     ('gradients', spec.gradients)] if supported]
+        print(f"{name}: {spec.description}\n"
+              f"    parameters: {spec.parameters}\n"
+              f"    bounds: {spec.bounds}\n"
+              f"    supports: {', '.join(features) or '-'}")
+
+
+def surrogate_main(args) -> None:
+    '''
+    Trains a surrogate on a solved config, or predicts the parameters (and
+    optionally the E(t) curves) of DOE rows with a trained one.
+    '''
+
+    if args.surrogate_command == 'train':
+        config = load_config(args.config)
+        results_dir = create_results_folder(config['wd'])
+        summary = pd.read_csv(args.summary or 
+                              path.join(results_dir, 'eval_outputs.csv'),
+                              index_col=0)
+        surrogate = train_surrogate(load_DOE(config['doe']), summary, config,
+                                    args.method)
+        output = args.output or path.join(results_dir, SURROGATE_FILE)
+        surrogate.save(output)
+        print(f"Surrogate of {surrogate.model} trained on "
+              f"{surrogate.n_cases} case(s) written to {output}")
+        return
+
+    surrogate = Surrogate.load(args.surrogate)
+    doe = load_DOE(args.doe)
+    params, std = surrogate.predict(doe, return_std=True)
+    params.join(std.add_suffix('_std')).to_csv(args.output)
+    print(f"Parameters of {len(doe)} case(s) written to {args.output}")
+    if args.curves:
+        curves = surrogate.predict_curves(doe, get_spec(surrogate.model).load())
+        np.savez(args.curves, cases=np.array(list(curves), dtype=np.int64),
+                 **{f'{key}_{id}': array for id, (time, Et) in curves.items()
+                    for key, array in (('time', time), ('Et', Et))})
+        print(f"E(t) curves written to {args.curves}")
+
+
 def gui_main() -> int:
+    # Qt is only needed for the GUI, so headless runs work without it
+    import PyQt5
+    from PyQt5 import QtCore
+    from PyQt5.QtWidgets import QApplication
+    from src.transonic.scripts.gui import MainWindow
+
+    if hasattr(QtCore.Qt, 'AA_EnableHighDpiScaling'):
+        PyQt5.QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_EnableHighDpiScaling, True)
+
+    if hasattr(QtCore.Qt, 'AA_UseHighDpiPixmaps'):
+        PyQt5.QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_UseHighDpiPixmaps, True)
+
     app = QApplication(sys.argv)
     mainWindow = MainWindow()
     mainWindow.show()
@@ -43,22 +123,36 @@ def gui_main() -> int:
     return 0
 
 
-def cli_main() -> int:
+def cli_main(config_path=None, workers=None, rebuild_curves=False, 
+             use_cache=True, overrides=None) -> int:
     
-    config_path = input("Please provide the directory of the config file.\n\t~")
+    if config_path is None:
+        config_path = input("Please provide the directory of the config file.\n\t~")
     
     if os.path.exists(config_path) == False:
         print(f"Warning: No file found in the provided path: {config_path}")
     
     try: 
         config_data = load_config(config_path)
+        config_data.update(overrides or {})
         results_dir = create_results_folder(config_data['wd'])
     except FileNotFoundError:
         print(f"Error in finding config file.\n")
         pass
 
+    # A model comparison is solved as a batch of one run per model
+    if config_data.get('models'):
+        run_batch([config_path], workers=workers, use_cache=use_cache,
+                  rebuild_curves=rebuild_curves, overrides=overrides)
+        return 0
+
     # Generates the E curves and E_theta curves
-    generate_curves(config_data['wd'], config_data['input'], config_data['doe'])
+    profile = run_profile(config_data)
+    with activate(profile), stage('generate_curves'):
+        generate_curves(config_data['wd'], config_data['input'], 
+                        config_data['doe'],
+                        export_csv=config_data.get('export_csv', False),
+                        force=rebuild_curves)
 
     # Grabs the desired model class specified in config file
     model_class = get_model_class(config_data)
@@ -67,7 +161,8 @@ def cli_main() -> int:
     doe = load_DOE(config_data['doe'])
 
     # Solve for the given system
-    summary_df = solve(doe, config_data, results_dir, model_class)
+    summary_df = solve(doe, config_data, results_dir, model_class, 
+                       workers=workers, use_cache=use_cache, profile=profile)
     
     # Save results to specified results folder in config file
     summary_df.to_csv(path.join(results_dir, 'eval_outputs.csv'))
@@ -77,4 +172,5 @@ def cli_main() -> int:
 if __name__ == '__main__':
     return_code = interface()
     print(f'Return Code: {return_code}')
+    sys.exit(return_code)
 
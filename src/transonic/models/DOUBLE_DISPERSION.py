@@ -1,4 +1,4 @@
-from src.modules.model_class import Model
+from src.transonic.modules.model_class import Model
 import numpy as np
 
 
@@ -81,3 +81,23 @@ class DOUBLE_DISPERSION(Model):
         Sums the concentration profiles for flow path 1 and flow path 2.
         """
         return self.C_1(x, Pe1, tau1) + self.C_2(x, Pe2, tau2)
+
+    def path_gradient(self, t, C, Pe, tau):
+        """
+        Derivatives of one flow path's concentration, C, with respect to its
+        peclet number and spacetime, using dC/dp = C * dln(C)/dp.
+        """
+
+        theta = np.where(t==0, 1, t/tau)
+        dC_dPe = C * (1/(2*Pe) - (1 - theta)**2 / (4*theta))
+        dC_dtau = C / tau * (0.5 - Pe*(1 - theta**2) / (4*theta))
+        return dC_dPe, dC_dtau
+
+    def jacobian(self, x, Pe1, Pe2, tau1, tau2):
+        """
+        Analytic derivatives of function with respect to Pe1, Pe2, tau1, tau2.
+        """
+
+        dC1_dPe, dC1_dtau = self.path_gradient(x, self.C_1(x, Pe1, tau1), Pe1, tau1)
+        dC2_dPe, dC2_dtau = self.path_gradient(x, self.C_2(x, Pe2, tau2), Pe2, tau2)
+        return np.stack([dC1_dPe, dC2_dPe, dC1_dtau, dC2_dtau], axis=-1)
@@ -1,7 +1,7 @@
-from src.modules.model_class import Model
-from scipy.special import expi
+from src.transonic.modules.model_class import Model
+from src.transonic.modules.cstr_kernels import (cstr_outlet, cstr_gradient,
+                                                  lfr_outlet)
 import numpy as np
-from sklearn.metrics import mean_squared_error
 
 
 class LFR_CSTR_DZ_BYPASS(Model):
@@ -42,25 +42,9 @@ class LFR_CSTR_DZ_BYPASS(Model):
         """
 
         tau_LFR = (1-a)*self.tau
-        C_LFR1 = 0
-        C_LFR2 = (1-a)**2 * self.tau**2 * self.C0 * self.dt / 2 / t**3
-        C_PFR_out = np.where(t < (tau_LFR/2), C_LFR1, C_LFR2)
-        return C_PFR_out
+        coef = (1-a)**2 * self.tau**2 * self.C0 * self.dt / 2
+        return lfr_outlet(t, coef, tau_LFR/2)
     
-    def exp_term(self, t, m):
-        """
-        This is a necessary term for calculating the outlet of the CSTR
-        """
-
-        return np.exp(m*t)*(m*t + 1)/t**2
-
-    def expi_term(self, t, m):
-        """
-        This is a necessary term for calculating the outlet of the CSTR
-        """
-
-        return m**2 * expi(m*t)
-
     def C_CSTR(self, t, a, b, c):
         """
         Calculates the concentration leaving the CSTR for some time, t
@@ -77,16 +61,25 @@ class LFR_CSTR_DZ_BYPASS(Model):
         m = c / (a * b * self.tau)
         n = c * (1 - a)**2 * self.tau * self.dt * self.C0 / a / b
         tau_LFR = (1 - a)*self.tau
-        C_0 = 0
-        C_IC = n*0.5*(self.exp_term(tau_LFR/2, m) - self.expi_term(tau_LFR/2, m))
-        C_1 = (C_IC - 0.5*n*(self.exp_term(t, m) - self.expi_term(t, m)))/np.exp(m*t)
-        C_CSTR_out = np.where(t < tau_LFR/2, C_0, C_1)
-        return C_CSTR_out
+        return cstr_outlet(t, m, n, tau_LFR/2)
     
     def function(self, xdata, a, b, c):
         return c * self.C_CSTR(xdata, a, b, c) + (1 - c) * self.C_LFR(xdata, a)
 
-    def objective(self, params, xdata, ytrue):
-        a, b, c = params
-        y_predicted = self.function(xdata, a, b, c)
-        return mean_squared_error(ytrue, y_predicted)
\ No newline at end of file
+    def jacobian(self, xdata, a, b, c):
+        """
+        Analytic derivatives of function with respect to a, b and c.
+        """
+
+        m = c / (a * b * self.tau)
+        n = c * (1 - a)**2 * self.tau * self.dt * self.C0 / a / b
+        dK_dm, dK_dn, dK_dt0 = cstr_gradient(xdata, m, n, (1 - a)*self.tau/2)
+        K = n*dK_dn
+        L = self.C_LFR(xdata, a)
+
+        dK_da = -dK_dm*m/a - dK_dn*n*(2/(1 - a) + 1/a) - dK_dt0*self.tau/2
+        dK_db = -dK_dm*m/b - dK_dn*n/b
+        dK_dc = dK_dm*m/c + dK_dn*n/c
+        return np.stack([c*dK_da - (1 - c)*2*L/(1 - a),
+                         c*dK_db,
+                         K + c*dK_dc - L], axis=-1)
@@ -1,5 +1,6 @@
-from src.modules.model_class import Model
-from scipy.special import expi
+from src.transonic.modules.model_class import Model
+from src.transonic.modules.cstr_kernels import (cstr_outlet, cstr_gradient,
+                                                  lfr_outlet)
 import numpy as np
 
 
@@ -34,25 +35,9 @@ class LFR_CSTR_PFR_PARALLEL(Model):
     def C_PFR(self, t, a, b, c):
         tau_LFR = (1-a)*self.tau
         tau_PFR = a * (1 - b) * self.tau / (1 - c)
-        C_PFR1 = 0
-        C_PFR2 = (1-a)**2 * self.tau**2 * self.C0 * self.dt / 2 / (t - tau_PFR)**3
-        C_PFR_out = np.where(t < (tau_LFR/2 + tau_PFR), C_PFR1, C_PFR2)
-        return C_PFR_out
+        coef = (1-a)**2 * self.tau**2 * self.C0 * self.dt / 2
+        return lfr_outlet(t, coef, tau_LFR/2 + tau_PFR, lag=tau_PFR)
     
-    def exp_term(self, t, m):
-        """
-        This is a necessary term for calculating the outlet of the CSTR
-        """
-
-        return np.exp(m*t)*(m*t + 1)/t**2
-
-    def expi_term(self, t, m):
-        """
-        This is a necessary term for calculating the outlet of the CSTR
-        """
-
-        return m**2 * expi(m*t)
-
     def C_CSTR(self, t, a, b, c):
         """
         Calculates the concentration leaving the CSTR for some time, t
@@ -69,11 +54,32 @@ class LFR_CSTR_PFR_PARALLEL(Model):
         m = c / (a * b * self.tau)
         n = c * (1 - a)**2 * self.tau * self.dt * self.C0 / a / b
         tau_LFR = (1 - a)*self.tau
-        C_0 = 0
-        C_IC = n*0.5*(self.exp_term(tau_LFR/2, m) - self.expi_term(tau_LFR/2, m))
-        C_1 = (C_IC - 0.5*n*(self.exp_term(t, m) - self.expi_term(t, m)))/np.exp(m*t)
-        C_CSTR_out = np.where(t < tau_LFR/2, C_0, C_1)
-        return C_CSTR_out
+        return cstr_outlet(t, m, n, tau_LFR/2)
     
     def function(self, x, a, b, c):
         return c * self.C_CSTR(x, a, b, c) + (1 - c) * self.C_PFR(x, a, b, c)
+
+    def jacobian(self, x, a, b, c):
+        """
+        Analytic derivatives of function with respect to a, b and c.
+        """
+
+        m = c / (a * b * self.tau)
+        n = c * (1 - a)**2 * self.tau * self.dt * self.C0 / a / b
+        dK_dm, dK_dn, dK_dt0 = cstr_gradient(x, m, n, (1 - a)*self.tau/2)
+        K = n*dK_dn
+
+        # The PFR branch depends on the parameters through its lag, tau_PFR
+        P = self.C_PFR(x, a, b, c)
+        tau_PFR = a * (1 - b) * self.tau / (1 - c)
+        dP_dlag = np.where(P == 0, 0, 3*P/(x - tau_PFR))
+
+        dK_da = -dK_dm*m/a - dK_dn*n*(2/(1 - a) + 1/a) - dK_dt0*self.tau/2
+        dK_db = -dK_dm*m/b - dK_dn*n/b
+        dK_dc = dK_dm*m/c + dK_dn*n/c
+        dP_da = -2*P/(1 - a) + dP_dlag*tau_PFR/a
+        dP_db = -dP_dlag*a*self.tau/(1 - c)
+        dP_dc = dP_dlag*tau_PFR/(1 - c)
+        return np.stack([c*dK_da + (1 - c)*dP_da,
+                         c*dK_db + (1 - c)*dP_db,
+                         K + c*dK_dc - P + (1 - c)*dP_dc], axis=-1)
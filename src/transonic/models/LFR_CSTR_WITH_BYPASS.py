@@ -1,5 +1,6 @@
-from src.modules.model_class import Model
-from scipy.special import expi
+from src.transonic.modules.model_class import Model
+from src.transonic.modules.cstr_kernels import (cstr_outlet, cstr_gradient,
+                                                  lfr_outlet)
 import numpy as np
 
 
@@ -14,9 +15,10 @@ class LFR_CSTR_WITH_BYPASS(Model):
     - dt : the amount of time during which the tracer was injected (CFD sim dt)
     - tau : the spacetime of the reactor defined by volume / flow rate
     - bounds : the bounds for the model parameters which are optimized for
+    - C0 : accepted for a common constructor with the other models, unused
     """
 
-    def __init__(self, dt, tau, bounds=None, initial_guess=None):
+    def __init__(self, dt, tau, bounds=None, initial_guess=None, C0=1):
         """
         Initializes the model 
 
@@ -43,20 +45,6 @@ class LFR_CSTR_WITH_BYPASS(Model):
 
         return (1-beta)**2 * self.tau**2 * self.dt / 2 / t**3
 
-    def exp_term(self, t, a):
-        """
-        This is a necessary term for calculating the outlet of the CSTR
-        """
-
-        return np.exp(a*t)*(a*t + 1)/t**2
-
-    def expi_term(self, t, a):
-        """
-        This is a necessary term for calculating the outlet of the CSTR
-        """
-
-        return a**2 * expi(a*t)
-
     def C2_func(self, t, alpha, beta):
         """
         Calculates the concentration leaving the CSTR for some time, t
@@ -66,16 +54,15 @@ class LFR_CSTR_WITH_BYPASS(Model):
         - beta : the fraction of the system volume that is described by the CSTR
 
         Returns:
-        - The concentration leaving the CSTR at time t
+        - The concentration leaving the CSTR at time t, zero before the
+          first tracer leaves the LFR
 
         """
 
         a = alpha / beta / self.tau
         b = alpha * (1-beta)**2 * self.dt * self.tau / 2 / beta
         tau1 = (1-beta)*self.tau
-        C_0 = b*0.5*(self.exp_term(tau1/2, a) - self.expi_term(tau1/2, a))
-        C2 = (C_0 - 0.5*b*(self.exp_term(t, a) - self.expi_term(t, a)))/np.exp(a*t)
-        return C2
+        return cstr_outlet(t, a, b, tau1/2)
     
     def Cout_func(self, t_range, alpha, beta):
         """
@@ -84,13 +71,30 @@ class LFR_CSTR_WITH_BYPASS(Model):
         """
 
         condition = (1-beta)*self.tau/2
-        Cout = np.where(t_range < condition, 
-                        0, 
-                        (1-alpha)*self.C1_func(t_range, beta) + \
-                        alpha*self.C2_func(t_range, alpha, beta))
-        return Cout
+        coef = (1-beta)**2 * self.tau**2 * self.dt / 2
+        return (1-alpha)*lfr_outlet(t_range, coef, condition) + \
+            alpha*self.C2_func(t_range, alpha, beta)
     
     def function(self, x, a, b):
         self.params = [a, b]
         return self.Cout_func(x, a, b)
 
+    def jacobian(self, x, a, b):
+        """
+        Analytic derivatives of function with respect to alpha (a) and beta (b).
+        """
+
+        x = np.asarray(x, dtype=float)
+        m = a / b / self.tau
+        n = a * (1-b)**2 * self.dt * self.tau / 2 / b
+        t0 = (1-b)*self.tau/2
+        dC2_dm, dC2_dn, dC2_dt0 = cstr_gradient(x, m, n, t0)
+        C1 = self.C1_func(x, b)
+        C2 = n*dC2_dn
+
+        dC_da = -C1 + C2 + dC2_dm*m + dC2_dn*n
+        dC_db = -(1-a)*2*C1/(1-b) + \
+            a*(-dC2_dm*m/b - dC2_dn*n*(2/(1-b) + 1/b) - dC2_dt0*self.tau/2)
+        return np.where(x[..., np.newaxis] < t0, 0, 
+                        np.stack([dC_da, dC_db], axis=-1))
+
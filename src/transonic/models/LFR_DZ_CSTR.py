@@ -1,7 +1,6 @@
 from src.transonic.modules.model_class import Model
-from scipy.special import expi
+from src.transonic.modules.cstr_kernels import cstr_outlet, cstr_gradient
 import numpy as np
-from sklearn.metrics import mean_squared_error
 
 
 class LFR_DZ_CSTR(Model):
@@ -40,20 +39,6 @@ class LFR_DZ_CSTR(Model):
         self.C0 = C0
     
 
-    def exp_term(self, t, m):
-        """
-        This is a necessary term for calculating the outlet of the CSTR
-        """
-
-        return np.exp(m*t)*(m*t + 1)/t**2
-
-    def expi_term(self, t, m):
-        """
-        This is a necessary term for calculating the outlet of the CSTR
-        """
-
-        return m**2 * expi(m*t)
-
     def outlet_concentration(self, t, a, b):
         """
         Calculates the concentration leaving the CSTR for some time, t
@@ -72,34 +57,28 @@ class LFR_DZ_CSTR(Model):
 
         m = 1 / tau_CSTR
         n = tau_LFR**2 * self.C0 * self.dt / 2 / tau_CSTR
-        C_0 = 0
-        C_IC = n*0.5*(self.exp_term(tau_LFR/2, m) - self.expi_term(tau_LFR/2, m))
-        C_1 = (C_IC - 0.5*n*(self.exp_term(t, m) - self.expi_term(t, m)))/np.exp(m*t)
-        C_CSTR_out = np.where(t < tau_LFR/2, C_0, C_1)
-        return C_CSTR_out
+        return cstr_outlet(t, m, n, tau_LFR/2)
     
     def function(self, xdata, a, b):
         return self.outlet_concentration(xdata, a, b)
 
-    def objective(self, params, xdata, ytrue):
-        '''
-        This was the first deployment of the objective function method in a 
-        model class. 
+    def jacobian(self, xdata, a, b):
+        """
+        Analytic derivatives of function with respect to a and b, found by 
+        chaining cstr_gradient through m = 1/tau_CSTR, 
+        n = tau_LFR**2*C0*dt/2/tau_CSTR and t0 = tau_LFR/2.
+        """
 
-        Parameters: 
-        - params : a tuple containing the model parameters a and b
-        - xdata : the time series to predict over
-        - ytrue : the CFD RTD data
+        m = 1 / (b*self.tau)
+        n = (a*self.tau)**2 * self.C0 * self.dt / 2 / (b*self.tau)
+        dC_dm, dC_dn, dC_dt0 = cstr_gradient(xdata, m, n, a*self.tau/2)
+        return np.stack([dC_dn*2*n/a + dC_dt0*self.tau/2,
+                         -dC_dm*m/b - dC_dn*n/b], axis=-1)
 
-        Returns:
-        - np.float : the mean squared error term plus a penalty constraint
+    def penalty(self, a, b):
+        '''
+        Penalty term to ensure that sum of a and b is never greater than 1. 
+        Written with np.where so it also applies to whole populations.
         '''
 
-        a, b = params
-        penalty = 0
-
-        # Penalty term to ensure that sum of a and b is never greater than 1 
-        if a + b > 1:
-            penalty = 1000 * (a + b - 1)**2
-        y_predicted = self.function(xdata, a, b)
-        return mean_squared_error(ytrue, y_predicted) + penalty
+        return np.where(a + b > 1, 1000 * (a + b - 1)**2, 0)
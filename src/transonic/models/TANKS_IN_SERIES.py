@@ -1,8 +1,6 @@
 from src.transonic.modules.model_class import Model
-from scipy.special import expi
+from scipy.special import expi, gamma, digamma
 import numpy as np
-from sklearn.metrics import mean_squared_error
-import math
 
 
 class TANKS_IN_SERIES(Model):
@@ -48,7 +46,7 @@ class TANKS_IN_SERIES(Model):
         """
 
         tau_i = self.tau / n       
-        return self.dt * self.C0 * (t**(n-1) / (math.gamma(n-1) * tau_i**(n))) * (np.exp(-t/tau_i))
+        return self.dt * self.C0 * (t**(n-1) / (gamma(n-1) * tau_i**(n))) * (np.exp(-t/tau_i))
 
     
     def function(self, t, n):
@@ -57,11 +55,13 @@ class TANKS_IN_SERIES(Model):
         """
         return self.C_1(t, n) 
 
-    def objective(self, params, tdata, ytrue):
-
-        n = params
-
-        
-        y_predicted = self.function(tdata, n)
+    def jacobian(self, t, n):
+        """
+        Analytic derivative of function with respect to n, using 
+        dC/dn = C * dln(C)/dn.
+        """
 
-        return mean_squared_error(ytrue, y_predicted)
\ No newline at end of file
+        C = self.C_1(t, n)
+        log_t = np.log(np.where(t > 0, t, 1))
+        dln_dn = log_t - digamma(n-1) - np.log(self.tau / n) + 1 - t/self.tau
+        return np.where(t > 0, C * dln_dn, 0)[..., np.newaxis]
@@ -1,6 +1,5 @@
 from src.transonic.modules.model_class import Model
 import numpy as np
-from sklearn.metrics import mean_squared_error
 
 
 class TAYLOR_DISPERSION(Model):
@@ -60,11 +59,14 @@ class TAYLOR_DISPERSION(Model):
         return self.C(x, Pe, tau) 
 
 
-    def objective(self, params, tdata, ytrue):
-
-        Pe, tau = params
-
-        
-        y_predicted = self.function(tdata, Pe, tau)
+    def jacobian(self, x, Pe, tau):
+        """
+        Analytic derivatives of function with respect to Pe and tau, using
+        dC/dp = C * dln(C)/dp.
+        """
 
-        return mean_squared_error(ytrue, y_predicted)
+        C = self.C(x, Pe, tau)
+        theta = np.where(x==0, 1, x/tau)
+        dC_dPe = C * (1/(2*Pe) - (1 - theta)**2 / (4*theta))
+        dC_dtau = C / tau * (0.5 - Pe*(1 - theta**2) / (4*theta))
+        return np.stack([dC_dPe, dC_dtau], axis=-1)
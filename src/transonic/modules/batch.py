@@ -0,0 +1,201 @@
+import glob
+import os
+import os.path as path
+import pandas as pd
+from src.transonic.modules.utilities import (
+    load_config,
+    check_model,
+    load_DOE,
+    get_model_class,
+    create_results_folder,
+    SolveRun,
+    solve_runs
+)
+from src.transonic.scripts.E_curves import generate_curves
+from src.transonic.modules.profiling import run_profile, activate, stage
+from src.transonic.scripts.model_eval import summary_columns
+from src.transonic.modules.uncertainty import interval_columns
+from src.transonic.modules.comparison import (
+    expand_models,
+    compare_models,
+    best_models,
+    curve_lengths
+)
+
+
+def expand_config_paths(patterns: list) -> list:
+    '''
+    Expands glob patterns to config file paths, keeping the order in which the
+    patterns were given and dropping duplicates.
+
+    Raises:
+    - FileNotFoundError if a pattern matches no file
+    '''
+
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        matches = [match for match in matches if path.isfile(match)]
+        if not matches:
+            raise FileNotFoundError(f"No config file matches {pattern}")
+        paths += [match for match in matches if match not in paths]
+    return paths
+
+
+def expand_sweep(config_path: str) -> list:
+    '''
+    Loads a config file and expands its optional sweep entry. Every item of
+    sweep is a mapping of config entries (e.g. model, parameters and
+    parameter_bounds) that override the rest of the file for one run, plus an
+    optional name. Every run is checked against the model registry.
+
+    Returns:
+    - list : (run name, config) pairs, a single pair without a sweep
+    '''
+
+    config = load_config(config_path)
+    stem = path.splitext(path.basename(config_path))[0]
+    sweep = config.pop('sweep', None)
+    if not sweep:
+        return [(stem, config)]
+
+    runs = []
+    for i, entry in enumerate(sweep):
+        entry = dict(entry)
+        name = f"{stem}-{entry.pop('name', i)}"
+        runs.append((name, {**config, **entry}))
+    # Model comparisons are checked by expand_models
+    return [(name, run if run.get('models') else check_model(run)) 
+            for name, run in runs]
+
+
+def write_comparisons(runs: list, summaries: list, does: dict) -> None:
+    '''
+    Writes the tables of every model comparison of a batch to the results
+    folder of its working directory:
+    - <comparison>_comparison.csv : long-format summary with one row per 
+      (CASE_NUM, model), information criteria and the best model flag
+    - <comparison>_best_models.csv : the best model of every case
+
+    Parameters:
+    - runs : (run name, config) pairs of the batch
+    - summaries : the summary DataFrame of each run
+    - does : {doe path: loaded design of experiments}
+    '''
+
+    groups = {}
+    for (name, config), summary_df in zip(runs, summaries):
+        if config.get('comparison') is not None:
+            groups.setdefault(config['comparison'], []).append(
+                (name, config, summary_df))
+
+    for group, members in groups.items():
+        config = members[0][1]
+        labels = [name[len(group) + 1:] for name, _, _ in members]
+        criterion = config.get('criterion', 'aic')
+        comparison = compare_models(
+            {label: summary_df for label, (_, _, summary_df) 
+             in zip(labels, members)},
+            {label: member_config['parameters'] for label, (_, member_config, _) 
+             in zip(labels, members)},
+            curve_lengths(does[config['doe']], config),
+            criterion
+        )
+        best = best_models(comparison, criterion)
+
+        results_dir = create_results_folder(config['wd'])
+        comparison.to_csv(path.join(results_dir, f'{group}_comparison.csv'))
+        best.to_csv(path.join(results_dir, f'{group}_best_models.csv'))
+        print(f"Best model of {group} by {criterion.upper()}: " + ', '.join(
+            f"{label} {count} case(s)" 
+            for label, count in best.best_model.value_counts().items()))
+
+
+def run_batch(patterns: list, workers=None, use_cache=True,
+              rebuild_curves=False, output=None, overrides=None,
+              progress_callback=None, should_stop=None) -> pd.DataFrame:
+    '''
+    Solves several config files (and their sweeps) as one batch.
+
+    Parameters:
+    - patterns : config file paths or glob patterns
+    - workers : number of worker processes shared by all runs, see solve_runs
+    - use_cache : serve unchanged cases from the fit caches
+    - rebuild_curves : regenerate every curve even if it is up to date
+    - output : path the consolidated summary is written to, or None
+    - overrides : config entries applied to every run (e.g. from command line
+      options)
+    - progress_callback, should_stop : see solve_runs
+
+    Returns:
+    - pd.DataFrame : the summaries of every run indexed by (run, CASE_NUM),
+      with the model of each run in the 'model' column and the union of the
+      parameter columns of all models
+
+    Notes:
+    - Curves are generated once per distinct (input, doe) pair and every run
+      reading that data uses them from the same curve store.
+    - Every run still writes its own eval_outputs.csv. When several runs share
+      a working directory their results go to wd/results/<run name>.
+    - A config with a models entry is a model comparison, see 
+      write_comparisons.
+    '''
+
+    runs = [model_run for config_path in expand_config_paths(patterns)
+            for run in expand_sweep(config_path)
+            for model_run in expand_models(*run)]
+
+    names = [name for name, _ in runs]
+    duplicates = {name for name in names if names.count(name) > 1}
+    runs = [(f"{name}-{i}" if name in duplicates else name, 
+             {**config, **(overrides or {})})
+            for i, (name, config) in enumerate(runs)]
+    profiles = {name: run_profile(config) for name, config in runs}
+
+    # Curves only depend on the tracer files and the DOE
+    curve_wds, does = {}, {}
+    for name, config in runs:
+        source = (path.abspath(config['input']), path.abspath(config['doe']))
+        if source not in curve_wds:
+            curve_wds[source] = config['wd']
+            export_csv = any(c.get('export_csv', False) for _, c in runs
+                             if (path.abspath(c['input']),
+                                 path.abspath(c['doe'])) == source)
+            # Profiled as a stage of the first run reading the curves
+            with activate(profiles[name]), stage('generate_curves'):
+                generate_curves(config['wd'], config['input'], config['doe'],
+                                export_csv=export_csv, force=rebuild_curves)
+        config['curves_wd'] = curve_wds[source]
+        if config['doe'] not in does:
+            does[config['doe']] = load_DOE(config['doe'])
+
+    wd_counts = pd.Series([path.abspath(c['wd']) for _, c in runs]).value_counts()
+    solve_list = []
+    for name, config in runs:
+        results_dir = create_results_folder(config['wd'])
+        if wd_counts[path.abspath(config['wd'])] > 1:
+            results_dir = path.join(results_dir, name)
+            os.makedirs(results_dir, exist_ok=True)
+        solve_list.append(SolveRun(does[config['doe']], config, results_dir,
+                                   get_model_class(config), use_cache, 
+                                   profiles[name]))
+
+    summaries = solve_runs(solve_list, workers, progress_callback, should_stop)
+
+    for run, summary_df in zip(solve_list, summaries):
+        summary_df.to_csv(path.join(run.results_dir, 'eval_outputs.csv'))
+    write_comparisons(runs, summaries, does)
+
+    summary = pd.concat(
+        {name: summary_df.assign(model=config['model'])
+         for (name, config), summary_df in zip(runs, summaries)},
+        names=['run', 'CASE_NUM']
+    )
+    parameters = list(dict.fromkeys(name for _, config in runs 
+                                    for name in config['parameters']))
+    intervals = [c for c in interval_columns(parameters) if c in summary.columns]
+    summary = summary[['model', *summary_columns(parameters), *intervals]]
+    if output is not None:
+        summary.to_csv(output)
+        print(f"Consolidated summary of {len(runs)} run(s) written to {output}")
+    return summary
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+from src.transonic.modules.utilities import load_system, check_model
+from src.transonic.scripts.model_eval import SUMMARY_METRICS, FIT_DIAGNOSTICS
+
+
+CRITERIA = ('aic', 'bic')
+COMPARISON_COLUMNS = ['n_params', 'n_samples', 'rss', 'AIC', 'BIC', 'best']
+
+
+def expand_models(name: str, config: dict) -> list:
+    '''
+    Expands the optional models entry of a config into one run per model.
+    Every item is a mapping with the model, parameters and parameter_bounds
+    (and any other entry) that override the rest of the config, plus an
+    optional name (default the model) for models listed more than once. An
+    item naming another model than the config without parameters or
+    parameter_bounds uses the defaults of the model registry.
+
+    Parameters:
+    - name : name of the run the config belongs to
+    - config : the loaded config file
+
+    Returns:
+    - list : (run name, config) pairs. The runs of a comparison are named
+      <name>-<model> and carry a 'comparison' entry set to name, a single
+      pair without a models entry
+    '''
+
+    models = config.get('models')
+    if not models:
+        return [(name, config)]
+
+    config = {key: value for key, value in config.items() if key != 'models'}
+    defaults = {key: value for key, value in config.items()
+                if key not in ('parameters', 'parameter_bounds')}
+    runs, labels = [], []
+    for entry in models:
+        if not isinstance(entry, dict) or 'model' not in entry:
+            raise ValueError(f"Entries of models must be mappings with at "
+                             f"least a model, parameters and parameter_bounds, "
+                             f"got {entry!r}")
+        entry = dict(entry)
+        labels.append(entry.pop('name', entry['model']))
+        base = config if entry['model'] == config.get('model') else defaults
+        runs.append((f"{name}-{labels[-1]}",
+                     check_model({**base, **entry, 'comparison': name})))
+
+    if len(set(labels)) != len(labels):
+        raise ValueError(f"Models of {name} are listed more than once, give "
+                         f"them distinct name entries")
+    return runs
+
+
+def information_criteria(rss, n_samples, n_params) -> tuple:
+    '''
+    Akaike and Bayesian information criteria of least squares fits with
+    normally distributed errors.
+
+    Parameters:
+    - rss : residual sum of squares
+    - n_samples : number of fitted samples
+    - n_params : number of fitted parameters
+
+    Returns:
+    - tuple : (AIC, BIC), lower is better
+    '''
+
+    log_likelihood = n_samples * np.log(rss / n_samples)
+    return (log_likelihood + 2 * n_params,
+            log_likelihood + n_params * np.log(n_samples))
+
+
+def compare_models(summaries: dict, parameters: dict, n_samples: pd.Series,
+                   criterion='aic') -> pd.DataFrame:
+    '''
+    Builds the long-format summary of a model comparison.
+
+    Parameters:
+    - summaries : {model label: eval_outputs summary DataFrame of the model}
+    - parameters : {model label: list of its parameter names}
+    - n_samples : number of curve samples of each case, indexed by CASE_NUM
+    - criterion : 'aic' or 'bic', selects the best model of each case
+
+    Returns:
+    - pd.DataFrame : one row per (CASE_NUM, model) with the comparison
+      columns, the metrics, the fit diagnostics and the union of the
+      parameter columns of every model (NaN for other models' parameters)
+
+    Notes:
+    - The residual sum of squares is recovered from the mean and standard
+      deviation of the residuals over the full curve, which the summary holds.
+    '''
+
+    if criterion not in CRITERIA:
+        raise ValueError(f"Unknown criterion {criterion}, expected one of "
+                         f"{CRITERIA}")
+
+    long = pd.concat(summaries, names=['model', 'CASE_NUM'])
+    long = long.swaplevel().sort_index(level='CASE_NUM', sort_remaining=False)
+    models = long.index.get_level_values('model')
+    cases = long.index.get_level_values('CASE_NUM')
+
+    avg = long.avg_residual.astype(float)
+    std = long.std_of_residual.astype(float)
+    long['n_samples'] = n_samples.reindex(cases).to_numpy()
+    long['n_params'] = [len(parameters[model]) for model in models]
+    long['rss'] = long.n_samples * (std**2 + avg**2)
+    long['AIC'], long['BIC'] = information_criteria(long.rss, long.n_samples,
+                                                    long.n_params)
+
+    score = long[criterion.upper()]
+    best = score.groupby(level='CASE_NUM').transform('min')
+    long['best'] = score.notna() & (score == best)
+
+    parameter_columns = list(dict.fromkeys(
+        name for model in summaries for name in parameters[model]))
+    return long[[*COMPARISON_COLUMNS, *SUMMARY_METRICS, *FIT_DIAGNOSTICS,
+                 *parameter_columns]]
+
+
+def best_models(comparison: pd.DataFrame, criterion='aic') -> pd.DataFrame:
+    '''
+    Returns the best model of every case of a compare_models table, its
+    criterion and the margin to the runner-up (the larger, the clearer the
+    choice).
+    '''
+
+    column = criterion.upper()
+    rows = {}
+    for id, group in comparison[column].dropna().groupby(level='CASE_NUM'):
+        ranked = group.sort_values()
+        rows[id] = {'best_model': ranked.index[0][1],
+                    column: ranked.iloc[0],
+                    'margin': (ranked.iloc[1] - ranked.iloc[0]
+                               if len(ranked) > 1 else np.nan)}
+    best = pd.DataFrame.from_dict(rows, orient='index',
+                                  columns=['best_model', column, 'margin'])
+    best.index.name = 'CASE_NUM'
+    return best
+
+
+def curve_lengths(doe: pd.DataFrame, config: dict) -> pd.Series:
+    '''
+    Number of samples of the C curve of every case of a DOE.
+    '''
+
+    return pd.Series({id: len(load_system(id, doe, config).C)
+                      for id in doe.index}, name='n_samples')
@@ -0,0 +1,336 @@
+import numpy as np
+from scipy.special import expi
+
+
+'''
+Shared kernels for the models that chain a laminar flow reactor (LFR) into a
+CSTR (LFR_DZ_CSTR, LFR_CSTR_WITH_BYPASS, LFR_CSTR_DZ_BYPASS and
+LFR_CSTR_PFR_PARALLEL).
+
+The CSTR outlet of these models has the form
+
+    C(t) = 0.5*n*exp(-m*t)*(F(t0) - F(t)),  F(x) = exp(m*x)*(m*x + 1)/x**2
+                                                   - m**2*Ei(m*x)
+
+for t >= t0 and 0 before. Evaluated as written, exp(m*t) and Ei(m*t) overflow
+once m*t > ~709. Multiplying exp(-m*t) into F gives the scaled form
+
+    C(t) = 0.5*n*(exp(-m*(t - t0))*H(m*t0)/t0**2 - H(m*t)/t**2)
+
+with H(z) = z + 1 - z**2*exp(-z)*Ei(z), which only involves decaying
+exponentials. For large z, H is evaluated from the asymptotic series of
+exp(-z)*Ei(z) to avoid cancelling the leading terms and the overflow of Ei,
+and for moderate z from piecewise polynomials, which is an order of magnitude
+cheaper than expi (see scaled_expi_terms).
+'''
+
+# Above this argument the asymptotic series is used. Below it, the series
+# needs more terms than evaluating the interpolation table costs. The series
+# is truncated once its terms drop below ASYMPTOTIC_TOL, or after
+# ASYMPTOTIC_TERMS terms (it is most accurate when truncated near k = z)
+ASYMPTOTIC_THRESHOLD = 1024.0
+ASYMPTOTIC_TERMS = 40
+ASYMPTOTIC_TOL = 1e-17
+
+# From TABLE_MIN up to ASYMPTOTIC_THRESHOLD, H is interpolated instead of
+# calling expi: every octave [2**e, 2**(e + 1)) is split into TABLE_PIECES
+# pieces, each holding a degree TABLE_DEGREE polynomial that interpolates H at
+# Chebyshev nodes. TABLE_MIN and ASYMPTOTIC_THRESHOLD are powers of two, and
+# the table is built on first use
+TABLE_MIN = 2.0**-4
+TABLE_PIECES = 8
+TABLE_DEGREE = 11
+_H_TABLE = None
+EULER_GAMMA = np.longdouble('0.5772156649015328606065120900824024')
+
+
+def _series_terms(z_min):
+    '''
+    Number of terms of the asymptotic series of H needed for arguments of at
+    least z_min.
+    '''
+
+    term, n_terms = 1.0, 2
+    while n_terms < ASYMPTOTIC_TERMS and term > ASYMPTOTIC_TOL:
+        n_terms += 1
+        term *= n_terms / z_min
+    return n_terms
+
+
+def _asymptotic_H(z):
+    '''
+    Evaluates H(z) = -sum_{k>=2} k!/z**(k-1) with Horner's rule for z that are
+    all at least ASYMPTOTIC_THRESHOLD.
+
+    The number of terms needed falls as z grows (19 at z = 100, 12 at
+    z = 400), so the arguments are split into octaves, each summed to the
+    number of terms its smallest argument needs.
+    '''
+
+    H = np.empty_like(z)
+    lower, z_max = ASYMPTOTIC_THRESHOLD, z.max()
+    while lower <= z_max:
+        octave = (z >= lower) & (z < 2 * lower)
+        if octave.any():
+            zo = z[octave]
+            acc = np.ones_like(zo)
+            for k in range(_series_terms(lower), 2, -1):
+                acc *= k
+                acc /= zo
+                acc += 1
+            H[octave] = -2 * acc / zo
+        lower *= 2
+    return H
+
+
+def _extended_H(z):
+    '''
+    H(z) in extended precision, only used to build the interpolation table.
+    Below 64 it comes from the power series of Ei, whose terms are all
+    positive for z > 0, and from 64 on from the first 60 terms of the
+    asymptotic series, which are then accurate to ~1e-26.
+    '''
+
+    z = np.asarray(z, dtype=np.longdouble)
+    H = np.empty_like(z)
+    small = z < 64
+    zs = z[small]
+    term, series = np.ones_like(zs), np.zeros_like(zs)
+    for k in range(1, 200):
+        term *= zs / k
+        series += term / k
+    Ei = EULER_GAMMA + np.log(zs) + series
+    H[small] = zs + 1 - zs**2 * np.exp(-zs) * Ei
+
+    zl = z[~small]
+    acc = np.ones_like(zl)
+    for k in range(60, 2, -1):
+        acc *= k / zl
+        acc += 1
+    H[~small] = -2 * acc / zl
+    return H
+
+
+def _h_table():
+    # Monomial coefficients of every piece in its local coordinate u in
+    # [-1, 1], one row per degree, lowest degree first
+    global _H_TABLE
+    if _H_TABLE is None:
+        k = np.arange(TABLE_DEGREE + 1)
+        nodes = np.cos(np.pi * (k + 0.5) / (TABLE_DEGREE + 1))
+        octaves = np.ldexp(1.0, np.arange(np.frexp(TABLE_MIN)[1] - 1,
+                                          np.frexp(ASYMPTOTIC_THRESHOLD)[1]))
+        center = octaves[:, None] * (1 + (np.arange(TABLE_PIECES) + 0.5)
+                                     / TABLE_PIECES)
+        half_width = octaves[:, None] / (2 * TABLE_PIECES)
+        z = (center[..., None] + half_width[..., None] * nodes).reshape(
+            -1, TABLE_DEGREE + 1)
+        H = _extended_H(z).astype(float)
+        _H_TABLE = np.array([
+            np.polynomial.chebyshev.cheb2poly(
+                np.polynomial.chebyshev.chebfit(nodes, h, TABLE_DEGREE))
+            for h in H]).T.copy()
+    return _H_TABLE
+
+
+def _tabulated_H(z):
+    '''
+    Evaluates H(z) from the interpolation table for z in
+    [TABLE_MIN, ASYMPTOTIC_THRESHOLD).
+    '''
+
+    # z = mantissa*2**exponent with the mantissa in [0.5, 1) picks the octave,
+    # and the mantissa the piece and the local coordinate in it
+    mantissa, exponent = np.frexp(np.ravel(z))
+    u = mantissa * (2 * TABLE_PIECES) - TABLE_PIECES
+    piece = u.astype(np.intp)
+    u -= piece
+    u *= 2
+    u -= 1
+    piece += (exponent - np.frexp(TABLE_MIN)[1]) * TABLE_PIECES
+
+    # Horner's rule, gathering one coefficient per degree, which is cheaper
+    # than gathering whole rows of the table
+    table = _h_table()
+    H = table[TABLE_DEGREE].take(piece)
+    for i in range(TABLE_DEGREE - 1, -1, -1):
+        H *= u
+        H += table[i].take(piece)
+    return H.reshape(np.shape(z))
+
+
+def _expi_terms(z):
+    # J and H of scaled_expi_terms from expi, computed in place
+    J = np.asarray(expi(z))
+    J *= np.exp(-z)
+    J *= z
+    np.subtract(1, J, out=J)
+    H = z * J
+    H += 1
+    return J, H
+
+
+def scaled_expi_terms(z):
+    '''
+    Evaluates the two scaled exponential integral terms of the CSTR kernels,
+
+        J(z) = 1 - z*exp(-z)*Ei(z)         = -sum_{k>=1} k!/z**k
+        H(z) = z + 1 - z**2*exp(-z)*Ei(z)  = -sum_{k>=2} k!/z**(k-1)
+
+    which dominate the cost of the models. H = z*J + 1 comes from the
+    interpolation table between TABLE_MIN and ASYMPTOTIC_THRESHOLD, from its
+    asymptotic series above, where J and H cancel leading digits, and from
+    expi below.
+
+    Parameters:
+    - z : np.array of positive arguments
+
+    Returns:
+    - tuple : (J, H) as np.arrays shaped like z
+
+    Notes:
+    - The table agrees with the extended precision H to ~1e-15 and is ~10x
+      cheaper to evaluate than expi, whose form of H cancels ~log10(z) digits.
+    '''
+
+    z = np.asarray(z, dtype=float)
+    if z.size and TABLE_MIN <= z.min() and z.max() < ASYMPTOTIC_THRESHOLD:
+        H = _tabulated_H(z)
+        return (H - 1) / z, H
+
+    # NaN arguments fall through to expi
+    small = ~(z >= TABLE_MIN)
+    large = z >= ASYMPTOTIC_THRESHOLD
+    tabulated = ~(small | large)
+    H = np.empty(z.shape)
+    for mask, H_of in ((tabulated, _tabulated_H), (large, _asymptotic_H)):
+        if mask.any():
+            H[mask] = H_of(z[mask])
+    J = np.divide(H - 1, z, out=np.empty(z.shape))
+    if small.any():
+        J[small], H[small] = _expi_terms(z[small])
+    return J, H
+
+
+def _after_cutoff(t, t0, *params):
+    '''
+    Selects the samples of a kernel that is zero before the cut-off t0, so it
+    is only evaluated at or after t0. A sorted 1-D time sequence with scalar
+    parameters is sliced from t0 on, anything else is masked.
+
+    Returns:
+    - tuple : (out, index, t, t0, *params) with the zeroed kernel output, the
+      index of the selected samples in it, and t, t0 and params at them
+    '''
+
+    t = np.asarray(t, dtype=float)
+    t0, *params = (np.asarray(v, dtype=float) for v in (t0, *params))
+    out = np.zeros(np.broadcast_shapes(t.shape, t0.shape,
+                                       *(p.shape for p in params)))
+    if (out.shape == t.shape and t.ndim == 1 and np.all(t[1:] >= t[:-1])
+            and all(v.ndim == 0 for v in (t0, *params))):
+        index = slice(int(np.searchsorted(t, t0)), None)
+        return out, index, t[index], t0, *params
+    index = t >= t0
+    if index.shape != out.shape:
+        index = np.broadcast_to(index, out.shape)
+    return (out, index, *(np.broadcast_to(v, out.shape)[index]
+                          for v in (t, t0, *params)))
+
+
+def _population_rows(t, *params):
+    '''
+    Splits a population of parameter columns of shape (S, 1) against a 1-D
+    time sequence (or one of shape (1, T)) into the parameters of each row,
+    which kernels evaluate one by one so every row is sliced at its own
+    cut-off. Masking the whole population instead gathers and scatters every
+    sample and is several times slower.
+
+    Returns:
+    - tuple : (t, rows) with the 1-D time sequence and the parameters of each
+      row, or None when the parameters are not such a population
+    '''
+
+    t = np.asarray(t, dtype=float)
+    params = [np.asarray(p, dtype=float) for p in params]
+    if t.ndim == 2 and len(t) == 1:
+        t = t[0]
+    columns = [p for p in params if p.ndim]
+    if t.ndim != 1 or not columns or \
+            any(p.ndim != 2 or p.shape[1] != 1 for p in columns):
+        return None
+    shape = np.broadcast_shapes(*(p.shape for p in columns))
+    return t, list(zip(*(np.broadcast_to(p, shape)[:, 0] for p in params)))
+
+
+def cstr_outlet(t, m, n, t0):
+    '''
+    Concentration leaving the CSTR of an LFR -> CSTR chain.
+
+    Parameters:
+    - t : time sequence
+    - m : inverse CSTR spacetime (flow fraction / CSTR volume fraction / tau)
+    - n : scale of the LFR outlet entering the CSTR
+    - t0 : time the first tracer leaves the LFR (tau_LFR / 2)
+
+    Returns:
+    - np.array of the outlet concentration, zero for t < t0. Parameters may be
+      arrays that broadcast against t (e.g. a whole population).
+    '''
+
+    population = _population_rows(t, m, n, t0)
+    if population is not None:
+        t, rows = population
+        return np.array([cstr_outlet(t, *row) for row in rows])
+
+    m, n, t0 = (np.asarray(v, dtype=float) for v in (m, n, t0))
+    edge = 0.5 * n * scaled_expi_terms(m * t0)[1] / t0**2
+    C, index, t, t0, m, n, edge = _after_cutoff(t, t0, m, n, edge)
+
+    C[index] = edge * np.exp(-m * (t - t0)) - \
+        0.5 * n * scaled_expi_terms(m * t)[1] / t**2
+    return C
+
+
+def cstr_gradient(t, m, n, t0):
+    '''
+    Partial derivatives of cstr_outlet with respect to m, n and t0.
+
+    Returns:
+    - list of np.arrays [dC/dm, dC/dn, dC/dt0], zero for t < t0
+    '''
+
+    population = _population_rows(t, m, n, t0)
+    if population is not None:
+        t, rows = population
+        gradients = [cstr_gradient(t, *row) for row in rows]
+        return [np.array(d) for d in zip(*gradients)]
+
+    m, n, t0 = (np.asarray(v, dtype=float) for v in (m, n, t0))
+    J0, H0 = scaled_expi_terms(m * t0)
+    dC_dm, index, t, t0, m, n, J0, H0 = _after_cutoff(t, t0, m, n, J0, H0)
+    dC_dn, dC_dt0 = np.zeros_like(dC_dm), np.zeros_like(dC_dm)
+
+    J, H = scaled_expi_terms(m * t)
+    decay = np.exp(-m * (t - t0))
+    C_over_n = 0.5 * (decay * H0 / t0**2 - H / t**2)
+    dC_dm[index] = -t * n * C_over_n + n * (decay * J0 / t0 - J / t)
+    dC_dn[index] = C_over_n
+    dC_dt0[index] = -n * decay / t0**3
+    return [dC_dm, dC_dn, dC_dt0]
+
+
+def lfr_outlet(t, coef, t_start, lag=0):
+    '''
+    Concentration leaving a (possibly delayed) laminar flow reactor,
+    coef / (t - lag)**3 for t >= t_start and zero before.
+    '''
+
+    population = _population_rows(t, coef, t_start, lag)
+    if population is not None:
+        t, rows = population
+        return np.array([lfr_outlet(t, *row) for row in rows])
+
+    C, index, t, t_start, coef, lag = _after_cutoff(t, t_start, coef, lag)
+    C[index] = coef / (t - lag)**3
+    return C
@@ -0,0 +1,318 @@
+import numpy as np
+import pandas as pd
+import os
+import os.path as path
+import json
+import hashlib
+from src.transonic.modules.profiling import count_file
+
+
+# Column layout of each stored quantity. These match the columns of the legacy
+# C_curves, E_curves and Etheta_curves .csv files so System sees identical
+# DataFrames whichever source the curves come from.
+CURVE_COLUMNS = {'C': ('mass_fraction', 'time'),
+                 'Et': ('Et', 'time'),
+                 'Etheta': ('Et', 'time')}
+
+
+def curve_store_path(wd: str, curve_type: str, case_id) -> str:
+    '''
+    Returns the location of the binary file holding one curve of one case.
+
+    Parameters:
+    - wd : working directory of the run
+    - curve_type : one of 'C', 'Et', 'Etheta'
+    - case_id : case number in the DOE
+
+    Returns:
+    - str : path of the form wd/results/curve_store/<curve_type>/sim<ID>.npy
+    '''
+
+    if curve_type not in CURVE_COLUMNS:
+        raise ValueError(f"Invalid Curve Type: Expected one of: "
+                         f"{list(CURVE_COLUMNS.keys())}")
+
+    return path.join(wd, 'results', 'curve_store', curve_type,
+                     f"sim{case_id}.npy")
+
+
+def write_curve(wd: str, curve_type: str, case_id, curve: pd.DataFrame) -> str:
+    '''
+    Saves a curve to the binary curve store as a (T, 2) float64 .npy array.
+
+    Parameters:
+    - wd : working directory of the run
+    - curve_type : one of 'C', 'Et', 'Etheta'
+    - case_id : case number in the DOE
+    - curve : DataFrame or Curve holding the columns listed in CURVE_COLUMNS
+
+    Returns:
+    - str : path of the written file
+
+    Notes:
+    - The array is written to a temporary file and moved in place so readers
+      never map a partially written curve.
+    '''
+
+    dest = curve_store_path(wd, curve_type, case_id)
+    os.makedirs(path.dirname(dest), exist_ok=True)
+
+    data = np.column_stack([np.asarray(curve[name], dtype=np.float64) 
+                            for name in CURVE_COLUMNS[curve_type]])
+
+    tmp = f"{dest}.tmp.npy"
+    np.save(tmp, data)
+    os.replace(tmp, dest)
+    count_file('bytes_written', dest)
+    return dest
+
+
+def read_curve(wd: str, curve_type: str, case_id, mmap=True) -> pd.DataFrame:
+    '''
+    Opens a curve from the binary curve store.
+
+    Parameters:
+    - wd : working directory of the run
+    - curve_type : one of 'C', 'Et', 'Etheta'
+    - case_id : case number in the DOE
+    - mmap : if True the file is memory mapped read-only and the DataFrame is a
+      zero-copy view of it
+
+    Returns:
+    - pd.DataFrame : the curve with the columns listed in CURVE_COLUMNS
+    '''
+
+    file_path = curve_store_path(wd, curve_type, case_id)
+    data = np.load(file_path, mmap_mode='r' if mmap else None)
+    count_file('bytes_read', file_path)
+    return pd.DataFrame(data, columns=list(CURVE_COLUMNS[curve_type]),
+                        copy=False)
+
+
+class Curve:
+    """
+    A curve as named 1D NumPy columns, the lightweight alternative to a
+    DataFrame used by System. Columns are read as attributes or items, e.g.
+    curve.time or curve['mass_fraction'].
+
+    Attributes:
+    - columns : tuple of the column names
+    """
+
+    __slots__ = ('columns', '_data')
+
+    def __init__(self, **columns):
+        self.columns = tuple(columns)
+        self._data = {name: np.asarray(values) 
+                      for name, values in columns.items()}
+
+    def __getattr__(self, name):
+        # Only called for names that are not slots, i.e. the columns
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(f"Curve has no column {name!r}") from None
+
+    def __getitem__(self, name):
+        return self._data[name]
+
+    def __len__(self):
+        return len(self._data[self.columns[0]])
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self._data, columns=list(self.columns))
+
+
+def load_curve(wd: str, curve_type: str, case_id, dtype=None) -> Curve:
+    '''
+    Opens a curve from the binary curve store as a Curve.
+
+    Parameters:
+    - wd : working directory of the run
+    - curve_type : one of 'C', 'Et', 'Etheta'
+    - case_id : case number in the DOE
+    - dtype : None keeps the stored float64 values as read-only views of the
+      memory mapped file, np.float32 copies them at half the memory
+
+    Returns:
+    - Curve : with the columns listed in CURVE_COLUMNS
+    '''
+
+    file_path = curve_store_path(wd, curve_type, case_id)
+    data = np.load(file_path, mmap_mode='r')
+    count_file('bytes_read', file_path)
+    if dtype is not None:
+        data = data.astype(dtype)
+    return Curve(**{name: data[:, i] 
+                    for i, name in enumerate(CURVE_COLUMNS[curve_type])})
+
+
+def has_curve(wd: str, curve_type: str, case_id) -> bool:
+    '''
+    Checks whether a curve exists in the binary curve store.
+    '''
+
+    return path.exists(curve_store_path(wd, curve_type, case_id))
+
+
+# Bump whenever the way curves are derived changes so stale stores rebuild
+STORE_VERSION = 1
+
+# DOE columns the generated curves depend on
+MANIFEST_DOE_COLUMNS = ('TIMESTEP_SIZE', 'FLOW_RATE', 'ARTERIAL_VOLUME')
+
+
+def manifest_path(wd: str) -> str:
+    return path.join(wd, 'results', 'curve_store', 'manifest.json')
+
+
+def load_manifest(wd: str) -> dict:
+    '''
+    Loads the build manifest of the curve store. A missing, unreadable or 
+    outdated manifest gives an empty one so every case is rebuilt.
+
+    Returns:
+    - dict : {case number (str): manifest entry}
+    '''
+
+    try:
+        with open(manifest_path(wd), 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+    if manifest.get('version') != STORE_VERSION:
+        return {}
+    return manifest.get('cases', {})
+
+
+def save_manifest(wd: str, cases: dict) -> None:
+    dest = manifest_path(wd)
+    os.makedirs(path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'version': STORE_VERSION, 'cases': cases}, f, indent=1)
+    os.replace(tmp, dest)
+
+
+def file_digest(file_path: str) -> str:
+    '''
+    Returns the sha256 hex digest of a file's contents.
+    '''
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_entry(src_path: str, case_params, export_csv: bool) -> dict:
+    '''
+    Describes the inputs a case's curves were generated from.
+
+    Parameters:
+    - src_path : path of the tracer .out file
+    - case_params : the DOE row of the case
+    - export_csv : whether the .csv copies were written as well
+    '''
+
+    stat = os.stat(src_path)
+    return {'source': path.abspath(src_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_digest(src_path),
+            'doe': {col: float(case_params[col]) for col in MANIFEST_DOE_COLUMNS},
+            'csv': export_csv}
+
+
+def is_up_to_date(wd: str, case_id, entry: dict, src_path: str, case_params, 
+                  export_csv: bool) -> bool:
+    '''
+    Checks a manifest entry against the current inputs of a case. The source
+    is only re-hashed when its size or modification time changed, and a 
+    matching hash refreshes the stored modification time.
+
+    Parameters:
+    - wd : working directory of the run
+    - case_id : case number in the DOE
+    - entry : the manifest entry of the case, or None
+    - src_path : path of the tracer .out file
+    - case_params : the DOE row of the case
+    - export_csv : whether the .csv copies are required
+
+    Returns:
+    - bool : True if the stored curves can be reused
+    '''
+
+    if entry is None or (export_csv and not entry.get('csv')):
+        return False
+    if entry['source'] != path.abspath(src_path):
+        return False
+    if entry['doe'] != {col: float(case_params[col]) 
+                        for col in MANIFEST_DOE_COLUMNS}:
+        return False
+    if not all(has_curve(wd, curve_type, case_id) for curve_type in CURVE_COLUMNS):
+        return False
+
+    stat = os.stat(src_path)
+    if (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+        return True
+    if entry['size'] == stat.st_size and entry['sha256'] == file_digest(src_path):
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+    return False
+
+
+# Folders of the .csv curves written before the curve store existed, and by 
+# generate_curves(export_csv=True)
+LEGACY_FOLDERS = {'C': 'C_curves', 'Et': 'E_curves', 'Etheta': 'Etheta_curves'}
+
+
+def load_legacy_curve(wd: str, curve_type: str, case_id, dtype=None) -> Curve:
+    '''
+    Reads a curve from the legacy .csv files of a results folder.
+
+    Parameters:
+    - wd : working directory of the run
+    - curve_type : one of 'C', 'Et', 'Etheta'
+    - case_id : case number in the DOE
+    - dtype : None for float64 columns, or the NumPy dtype they are read as
+
+    Returns:
+    - Curve : with the columns listed in CURVE_COLUMNS
+
+    Raises:
+    - FileNotFoundError : if the .csv file does not exist either
+    '''
+
+    if curve_type not in LEGACY_FOLDERS:
+        raise ValueError(f"Invalid Curve Type: Expected one of: "
+                         f"{list(LEGACY_FOLDERS.keys())}")
+
+    curve_path = path.join(wd, 'results', LEGACY_FOLDERS[curve_type],
+                           f"sim{case_id}.csv")
+    if not path.exists(curve_path):
+        raise FileNotFoundError(
+            f"No {curve_type} curve of case {case_id} in {wd}: neither "
+            f"{curve_store_path(wd, curve_type, case_id)} nor {curve_path} "
+            f"exists. Run with --rebuild-curves to generate the curves.")
+    count_file('bytes_read', curve_path)
+
+    df = pd.read_csv(curve_path, header=0, index_col=0)
+    return Curve(**{name: df[name].to_numpy(dtype=dtype) 
+                    for name in CURVE_COLUMNS[curve_type]})
+
+
+def open_curve(wd: str, curve_type: str, case_id, dtype=None) -> Curve:
+    '''
+    Returns a curve from the binary curve store, falling back to the legacy 
+    .csv files for results folders generated before the store existed. See 
+    load_curve and load_legacy_curve.
+    '''
+
+    if has_curve(wd, curve_type, case_id):
+        return load_curve(wd, curve_type, case_id, dtype)
+    return load_legacy_curve(wd, curve_type, case_id, dtype)
@@ -0,0 +1,189 @@
+import numpy as np
+import os
+import os.path as path
+import json
+import hashlib
+import inspect
+import sys
+from importlib import import_module
+import time
+from src.transonic.modules.profiling import count_file
+
+
+# Package whose modules are hashed when they are imported by a model
+PACKAGE = 'src.transonic'
+# Modules that change fits without being imported by the model modules
+FIT_MODULES = ('src.transonic.modules.fit_grid',)
+
+
+def package_imports(modules: list) -> dict:
+    '''
+    Collects modules and the PACKAGE modules they import, directly or through
+    the functions and classes they import, recursively.
+
+    Returns:
+    - dict : {module name: module}
+    '''
+
+    found = {}
+    stack = list(modules)
+    while stack:
+        module = stack.pop()
+        if module is None or module.__name__ in found:
+            continue
+        found[module.__name__] = module
+        for value in vars(module).values():
+            name = (value.__name__ if inspect.ismodule(value) 
+                    else getattr(value, '__module__', None))
+            if (isinstance(name, str) and name.startswith(PACKAGE + '.') 
+                    and name not in found):
+                stack.append(sys.modules.get(name))
+    return found
+
+
+class FitCache:
+    """
+    Persistent on-disk cache of model fits. Model.fit is deterministic, so a
+    fit only has to be computed once for a given model implementation,
+    parameter bounds, optimizer settings and case data. Each entry is a small
+    .json file holding the fitted parameters, the fit metrics and the optimizer
+    diagnostics.
+
+    Attributes:
+    - cache_dir : folder holding one <key>.json file per cached fit
+    - max_entries : the number of most recently used entries kept by evict
+    - max_age_days : entries not used for longer than this are evicted
+    """
+
+    def __init__(self, results_dir, max_entries=10000, max_age_days=30):
+        self.cache_dir = path.join(results_dir, 'fit_cache')
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+
+
+    @staticmethod
+    def source_hash(model_class) -> str:
+        '''
+        Hashes the source of every module that defines the model class or one
+        of its bases, of every TRANSONIC module those import (e.g. the shared
+        CSTR kernels and the objective) and of FIT_MODULES, so editing any 
+        code a fit depends on invalidates its cached fits.
+        '''
+
+        modules = [inspect.getmodule(cls) for cls in model_class.__mro__[:-1]]
+        modules += [import_module(name) for name in FIT_MODULES]
+        digest = hashlib.sha256()
+        for name, module in sorted(package_imports(modules).items()):
+            digest.update(name.encode())
+            digest.update(inspect.getsource(module).encode())
+        return digest.hexdigest()
+
+    def key(self, model_instance, model_class, settings: dict, xdata, ytrue) -> str:
+        '''
+        Builds the cache key of a fit.
+
+        Parameters:
+        - model_instance : the unfitted model, which carries the bounds, the
+          initial guess and the case constants (dt, tau, C0)
+        - model_class : the class of the model
+        - settings : optimizer settings that change the outcome of the fit
+        - xdata : time sequence the model is fitted over
+        - ytrue : the ground truth data
+
+        Returns:
+        - str : sha256 hex digest identifying the fit
+        '''
+
+        description = {
+            'model': f"{model_class.__module__}.{model_class.__qualname__}",
+            'source': self.source_hash(model_class),
+            'bounds': np.asarray(model_instance.bounds, dtype=float).tolist(),
+            'settings': settings,
+            'initial_guess': (None if model_instance.initial_guess is None else
+                              np.asarray(model_instance.initial_guess, 
+                                         dtype=float).tolist()),
+            'constants': {name: float(getattr(model_instance, name))
+                          for name in ('dt', 'tau', 'C0')
+                          if hasattr(model_instance, name)},
+        }
+
+        digest = hashlib.sha256(json.dumps(description, sort_keys=True).encode())
+        digest.update(np.ascontiguousarray(xdata, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(ytrue, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str):
+        '''
+        Returns the cached entry for a key, or None on a cache miss. A hit
+        refreshes the entry's modification time, which drives eviction.
+        '''
+
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, 'r') as f:
+                entry = json.load(f)
+            os.utime(entry_path)
+            count_file('bytes_read', entry_path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry
+
+    def put(self, key: str, params, metrics, diagnostics: dict) -> None:
+        '''
+        Stores a fit in the cache.
+
+        Parameters:
+        - key : the cache key from FitCache.key
+        - params : the fitted model parameters
+        - metrics : list of fit metrics as returned by generate_model_summary
+        - diagnostics : optimizer diagnostics recorded by Model.fit
+        '''
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {'params': np.asarray(params, dtype=float).tolist(),
+                 'metrics': [float(metric) for metric in metrics],
+                 'diagnostics': diagnostics}
+
+        # Written to a temporary file first as several workers share the cache
+        tmp = f"{self.entry_path(key)}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, self.entry_path(key))
+        count_file('bytes_written', self.entry_path(key))
+
+    def evict(self) -> int:
+        '''
+        Removes entries unused for more than max_age_days and then the least
+        recently used entries beyond max_entries.
+
+        Returns:
+        - int : number of evicted entries
+        '''
+
+        if not path.isdir(self.cache_dir):
+            return 0
+
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.json'):
+                entry_path = path.join(self.cache_dir, filename)
+                entries.append((os.stat(entry_path).st_mtime, entry_path))
+        entries.sort(reverse=True)
+
+        expired = []
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            expired = [entry for entry in entries if entry[0] < cutoff]
+            entries = [entry for entry in entries if entry[0] >= cutoff]
+        if self.max_entries is not None:
+            expired += entries[self.max_entries:]
+
+        for _, entry_path in expired:
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+        return len(expired)
@@ -1,12 +1,113 @@
 import numpy as np 
-from scipy.optimize import curve_fit, differential_evolution
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import curve_fit, differential_evolution, least_squares
+from src.transonic.modules.objective import Objective
+
+FIT_STATUSES = ('converged', 'plateau', 'maxiter', 'budget', 'failed')
+
+
+class PlateauStop:
+    '''
+    differential_evolution callback that ends a run early.
+
+    Attributes:
+    - patience : number of generations the best objective may go without a
+      relative improvement larger than plateau_tol, None to never stop on a
+      plateau
+    - plateau_tol : relative improvement that resets the patience counter
+    - max_nfev : objective evaluations after which the run is stopped, or None
+    - count : callable returning the objective evaluations of the run so far,
+      or None to use scipy's count, which counts the calls of a vectorized
+      objective rather than the parameter vectors scored
+    - reason : 'plateau' or 'budget' once the run was stopped, else None
+    '''
+
+    def __init__(self, patience=None, plateau_tol=1e-6, max_nfev=None,
+                 count=None):
+        self.patience = patience
+        self.plateau_tol = plateau_tol
+        self.max_nfev = max_nfev
+        self.count = count
+        self.best = np.inf
+        self.stale = 0
+        self.reason = None
+
+    def __call__(self, intermediate_result):
+        fun = intermediate_result.fun
+        if fun < self.best - self.plateau_tol * abs(fun):
+            self.best, self.stale = fun, 0
+        else:
+            self.stale += 1
+
+        nfev = intermediate_result.nfev if self.count is None else self.count()
+        if self.max_nfev is not None and nfev >= self.max_nfev:
+            self.reason = 'budget'
+        elif self.patience is not None and self.stale >= self.patience:
+            self.reason = 'plateau'
+        return self.reason is not None
+
+
+def de_run(objective, bounds, seed, init='latinhypercube', max_nfev=None, 
+           polish=True, vectorized=False, popsize=15, maxiter=1000, tol=0.01,
+           patience=None, plateau_tol=1e-6) -> dict:
+    '''
+    A single differential evolution run of Model.fit. Module level so that 
+    multi-start runs can be handed to worker processes.
+
+    Parameters:
+    - objective : the Objective to minimize
+    - bounds : the model parameter bounds
+    - seed : random seed of the run
+    - init : 'latinhypercube' or an initial population
+    - max_nfev : evaluation budget of the run, or None
+    - remaining parameters : see Model.fit
+
+    Returns:
+    - dict : x, fun, nfev, nit, success, message and status, one of 
+      'converged' (the population met tol), 'plateau', 'budget' or 'maxiter'
+    '''
+
+    # Evaluations are counted by the objective, scipy counts the calls of a
+    # vectorized objective rather than the parameter vectors it scores
+    start_nfev = objective.nfev
+    count = lambda: objective.nfev - start_nfev
+    stop = None
+    if patience is not None or max_nfev is not None:
+        stop = PlateauStop(patience, plateau_tol, max_nfev, count)
+
+    if vectorized:
+        # Deferred updating is required by scipy for vectorized populations
+        result = differential_evolution(objective.batch, bounds, polish=polish,
+                                        seed=seed, init=init, popsize=popsize,
+                                        maxiter=maxiter, tol=tol, callback=stop,
+                                        vectorized=True, updating='deferred')
+    else:
+        result = differential_evolution(objective, bounds, polish=polish, 
+                                        seed=seed, init=init, popsize=popsize,
+                                        maxiter=maxiter, tol=tol, callback=stop)
+
+    if stop is not None and stop.reason is not None:
+        status = stop.reason
+    else:
+        status = 'converged' if result.success else 'maxiter'
+    return {'x': result.x,
+            'fun': float(result.fun),
+            'nfev': count(),
+            'nit': int(result.nit),
+            'success': bool(result.success),
+            'message': str(result.message),
+            'status': status}
+
 
 class Model:
     def __init__(self, initial_guess=None):
         self.initial_guess = initial_guess
 
 
-    def fit(self, xdata, ytrue, polish_bool=True):
+    def fit(self, xdata, ytrue, polish_bool=True, vectorized=False, method='de',
+            loss='mse', weights=None, popsize=15, maxiter=1000, tol=0.01, 
+            patience=None, plateau_tol=1e-6, starts=1, restarts=0, 
+            max_nfev=None, start_workers=1):
         '''
         A two-step optimization procedure where differential evolution is 
         applied first and then a polishing step with a gradient based method 
@@ -19,17 +120,286 @@ class Model:
             the ground truth data to fit the model to 
         - polish_bool : bool 
             Bool for whether or not to perform the gradient based optimization step
+        - vectorized : bool
+            Scores the differential evolution population with
+            Objective.batch instead of one parameter vector at a time. Only
+            faster on short time sequences such as fit grids, see
+            Objective.batch
+        - method : str
+            'de' (default) for differential evolution, 'lm' or 'trf' for a 
+            least squares fit from the initial guess using the analytic 
+            jacobian, or 'de+trf' for differential evolution followed by a 
+            'trf' least squares refinement in place of the polishing step
+        - loss : str
+            'mse' (default), 'mae', 'weighted' or 'log', see Objective. The
+            least squares methods support 'mse' and 'weighted' only
+        - weights : np.array
+            per point weights, required by the 'weighted' loss and optional
+            otherwise (e.g. the weights of a fit grid, see build_fit_grid)
+        - popsize, maxiter, tol : int, int, float
+            passed on to differential_evolution (scipy's defaults)
+        - patience : int
+            stop a differential evolution run once its best objective has not
+            improved by more than plateau_tol (relative) for this many 
+            generations. None (default) runs until tol or maxiter is met
+        - plateau_tol : float
+            relative improvement that counts as progress, see patience
+        - starts : int
+            number of independent differential evolution runs with different
+            seeds, the best of which is kept
+        - restarts : int
+            maximum number of extra runs from a fresh population when the best
+            run did not converge (it ended on a plateau or at maxiter). 
+            Restarting ends early once a restart fails to improve the best
+            objective by plateau_tol
+        - max_nfev : int
+            total objective evaluation budget of the fit, shared evenly by the
+            starts with the remainder left to the restarts. None is unlimited
+        - start_workers : int
+            worker processes the starts are run on. Only worth more than 1 
+            when the cases themselves are not already fitted in parallel
 
         Returns: 
         - Nothing, but sets model attribute "params" to optimally found parameters
+          and "diagnostics" to a summary of the optimizer run(s), including the
+          total evaluation count and the status of the best run (see de_run)
+
+        Notes:
+        - If the model has an initial_guess, the starting population of the
+          first start is seeded around it (see initial_population) instead of
+          a Latin hypercube.
+        - Start k uses seed 69 + k and restarts continue the sequence, so the 
+          defaults reproduce a single seeded differential evolution run.
         '''
-        
-        result = differential_evolution(self.objective, 
-                                        self.bounds, 
-                                        args=(xdata, ytrue),
-                                        polish=polish_bool,
-                                        seed=69)
+
+        if method not in ('de', 'lm', 'trf', 'de+trf'):
+            raise ValueError(f"Invalid fit method: {method}. Expected one of: "
+                             f"['de', 'lm', 'trf', 'de+trf']")
+
+        if method != 'de' and loss not in ('mse', 'weighted'):
+            raise ValueError(f"The {method} fit method only supports the 'mse' "
+                             f"and 'weighted' losses, not {loss}.")
+
+        if method in ('lm', 'trf'):
+            self.least_squares_fit(xdata, ytrue, self.starting_point(), method,
+                                   weights=weights)
+            return
+
+        objective = Objective(self, xdata, ytrue, loss=loss, weights=weights)
+        settings = {'polish': polish_bool and method == 'de', 
+                    'vectorized': vectorized, 'popsize': popsize, 
+                    'maxiter': maxiter, 'tol': tol, 'patience': patience, 
+                    'plateau_tol': plateau_tol}
+
+        inits = ['latinhypercube'] * starts
+        if self.initial_guess is not None:
+            inits[0] = self.initial_population(popsize)
+        seeds = [69 + k for k in range(starts)]
+        share = None if max_nfev is None else max(max_nfev // starts, 1)
+
+        if start_workers > 1 and starts > 1:
+            with ProcessPoolExecutor(max_workers=min(start_workers, starts)) as pool:
+                futures = [pool.submit(de_run, objective, self.bounds, seed, 
+                                       init, share, **settings)
+                           for seed, init in zip(seeds, inits)]
+                runs = [future.result() for future in futures]
+        else:
+            runs = [de_run(objective, self.bounds, seed, init, share, **settings)
+                    for seed, init in zip(seeds, inits)]
+        best = min(runs, key=lambda run: run['fun'])
+
+        n_restarts = 0
+        while (n_restarts < restarts and best['status'] in ('plateau', 'maxiter')
+               and (max_nfev is None or sum(r['nfev'] for r in runs) < max_nfev)):
+            budget = None
+            if max_nfev is not None:
+                budget = max_nfev - sum(r['nfev'] for r in runs)
+            run = de_run(objective, self.bounds, 69 + starts + n_restarts, 
+                         max_nfev=budget, **settings)
+            runs.append(run)
+            n_restarts += 1
+
+            improved = run['fun'] < best['fun'] - plateau_tol * abs(best['fun'])
+            if run['fun'] < best['fun']:
+                best = run
+            if not improved:
+                break
+
+        self.params = best['x']
+        self.diagnostics = {'nfev': sum(run['nfev'] for run in runs),
+                            'nit': sum(run['nit'] for run in runs),
+                            'success': best['success'],
+                            'fun': best['fun'],
+                            'message': best['message'],
+                            'status': best['status'],
+                            'starts': starts,
+                            'restarts': n_restarts}
+
+        if method == 'de+trf':
+            # The refinement replaces the diagnostics, the evaluation counts
+            # and the strategy of the differential evolution run are kept
+            de_diagnostics = self.diagnostics
+            self.least_squares_fit(xdata, ytrue, best['x'], 'trf', 
+                                   weights=weights)
+            self.diagnostics['nfev'] += de_diagnostics['nfev']
+            self.diagnostics['nit'] += de_diagnostics['nit']
+            self.diagnostics['starts'] = de_diagnostics['starts']
+            self.diagnostics['restarts'] = de_diagnostics['restarts']
+
+    def starting_point(self):
+        '''
+        Returns the initial guess (its first row if there are several) or the
+        middle of the bounds if the model has no initial guess.
+        '''
+
+        if self.initial_guess is not None:
+            return np.atleast_2d(np.asarray(self.initial_guess, dtype=float))[0]
+        return np.asarray(self.bounds, dtype=float).mean(axis=1)
+
+    def least_squares_fit(self, xdata, ytrue, x0, method='trf', weights=None):
+        '''
+        Gradient based fit with scipy.optimize.least_squares using the analytic
+        jacobian of the model.
+
+        Parameters:
+        - xdata : np.array
+            time sequence to fit over
+        - ytrue : np.array
+            the ground truth data to fit the model to 
+        - x0 : np.array
+            starting parameters
+        - method : str
+            'trf' respects the parameter bounds, 'lm' is unbounded
+        - weights : np.array
+            optional per point weights, which fit the 'weighted' loss instead
+            of the mean squared error
+
+        Notes:
+        - Minimizing the sum of squares is equivalent to minimizing the mean 
+          squared error of objective. A model penalty is appended as one extra
+          residual sqrt(N * penalty) whose derivative is taken numerically.
+        '''
+
+        loss = 'mse' if weights is None else 'weighted'
+        objective = Objective(self, xdata, ytrue, loss=loss, weights=weights)
+        t, y = objective.t, objective.y
+        has_penalty = type(self).penalty is not Model.penalty
+
+        # Weighted residuals are scaled to the magnitude of unweighted ones
+        scale = 1 if weights is None else np.sqrt(len(t)) * objective.scale
+
+        def residuals(p):
+            r = scale * (self.function(t, *p) - y)
+            if has_penalty:
+                r = np.append(r, np.sqrt(len(t) * self.penalty(*p)))
+            return r
+
+        def jacobian(p):
+            J = self.jacobian(t, *p)
+            if weights is not None:
+                J = scale[:, np.newaxis] * J
+            if has_penalty:
+                step = 1e-8 * np.maximum(np.abs(p), 1)
+                row = [(np.sqrt(len(t) * self.penalty(*(p + dp))) - 
+                        np.sqrt(len(t) * self.penalty(*(p - dp)))) / (2 * h)
+                       for h, dp in zip(step, np.diag(step))]
+                J = np.vstack([J, row])
+            return J
+
+        bounds = (-np.inf, np.inf)
+        if method != 'lm':
+            bounds = tuple(np.asarray(self.bounds, dtype=float).T)
+            x0 = np.clip(x0, *bounds)
+
+        result = least_squares(residuals, x0, jac=jacobian, bounds=bounds,
+                               method=method, x_scale='jac', ftol=1e-12, xtol=1e-12, gtol=1e-12)
         self.params = result.x
+        self.diagnostics = {'nfev': int(result.nfev),
+                            'nit': int(result.njev),
+                            'success': bool(result.success),
+                            'fun': float(2 * result.cost / len(t)),
+                            'message': str(result.message),
+                            'status': {0: 'maxiter', -1: 'failed'}.get(
+                                result.status, 'converged')}
+
+    def initial_population(self, popsize=15, jitter=0.02):
+        '''
+        Builds a differential evolution starting population around the 
+        initial guess. 
+
+        Parameters:
+        - popsize : population size multiplier, as in differential_evolution
+        - jitter : standard deviation of the perturbation added to each copy of
+          a guess, as a fraction of the width of the bounds
+
+        Returns:
+        - np.array of shape (popsize * n_params, n_params). The first rows are
+          the guesses themselves, the remaining rows cycle through the guesses
+          with Gaussian jitter and are clipped to the bounds.
+
+        Notes:
+        - initial_guess may be a single parameter vector or several of them 
+          (e.g. the fits of neighbouring cases), one per row.
+        '''
+
+        guesses = np.atleast_2d(np.asarray(self.initial_guess, dtype=float))
+        bounds = np.asarray(self.bounds, dtype=float)
+        lower, upper = bounds[:, 0], bounds[:, 1]
+        size = max(popsize * len(bounds), len(guesses), 5)
+
+        rng = np.random.default_rng(69)
+        population = guesses[np.arange(size) % len(guesses)]
+        noise = rng.normal(scale=jitter * (upper - lower), size=population.shape)
+        noise[:len(guesses)] = 0
+        return np.clip(population + noise, lower, upper)
+
+    def batch_function(self, xdata, population):
+        '''
+        Evaluates the model for a whole population of parameter vectors at once
+        by broadcasting the parameters against the time sequence.
+
+        Parameters:
+        - xdata : np.array
+            time sequence of length T
+        - population : np.array
+            parameter vectors of shape (n_params, S)
+
+        Returns:
+        - np.array of shape (S, T) with one predicted curve per parameter vector
+        '''
+
+        t = np.asarray(xdata, dtype=float)[np.newaxis, :]
+        population = np.asarray(population, dtype=float)
+        return self.function(t, *population[:, :, np.newaxis])
+
+    def batch_objective(self, population, xdata, ytrue):
+        '''
+        Vectorized counterpart of objective. Model.fit builds one Objective
+        per fit instead, this is a convenience for one-off evaluations.
+
+        Parameters:
+        - population : np.array
+            parameter vectors of shape (n_params, S), or a single vector of
+            shape (n_params,) during the polishing step
+        - xdata : np.array
+            time sequence to predict over
+        - ytrue : np.array
+            the ground truth data
+
+        Returns:
+        - np.array of shape (S,) with the mean squared error plus penalty of each
+          parameter vector (a float for a single vector)
+        '''
+
+        return Objective(self, xdata, ytrue).batch(population)
+
+    def penalty(self, *params):
+        '''
+        Soft constraint added to the objective. Subclasses override this with 
+        an expression that broadcasts over arrays of parameters.
+        '''
+        
+        return 0
 
 
     def scipy_curve_fit(self, xdata, ydata, bounds=None):
@@ -46,6 +416,27 @@ class Model:
     
     def function(self, x, *params):
         raise NotImplementedError("This method should be implemented by subclasses.")
+
+    def jacobian(self, x, *params):
+        '''
+        Analytic partial derivatives of function with respect to each model 
+        parameter, returned as an array of shape (len(x), n_params).
+        '''
+        raise NotImplementedError("This method should be implemented by subclasses.")
     
-    def objective(self, params, args):
-         raise NotImplementedError("This method should be implemented by subclasses.")
+    def objective(self, params, xdata, ytrue):
+        '''
+        Mean squared error of the model plus its penalty. Model.fit builds one
+        Objective per fit instead, this is a convenience for one-off 
+        evaluations.
+
+        Parameters: 
+        - params : the model parameters
+        - xdata : the time series to predict over
+        - ytrue : the CFD RTD data
+
+        Returns:
+        - float : the mean squared error plus the penalty
+        '''
+
+        return Objective(self, xdata, ytrue)(params)
@@ -0,0 +1,163 @@
+from importlib import import_module
+from importlib.metadata import entry_points
+
+# Registry of the models a config can name. Every model is described by a
+# ModelSpec holding its declared metadata, so listing models, filling in default
+# parameters and validating configs never imports a model module. The class of
+# a model is only imported once it is fitted.
+#
+# Models are registered in three ways:
+# - the built-in models of src/transonic/models, declared at the bottom of this
+#   module
+# - the register_model class decorator, for models defined in user code
+# - the 'transonic.models' entry point group of installed packages, whose
+#   entries point to a class decorated with register_model (or to a ModelSpec)
+#   and are only loaded when their name is looked up or every model is listed
+
+ENTRY_POINT_GROUP = 'transonic.models'
+
+
+class ModelSpec:
+    '''
+    Declared metadata of a model.
+
+    Attributes:
+    - name : name of the model in config files
+    - target : the model class, or its 'module:Class' path until it is loaded
+    - parameters : default parameter names, in the order of Model.function
+    - bounds : default [lower, upper] bounds of each parameter
+    - vectorized : whether function broadcasts over a population of parameter
+      vectors, which the vectorized config entry requires
+    - gradients : whether the model has an analytic jacobian, which the lm,
+      trf and de+trf fit methods require
+    - description : one line description of the model
+    '''
+
+    def __init__(self, name: str, target, parameters: list, bounds: list,
+                 vectorized=True, gradients=True, description=''):
+        if len(parameters) != len(bounds):
+            raise ValueError(f"Model {name} declares {len(parameters)} "
+                             f"parameters but {len(bounds)} bounds")
+        self.name = name
+        self.target = target
+        self.parameters = list(parameters)
+        self.bounds = [list(row) for row in bounds]
+        self.vectorized = vectorized
+        self.gradients = gradients
+        self.description = description
+
+    def load(self):
+        '''
+        Returns the model class, importing its module on first use.
+        '''
+
+        if isinstance(self.target, str):
+            module_name, _, class_name = self.target.partition(':')
+            self.target = getattr(import_module(module_name), class_name)
+        return self.target
+
+    def default_bounds(self) -> list:
+        '''
+        Returns a copy of the default bounds that may be modified freely.
+        '''
+
+        return [list(row) for row in self.bounds]
+
+
+MODELS = {}
+
+
+def register(spec: ModelSpec) -> ModelSpec:
+    '''
+    Adds a model to the registry, replacing any model of the same name.
+    '''
+
+    MODELS[spec.name] = spec
+    return spec
+
+
+def register_model(parameters: list, bounds: list, name=None, vectorized=True,
+                   gradients=True, description=''):
+    '''
+    Class decorator registering a Model subclass under its class name (or
+    name), e.g.
+
+        @register_model(['k'], [[0.1, 10]])
+        class MY_MODEL(Model):
+            ...
+
+    Parameters:
+    - See ModelSpec
+    '''
+
+    def decorator(model_class):
+        register(ModelSpec(name or model_class.__name__, model_class,
+                           parameters, bounds, vectorized, gradients,
+                           description))
+        return model_class
+    return decorator
+
+
+def load_plugin(entry_point) -> None:
+    '''
+    Loads a 'transonic.models' entry point, which registers its model.
+    '''
+
+    target = entry_point.load()
+    if isinstance(target, ModelSpec):
+        register(target)
+    elif entry_point.name not in MODELS:
+        raise ValueError(f"Entry point {entry_point.name} ({entry_point.value})"
+                         f" did not register a model, decorate its class with "
+                         f"register_model")
+
+
+def get_spec(name: str) -> ModelSpec:
+    '''
+    Returns the ModelSpec of a model, loading the entry point of that name if
+    it is not registered yet.
+    '''
+
+    if name not in MODELS:
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP, name=name):
+            load_plugin(entry_point)
+    if name not in MODELS:
+        raise ValueError(f"Unknown model {name}, expected one of "
+                         f"{model_names()}")
+    return MODELS[name]
+
+
+def model_names() -> list:
+    '''
+    Returns the names of every available model, loading all plugins.
+    '''
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        if entry_point.name not in MODELS:
+            load_plugin(entry_point)
+    return sorted(MODELS)
+
+
+def _builtin(name: str, parameters: list, bounds: list, description: str):
+    register(ModelSpec(name, f"src.transonic.models.{name}:{name}", parameters,
+                       bounds, description=description))
+
+
+_builtin('TANKS_IN_SERIES', ['n'], [[1, 50]],
+         'Series of n CSTRs')
+_builtin('TAYLOR_DISPERSION', ['Pe', 'tau'], [[0.1, 100], [0.001, 10]],
+         'Taylor dispersion superimposed on plug flow')
+_builtin('DOUBLE_DISPERSION', ['Pe1', 'Pe2', 'tau1', 'tau2'],
+         [[0.1, 100], [0.1, 100], [0.001, 10], [0.001, 10]],
+         'Two parallel Taylor dispersion flow paths')
+_builtin('LFR_DZ_CSTR', ['alpha', 'beta'], [[0.01, 0.99], [0.01, 0.99]],
+         'LFR and CSTR in series with a dead zone')
+_builtin('LFR_CSTR_DZ_BYPASS', ['alpha', 'beta', 'gamma'],
+         [[0.075, 0.95], [0.075, 0.95], [0.05, 0.95]],
+         'LFR and CSTR with a dead zone and a bypass')
+_builtin('LFR_CSTR_PFR_PARALLEL', ['alpha', 'beta', 'gamma'],
+         [[0, 1], [0, 1], [0, 1]],
+         'CSTR in parallel with a PFR after an LFR')
+_builtin('LFR_CSTR_WITH_BYPASS', ['alpha', 'beta'],
+         [[0.01, 0.99], [0.01, 0.99]],
+         'LFR followed by a CSTR with a bypass')
@@ -0,0 +1,168 @@
+import numpy as np
+
+
+# Loss functions understood by Objective
+LOSSES = ('mse', 'mae', 'weighted', 'log')
+# Populations are scored in chunks of at most this many predicted samples, so
+# the (chunk, T) prediction and residual stay in cache. Whole populations of
+# full-resolution curves are slower to score at once than one by one.
+BATCH_ELEMENTS = 2**15
+
+
+class Objective:
+    """
+    Loss of a model against one case's data, built once per fit and handed to
+    the optimizer. The data is converted to contiguous float64 arrays up front
+    and every evaluation works in preallocated residual buffers, so the
+    thousands of evaluations of a differential evolution run do no input
+    validation, conversion or temporary allocation beyond the model's own
+    prediction.
+
+    Attributes:
+    - model : the model instance whose function and penalty are scored
+    - t : the time sequence as a contiguous float64 array
+    - y : the ground truth data as a contiguous float64 array, or its log for
+      the 'log' loss
+    - loss : one of LOSSES
+        - 'mse' : mean squared error (the default)
+        - 'mae' : mean absolute error
+        - 'weighted' : weighted mean squared error, sum(w*r**2) / sum(w)
+        - 'log' : mean squared error of log(C + floor), which weighs the tail
+          of the curve as much as its peak
+      Given weights, every loss becomes the weighted mean of its pointwise
+      terms, so 'weighted' is 'mse' with mandatory weights.
+    - floor : offset added before taking logs, log_floor times the peak of
+      the data
+    - nfev : number of parameter vectors evaluated so far
+    """
+
+    def __init__(self, model, xdata, ytrue, loss='mse', weights=None,
+                 log_floor=1e-6):
+        '''
+        Parameters:
+        - model : the model instance to score
+        - xdata : time sequence to predict over
+        - ytrue : the ground truth data
+        - loss : one of LOSSES
+        - weights : per point weights, required by the 'weighted' loss and
+          optional for the others (e.g. the weights of a fit grid)
+        - log_floor : offset of the 'log' loss as a fraction of the data peak
+        '''
+
+        if loss not in LOSSES:
+            raise ValueError(f"Invalid loss: {loss}. Expected one of: "
+                             f"{list(LOSSES)}")
+
+        self.model = model
+        self.loss = loss
+        self.t = np.ascontiguousarray(xdata, dtype=np.float64)
+        self.y = np.ascontiguousarray(ytrue, dtype=np.float64)
+        if self.t.shape != self.y.shape or self.t.ndim != 1:
+            raise ValueError("xdata and ytrue must be 1D sequences of equal "
+                             "length.")
+
+        if loss == 'weighted' and weights is None:
+            raise ValueError("The 'weighted' loss requires weights.")
+
+        self.weights = None
+        self.scale = None
+        if weights is not None:
+            weights = np.ascontiguousarray(weights, dtype=np.float64)
+            if weights.shape != self.t.shape or np.any(weights < 0):
+                raise ValueError("weights must be non-negative and match "
+                                 "xdata in length.")
+            # Folding the normalization into the residual scale leaves a plain
+            # sum of squares per evaluation
+            self.weights = weights / weights.sum()
+            self.scale = np.sqrt(self.weights)
+
+        self.floor = log_floor * max(float(np.max(self.y, initial=0)),
+                                     np.finfo(float).tiny)
+        if loss == 'log':
+            self.y = np.log(np.maximum(self.y, 0) + self.floor)
+
+        self.nfev = 0
+        self._residual = np.empty_like(self.t)
+        self._batch_residual = None
+
+    def _reduce(self, prediction, residual):
+        '''
+        Turns predictions into losses along the last axis, using residual as
+        the work buffer.
+        '''
+
+        if self.loss == 'log':
+            np.maximum(prediction, 0, out=residual)
+            residual += self.floor
+            np.log(residual, out=residual)
+            residual -= self.y
+        else:
+            np.subtract(prediction, self.y, out=residual)
+
+        if self.loss == 'mae':
+            np.abs(residual, out=residual)
+            if self.weights is None:
+                return residual.mean(axis=-1)
+            return residual @ self.weights
+        if self.scale is not None:
+            residual *= self.scale
+            return np.einsum('...i,...i->...', residual, residual)
+        return np.einsum('...i,...i->...', residual, residual) / len(self.t)
+
+    def __call__(self, params, *args):
+        '''
+        Loss of a single parameter vector plus the model penalty. Extra
+        positional arguments are ignored so the object can stand in for
+        Model.objective.
+        '''
+
+        self.nfev += 1
+        loss = float(self._reduce(self.model.function(self.t, *params),
+                                  self._residual))
+        loss += float(self.model.penalty(*params))
+
+        # A NaN energy would stall the population, treat it as the worst score
+        return np.inf if np.isnan(loss) else loss
+
+    def batch(self, population, *args):
+        '''
+        Vectorized counterpart of __call__ for
+        differential_evolution(vectorized=True).
+
+        Parameters:
+        - population : np.array
+            parameter vectors of shape (n_params, S), or a single vector of
+            shape (n_params,) during the polishing step
+
+        Returns:
+        - np.array of shape (S,) with the loss plus penalty of each parameter
+          vector (a float for a single vector)
+
+        Notes:
+        - The population is evaluated in chunks of BATCH_ELEMENTS // T vectors
+          (at least one). On full-resolution curves that is one or two
+          vectors per chunk and the model evaluation dominates, so batching
+          only saves the per call overhead on short time sequences such as
+          fit grids.
+        '''
+
+        population = np.asarray(population, dtype=float)
+        if population.ndim == 1:
+            return self(population)
+
+        self.nfev += population.shape[1]
+        rows = min(max(BATCH_ELEMENTS // len(self.t), 1), population.shape[1])
+        if (self._batch_residual is None or
+                len(self._batch_residual) < rows):
+            self._batch_residual = np.empty((rows, len(self.t)))
+
+        loss = np.empty(population.shape[1])
+        for start in range(0, len(loss), rows):
+            chunk = population[:, start:start + rows]
+            loss[start:start + rows] = self._reduce(
+                self.model.batch_function(self.t, chunk),
+                self._batch_residual[:chunk.shape[1]])
+
+        loss += self.model.penalty(*population)
+        return np.where(np.isnan(loss), np.inf, loss)
+
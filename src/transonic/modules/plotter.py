@@ -1,8 +1,30 @@
-import matplotlib.pyplot as plt
+import math
+import time
+import os.path as path
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from src.transonic.modules.profiling import count_file
+from src.transonic.modules.curve_store import open_curve
 
-plt.rcParams['figure.dpi'] = 300
-plt.rcParams['figure.figsize'] = (8,6)
+PLOT_LEVELS = ('none', 'summary', 'all')
+PREDICTIONS_FILE = 'predictions.npz'
+FIGSIZE = (8, 6)
+
+
+def new_figure(figsize=FIGSIZE):
+    '''
+    Creates a matplotlib Figure attached to its own Agg canvas. Unlike pyplot
+    figures it shares no global state, so figures can be drawn from any
+    thread or worker process and need no closing.
+    '''
+
+    # matplotlib is only imported once something is drawn
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
 
 
 class Plotter:
@@ -18,14 +40,193 @@ class Plotter:
         self.plot_parser_dict = {'pred_vs_gt':self.pred_vs_gt}
         self.char_title = char_title
 
-    
-    def pred_vs_gt(self,filename='null.png'):
-        plt.plot(self.t, self.y_gt, label="Ground-Truth")
-        plt.plot(self.t, self.y_pred, label="Predicted")
-        plt.xlabel(f"Time ({self.time_unit})")
-        plt.ylabel(f"{self.y_label}")
+
+    def pred_vs_gt(self,filename='null.png', dpi=300):
+        figure = new_figure()
+        ax = figure.add_subplot()
+        ax.plot(self.t, self.y_gt, label="Ground-Truth")
+        ax.plot(self.t, self.y_pred, label="Predicted")
+        ax.set_xlabel(f"Time ({self.time_unit})")
+        ax.set_ylabel(f"{self.y_label}")
         if self.char_title:
-            plt.title(self.char_title)
-        plt.legend()
-        plt.savefig(filename)
+            ax.set_title(self.char_title)
+        ax.legend()
+        figure.savefig(filename, dpi=dpi)
         return 0
+
+
+def plot_settings(config: dict) -> dict:
+    '''
+    Reads the plot entries of a config file.
+
+    Returns:
+    - dict : {'plots': one of PLOT_LEVELS, 'dpi': int, 'fmt': file extension}
+
+    Notes:
+    - plots defaults to 'all'. The legacy list of plot names (e.g.
+      ['pred_vs_gt']) also means 'all', and false/null mean 'none'.
+    '''
+
+    plots = config.get('plots', 'all')
+    if isinstance(plots, (list, tuple)):
+        plots = 'all'
+    elif plots is None or plots is False:
+        plots = 'none'
+    if plots not in PLOT_LEVELS:
+        raise ValueError(f"Unknown plots setting {plots}, expected one of "
+                         f"{PLOT_LEVELS}")
+
+    return {'plots': plots,
+            'dpi': int(config.get('plot_dpi', 300)),
+            'fmt': str(config.get('plot_format', 'png')).lstrip('.')}
+
+
+def save_predictions(results_dir: str, predictions: dict, curves_wd: str) -> str:
+    '''
+    Stores the predicted curves the plot stage draws. The CFD curves are not
+    copied, load_predictions reads them back from the curve store.
+
+    Parameters:
+    - results_dir : folder the predictions file is written to
+    - predictions : {case number: (title, file stem, C_pred)}
+    - curves_wd : working directory holding the curve store of the cases
+
+    Returns:
+    - str : path of the predictions file
+    '''
+
+    cases = sorted(predictions)
+    arrays = {
+        'cases': np.array(cases, dtype=np.int64),
+        'titles': np.array([predictions[id][0] for id in cases], dtype=str),
+        'names': np.array([predictions[id][1] for id in cases], dtype=str),
+        'curves_wd': np.array(path.abspath(curves_wd)),
+    }
+    for id in cases:
+        arrays[f'C_pred_{id}'] = np.asarray(predictions[id][2], dtype=float)
+
+    file_path = path.join(results_dir, PREDICTIONS_FILE)
+    np.savez(file_path, **arrays)
+    count_file('bytes_written', file_path)
+    return file_path
+
+
+def load_predictions(results_dir: str) -> dict:
+    '''
+    Reads a predictions file written by save_predictions, with the time and
+    CFD curve of every case mapped from the curve store, or read from the 
+    legacy .csv curves of a results folder that has no store.
+
+    Returns:
+    - dict : {case number: (title, file stem, time, C, C_pred)}
+    '''
+
+    with np.load(path.join(results_dir, PREDICTIONS_FILE)) as data:
+        curves_wd = str(data['curves_wd'])
+        predictions = {}
+        for id, title, name in zip(data['cases'], data['titles'], 
+                                   data['names']):
+            C = open_curve(curves_wd, 'C', int(id))
+            predictions[int(id)] = (str(title), str(name), C.time, 
+                                    C.mass_fraction, data[f'C_pred_{id}'])
+        return predictions
+
+
+def plot_fit(file_path, title, time, C, C_pred, dpi=300):
+    '''
+    Draws the CFD and predicted curves of one case.
+    '''
+
+    figure = new_figure()
+    ax = figure.add_subplot()
+    ax.plot(time, C, label='CFD')
+    ax.plot(time, C_pred, label='Predicted', linestyle='--')
+    ax.set_title(title)
+    ax.legend()
+    ax.set_xlabel('Normalized Time')
+    ax.set_ylabel('Normalized E(t)')
+    figure.savefig(file_path, dpi=dpi)
+    return file_path
+
+
+def plot_summary(file_path, predictions: dict, dpi=300):
+    '''
+    Draws the fits of every case of a run as a grid of small panels.
+    '''
+
+    n_cols = math.ceil(math.sqrt(len(predictions)))
+    n_rows = math.ceil(len(predictions) / n_cols)
+    figure = new_figure((2.4 * n_cols, 1.8 * n_rows))
+    axes = figure.subplots(n_rows, n_cols, squeeze=False)
+    for ax, (title, name, time, C, C_pred) in zip(axes.flat,
+                                                  predictions.values()):
+        ax.plot(time, C, linewidth=0.8)
+        ax.plot(time, C_pred, linestyle='--', linewidth=0.8)
+        ax.set_title(name, fontsize=7)
+        ax.tick_params(labelsize=5)
+    for ax in axes.flat[len(predictions):]:
+        ax.set_axis_off()
+    figure.legend(['CFD', 'Predicted'], loc='upper right')
+    figure.tight_layout()
+    figure.savefig(file_path, dpi=dpi)
+    return file_path
+
+
+def plot_jobs(results_dir: str, plots='all', dpi=300, fmt='png') -> list:
+    '''
+    Lists the figures of a results folder for render_plots, reading the
+    stored predictions. 'summary' draws summary.<fmt> and 'all' adds one
+    figure per case.
+
+    Returns:
+    - list : (function, arguments) pairs, empty if there is nothing to draw
+    '''
+
+    if plots == 'none' or not path.exists(path.join(results_dir,
+                                                    PREDICTIONS_FILE)):
+        return []
+    predictions = load_predictions(results_dir)
+    if not predictions:
+        return []
+
+    jobs = [(plot_summary, (path.join(results_dir, f'summary.{fmt}'),
+                            predictions, dpi))]
+    if plots == 'all':
+        jobs += [(plot_fit, (path.join(results_dir, f'{name}.{fmt}'), title,
+                             time, C, C_pred, dpi))
+                 for title, name, time, C, C_pred in predictions.values()]
+    return jobs
+
+
+def timed_call(function, args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def render_plots(jobs: list, workers=1) -> list:
+    '''
+    Draws the figures listed by plot_jobs, in a pool of worker processes if
+    workers > 1.
+
+    Returns:
+    - list : (path of the saved figure, seconds spent drawing it) per job
+    '''
+
+    if workers <= 1 or len(jobs) <= 1:
+        return [timed_call(function, args) for function, args in jobs]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = [pool.submit(timed_call, function, args) 
+                   for function, args in jobs]
+        return [future.result() for future in futures]
+
+
+def plot_results(results_dir: str, plots='all', dpi=300, fmt='png',
+                 workers=1) -> list:
+    '''
+    Plot stage of a solved run: redraws its figures from the stored
+    predictions without refitting anything.
+    '''
+
+    return render_plots(plot_jobs(results_dir, plots, dpi, fmt), workers)
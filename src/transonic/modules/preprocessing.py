@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+
+# Density of blood in kg m^-3
+RHO = 1045
+# Columns doe_characteristics adds to the design of experiments
+DERIVED_COLUMNS = ('rho', 'N0', 'tau')
+
+
+def doe_characteristics(doe: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Adds the derived characteristics of every case to a design of experiments
+    in one vectorized pass.
+
+    Parameters:
+    - doe : design of experiments
+
+    Returns:
+    - pd.DataFrame : a copy of doe with the added columns
+        - rho : the density of the fluid in kg m^-3
+        - N0 : the initial mass of tracer injected
+        - tau : spacetime of the system defined by volume / flow rate
+    '''
+
+    return doe.assign(
+        rho=RHO,
+        N0=doe.FLOW_RATE * 10**-6 * RHO * doe.TIMESTEP_SIZE,
+        tau=doe.ARTERIAL_VOLUME / doe.FLOW_RATE / 10**-6
+    )
+
+
+def normalize_curves(time: np.ndarray, C: np.ndarray, dt, flow_rate,
+                     artery_volume) -> tuple:
+    '''
+    Converts concentration curves into E(t) curves and normalizes those by
+    the space time of each artery, for any number of cases at once.
+
+    Parameters:
+    - time : flow times, shape (T,) or (n_cases, T) with one row per case
+    - C : concentration curves of the same shape
+    - dt : time step size used during tracer injection, scalar or (n_cases,)
+    - flow_rate : coronary flow rate in mL/s, scalar or (n_cases,)
+    - artery_volume : the volume of the artery found in ANSYS Mesher, scalar
+      or (n_cases,)
+
+    Returns:
+    - tuple : (Et, theta, Etheta) arrays of the shape of C
+
+    Notes:
+    - E(t) = flow_rate*C(t) / N_0 where N_0 is the initial amount of tracer
+      injected, and E(theta) = space_time * E(t) at theta = t / space_time.
+    - Rows may be padded with NaN (e.g. by stack_curves), which stay NaN.
+    '''
+
+    # Per case constants broadcast along the time axis of each row
+    def column(value):
+        value = np.asarray(value, dtype=np.float64)
+        return value[:, np.newaxis] if value.ndim == 1 else value
+
+    mass_flow_rate = column(flow_rate) * 10**-6 * RHO
+    total_tracer_injected = mass_flow_rate * column(dt)
+    space_time = column(artery_volume) / (column(flow_rate) * 10**-6)
+
+    Et = mass_flow_rate * C / total_tracer_injected
+    return Et, time / space_time, Et * space_time
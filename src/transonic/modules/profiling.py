@@ -0,0 +1,197 @@
+import cProfile
+import json
+import os.path as path
+import time
+import pandas as pd
+from contextlib import contextmanager, nullcontext
+
+PROFILERS = ('cprofile', 'pyinstrument')
+TIMINGS_FILE = 'timings.csv'
+RUN_PROFILE_FILE = 'run_profile.json'
+
+# Profile that stage, count and count_file record to in this process, None
+# when profiling is off so that instrumented code only pays a None check
+_active = None
+
+
+class StageProfile:
+    """
+    Wall time of named stages and running counters (objective evaluations,
+    bytes read, ...) of one case or one run.
+
+    Attributes:
+    - stages : {stage name: seconds}, a stage entered several times adds up
+    - counters : {counter name: total}
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, value=1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+
+class RunProfile(StageProfile):
+    """
+    Profile of a run, which also collects the profiles of its cases.
+
+    Attributes:
+    - cases : {case number: StageProfile}
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cases = {}
+        self.start = time.perf_counter()
+
+    def timings(self) -> pd.DataFrame:
+        '''
+        Per-case table of stage times (seconds) and counters.
+        '''
+
+        rows = {id: {**profile.stages,
+                     'total': sum(profile.stages.values()),
+                     **profile.counters}
+                for id, profile in self.cases.items()}
+        timings = pd.DataFrame.from_dict(rows, orient='index').fillna(0)
+        timings.index.name = 'CASE_NUM'
+        return timings.sort_index()
+
+    def report(self, **info) -> dict:
+        '''
+        Run level summary: the run stages, the per-case stages summed over the
+        cases and the counters of the run plus those of its cases.
+        '''
+
+        counters = dict(self.counters)
+        case_stages = {}
+        for profile in self.cases.values():
+            for name, value in profile.counters.items():
+                counters[name] = counters.get(name, 0) + value
+            for name, seconds in profile.stages.items():
+                case_stages[name] = case_stages.get(name, 0.0) + seconds
+
+        return {**info,
+                'wall_time': time.perf_counter() - self.start,
+                'n_cases': len(self.cases),
+                'stages': self.stages,
+                'case_stages': case_stages,
+                'counters': counters}
+
+    def save(self, results_dir: str, **info) -> dict:
+        '''
+        Writes timings.csv and run_profile.json to results_dir.
+
+        Returns:
+        - dict : the run level report
+        '''
+
+        report = self.report(**info)
+        self.timings().to_csv(path.join(results_dir, TIMINGS_FILE))
+        with open(path.join(results_dir, RUN_PROFILE_FILE), 'w') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+def run_profile(config: dict):
+    '''
+    Returns a new RunProfile if the config enables profiling, else None.
+    '''
+
+    return RunProfile() if config.get('profile', False) else None
+
+
+@contextmanager
+def activate(profile):
+    '''
+    Makes profile the target of stage, count and count_file until the block
+    exits. Activating None turns recording off for the block.
+    '''
+
+    global _active
+    previous, _active = _active, profile
+    try:
+        yield profile
+    finally:
+        _active = previous
+
+
+def stage(name: str):
+    '''
+    Times a block as a stage of the active profile.
+    '''
+
+    if _active is None:
+        return nullcontext()
+    return _active.stage(name)
+
+
+def count(name: str, value=1) -> None:
+    if _active is not None:
+        _active.count(name, value)
+
+
+def count_file(name: str, file_path: str) -> None:
+    '''
+    Adds the size of a file to a byte counter ('bytes_read' or
+    'bytes_written') of the active profile.
+    '''
+
+    if _active is not None:
+        _active.count(name, path.getsize(file_path))
+
+
+@contextmanager
+def case_profiler(config: dict, id, results_dir: str):
+    '''
+    Runs a profiler around the block if id is the 'profile_case' of the
+    config, writing profile_<id>.prof (cProfile, e.g. for snakeviz or pstats)
+    or profile_<id>.html (pyinstrument, an optional dependency) to
+    results_dir. Does nothing for every other case.
+    '''
+
+    if config.get('profile_case') is None or int(config['profile_case']) != int(id):
+        yield
+        return
+
+    profiler = config.get('profiler', 'cprofile')
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler {profiler}, expected one of "
+                         f"{PROFILERS}")
+    file_stem = path.join(results_dir, f'profile_{id}')
+
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("The pyinstrument profiler is not installed, "
+                              "install it with pip install pyinstrument or "
+                              "use the cprofile profiler.")
+        session = Profiler()
+        session.start()
+        try:
+            yield
+        finally:
+            session.stop()
+            with open(f'{file_stem}.html', 'w') as f:
+                f.write(session.output_html())
+    else:
+        session = cProfile.Profile()
+        session.enable()
+        try:
+            yield
+        finally:
+            session.disable()
+            session.dump_stats(f'{file_stem}.prof')
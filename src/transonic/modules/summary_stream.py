@@ -0,0 +1,176 @@
+import numpy as np
+import os
+import os.path as path
+import json
+import hashlib
+import time
+from src.transonic.modules.fit_cache import FitCache
+from src.transonic.modules.curve_store import load_manifest
+from src.transonic.scripts.model_eval import fit_settings, fit_grid_settings
+from src.transonic.modules.uncertainty import uncertainty_settings
+
+
+STREAM_FILE = 'eval_outputs.jsonl'
+# Rows are flushed to the OS as they are written and synced to disk after
+# this many rows or seconds, whichever comes first
+FSYNC_EVERY = 10
+FSYNC_SECONDS = 5.0
+
+
+def _run_description(config: dict, model_class) -> dict:
+    return {
+        'model': FitCache.source_hash(model_class),
+        'parameters': list(config['parameters']),
+        'bounds': np.asarray(config['parameter_bounds'], dtype=float).tolist(),
+        'settings': {**fit_settings(config), **fit_grid_settings(config),
+                     **uncertainty_settings(config)},
+    }
+
+
+def _digest(description: dict, curves) -> str:
+    description = {**description, 
+                   'curves': None if curves is None else 
+                   {'sha256': curves['sha256'], 'doe': curves['doe']}}
+    encoded = json.dumps(description, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def stream_key(config: dict, model_class, curves=None) -> str:
+    '''
+    Identifies the settings and data a summary row was solved with, so a 
+    resumed run only keeps rows that the current config would reproduce.
+
+    Parameters:
+    - config : the loaded config file
+    - model_class : the model class being fitted
+    - curves : curve store manifest entry of the case, or None for a case 
+      without one (e.g. legacy .csv curves)
+
+    Returns:
+    - str : sha256 hex digest of the model source, parameters, bounds, fit
+      settings, confidence interval settings and the tracer file hash and DOE
+      row the case's curves were generated from
+    '''
+
+    return _digest(_run_description(config, model_class), curves)
+
+
+def case_keys(config: dict, model_class, ids) -> dict:
+    '''
+    Returns the stream_key of every case, so the rows of cases whose curves 
+    were regenerated since are solved again on resume.
+
+    Returns:
+    - dict : {case number: stream_key}
+    '''
+
+    description = _run_description(config, model_class)
+    manifest = load_manifest(config.get('curves_wd', config['wd']))
+    return {id: _digest(description, manifest.get(str(id))) for id in ids}
+
+
+def read_stream(file_path: str, key=None) -> dict:
+    '''
+    Reads the rows of a summary stream.
+
+    Parameters:
+    - file_path : path of an eval_outputs.jsonl file
+    - key : only rows written under this stream_key are returned, a dict 
+      {case number: stream_key} of the key of each case (cases missing from 
+      it are dropped), or None for every row
+
+    Returns:
+    - dict : {case number: {column: value}}, the last row of each case wins
+
+    Notes:
+    - A line cut short by a crash is skipped.
+    '''
+
+    rows = {}
+    if not path.exists(file_path):
+        return rows
+
+    with open(file_path) as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            id = row.pop('CASE_NUM')
+            if key is not None and row.pop('key', None) != _case_key(key, id):
+                continue
+            rows[id] = row
+    return rows
+
+
+def _drop_partial_line(file_path: str) -> None:
+    '''
+    Truncates a file after its last newline, so rows appended after a crash
+    do not continue a half written line.
+    '''
+
+    with open(file_path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def _case_key(key, id):
+    return key.get(id) if isinstance(key, dict) else key
+
+
+def _to_builtin(value):
+    # NumPy scalars (e.g. an int64 nfev) are not JSON serializable
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class SummaryStream:
+    """
+    Append-only JSON lines file of the summary rows of a run, written as each
+    case finishes so an interrupted run keeps every solved case.
+
+    Attributes:
+    - file_path : path of the eval_outputs.jsonl file
+    - key : stream_key of the run, or {case number: stream_key}, stored with
+      every row
+    - rows : {case number: row} read back when resuming, else empty
+    - fsync_every, fsync_seconds : rows or seconds between syncs to disk
+    """
+
+    def __init__(self, results_dir: str, key: str, resume=False,
+                 fsync_every=FSYNC_EVERY, fsync_seconds=FSYNC_SECONDS):
+        self.file_path = path.join(results_dir, STREAM_FILE)
+        self.key = key
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self.rows = {}
+        if resume and path.exists(self.file_path):
+            self.rows = read_stream(self.file_path, key)
+            _drop_partial_line(self.file_path)
+
+        self._file = open(self.file_path, 'a' if resume else 'w')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, id, row: dict) -> None:
+        line = json.dumps({'CASE_NUM': int(id), 'key': _case_key(self.key, id),
+                           **row},
+                          default=_to_builtin)
+        self._file.write(line + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if (self._unsynced >= self.fsync_every or
+                time.monotonic() - self._last_sync >= self.fsync_seconds):
+            self.sync()
+
+    def sync(self) -> None:
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
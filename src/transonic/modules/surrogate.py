@@ -0,0 +1,251 @@
+import numpy as np
+import pandas as pd
+import pickle
+from src.transonic.modules.preprocessing import (
+    doe_characteristics,
+    normalize_curves
+)
+
+# Surrogates regress the fitted parameters of a model on the DOE columns of
+# the solved cases, so the parameters and E(t) curves of new DOE rows can be
+# predicted without CFD or a fit, and fits can be started from the prediction.
+# scikit-learn is only imported when a surrogate is trained.
+
+SURROGATE_METHODS = ('gp', 'gbr')
+SURROGATE_FILE = 'surrogate.pkl'
+# Numeric DOE columns the parameters are regressed on
+SURROGATE_FEATURES = ('FLOW_RATE', 'PERC_DS', 'RAMP_ANGLE', 'ARTERIAL_VOLUME')
+# Categorical DOE columns, one-hot encoded
+SURROGATE_CATEGORIES = ('VISCOUS_MODEL',)
+
+
+def make_regressor(method: str, n_features: int):
+    '''
+    Returns an unfitted scikit-learn regressor for one parameter.
+
+    Parameters:
+    - method : 'gp' for a Gaussian process with one length scale per feature
+      and a noise term, 'gbr' for gradient boosted trees
+    - n_features : number of columns of the feature matrix
+    '''
+
+    if method == 'gp':
+        from sklearn.gaussian_process import GaussianProcessRegressor
+        from sklearn.gaussian_process.kernels import (
+            ConstantKernel,
+            RBF,
+            WhiteKernel
+        )
+        kernel = (ConstantKernel() * RBF(np.ones(n_features), (1e-2, 1e3))
+                  + WhiteKernel(1e-2, (1e-8, 1)))
+        return GaussianProcessRegressor(kernel, normalize_y=True,
+                                        n_restarts_optimizer=2,
+                                        random_state=69)
+    if method == 'gbr':
+        from sklearn.ensemble import GradientBoostingRegressor
+        return GradientBoostingRegressor(random_state=69)
+    raise ValueError(f"Invalid surrogate method: {method}. Expected one of: "
+                     f"{list(SURROGATE_METHODS)}")
+
+
+class Surrogate:
+    """
+    Regression of the fitted parameters of a model on the DOE columns of
+    solved cases, with one regressor per parameter.
+
+    Attributes:
+    - model : name of the model the parameters belong to
+    - parameters : parameter names
+    - bounds : [lower, upper] bound of each parameter, predictions are
+      clipped to them
+    - method : one of SURROGATE_METHODS
+    - features : numeric DOE columns the parameters are regressed on
+    - categories : {categorical DOE column: levels seen in training}
+    - log_scale : whether each parameter is regressed on a log scale, which
+      is the case when its lower bound is positive
+    - center, spread : standardization of the feature matrix
+    - regressors : the fitted regressor of each parameter
+    - n_cases : number of cases trained on
+    """
+
+    def __init__(self, model: str, parameters: list, bounds: list,
+                 method='gp'):
+        if method not in SURROGATE_METHODS:
+            raise ValueError(f"Invalid surrogate method: {method}. Expected "
+                             f"one of: {list(SURROGATE_METHODS)}")
+        self.model = model
+        self.parameters = list(parameters)
+        self.bounds = np.asarray(bounds, dtype=float)
+        self.method = method
+        self.features, self.categories = [], {}
+        self.log_scale = self.bounds[:, 0] > 0
+        self.center, self.spread = None, None
+        self.regressors = []
+        self.n_cases = 0
+
+    def feature_matrix(self, doe: pd.DataFrame) -> np.ndarray:
+        '''
+        Standardized features of DOE rows, with one column per numeric feature
+        and per level of each categorical column. Levels not seen in training
+        have no column of their own.
+        '''
+
+        columns = [doe[name].astype(float).to_numpy() for name in self.features]
+        for name, levels in self.categories.items():
+            values = doe[name].astype(str).to_numpy()
+            columns += [(values == level).astype(float) for level in levels]
+        X = np.column_stack(columns)
+        return (X - self.center) / self.spread
+
+    def fit(self, doe: pd.DataFrame, summary: pd.DataFrame) -> 'Surrogate':
+        '''
+        Trains the regressors.
+
+        Parameters:
+        - doe : design of experiments
+        - summary : eval_outputs summary of the model, indexed by CASE_NUM,
+          with a column per parameter. Cases missing from the DOE or without
+          fitted parameters are left out.
+
+        Returns:
+        - Surrogate : self
+        '''
+
+        Y = summary[self.parameters].astype(float).dropna()
+        cases = Y.index.intersection(doe.index)
+        if len(cases) < 2:
+            raise ValueError(f"A surrogate needs at least two solved cases, "
+                             f"got {len(cases)}")
+        doe = doe.loc[cases]
+
+        self.features = [name for name in SURROGATE_FEATURES
+                         if name in doe.columns]
+        self.categories = {name: sorted(doe[name].astype(str).unique())
+                           for name in SURROGATE_CATEGORIES
+                           if name in doe.columns}
+        self.center, self.spread = 0, 1
+        X = self.feature_matrix(doe)
+        self.center = X.mean(axis=0)
+        self.spread = np.where(X.std(axis=0) > 0, X.std(axis=0), 1)
+        X = (X - self.center) / self.spread
+
+        Y = self.transform(Y.loc[cases].to_numpy())
+        self.regressors = [make_regressor(self.method, X.shape[1]).fit(X, y)
+                           for y in Y.T]
+        self.n_cases = len(cases)
+        return self
+
+    def transform(self, params: np.ndarray) -> np.ndarray:
+        return np.where(self.log_scale, np.log(np.maximum(params, 1e-300)),
+                        params)
+
+    def inverse_transform(self, values: np.ndarray) -> np.ndarray:
+        return np.where(self.log_scale, np.exp(values), values)
+
+    def predict(self, doe: pd.DataFrame, return_std=False):
+        '''
+        Predicts the parameters of DOE rows.
+
+        Parameters:
+        - doe : design of experiments holding the feature columns
+        - return_std : also return the predictive standard deviation of the
+          Gaussian process (on the regression scale, i.e. relative for log
+          scaled parameters)
+
+        Returns:
+        - pd.DataFrame : parameters clipped to the bounds, one row per DOE row.
+          With return_std, a (parameters, std) tuple of DataFrames, whose std
+          is NaN for gradient boosted trees.
+        '''
+
+        X = self.feature_matrix(doe)
+        if return_std and self.method == 'gp':
+            mean, std = zip(*[regressor.predict(X, return_std=True)
+                              for regressor in self.regressors])
+            std = np.column_stack(std)
+        else:
+            mean = [regressor.predict(X) for regressor in self.regressors]
+            std = np.full((len(X), len(self.parameters)), np.nan)
+        params = np.clip(self.inverse_transform(np.column_stack(mean)),
+                         *self.bounds.T)
+
+        params = pd.DataFrame(params, index=doe.index, columns=self.parameters)
+        if return_std:
+            return params, pd.DataFrame(std, index=doe.index,
+                                        columns=self.parameters)
+        return params
+
+    def predict_curves(self, doe: pd.DataFrame, model_class) -> dict:
+        '''
+        Predicts the E(t) curve of DOE rows from their predicted parameters.
+
+        Parameters:
+        - doe : design of experiments holding the feature columns and the
+          TIMESTEP_SIZE and NO_TIMESTEPS of every row
+        - model_class : class of the surrogate's model
+
+        Returns:
+        - dict : {case number: (time, E(t))}
+        '''
+
+        doe = doe_characteristics(doe)
+        params = self.predict(doe)
+        curves = {}
+        for id, row in doe.iterrows():
+            model_instance = model_class(row.TIMESTEP_SIZE, row.tau, C0=1,
+                                         bounds=self.bounds.tolist())
+            time = np.arange(int(row.NO_TIMESTEPS)) * row.TIMESTEP_SIZE
+            C = model_instance.function(time, *params.loc[id].to_numpy())
+            Et, _, _ = normalize_curves(time, C, row.TIMESTEP_SIZE,
+                                        row.FLOW_RATE, row.ARTERIAL_VOLUME)
+            curves[id] = (time, Et)
+        return curves
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(file_path: str) -> 'Surrogate':
+        '''
+        Reads a surrogate written by Surrogate.save. Like any pickle, only
+        load files you trust.
+        '''
+
+        with open(file_path, 'rb') as f:
+            surrogate = pickle.load(f)
+        if not isinstance(surrogate, Surrogate):
+            raise ValueError(f"{file_path} does not hold a surrogate")
+        return surrogate
+
+
+def train_surrogate(doe: pd.DataFrame, summary: pd.DataFrame, config: dict,
+                    method='gp') -> Surrogate:
+    '''
+    Trains a surrogate of the model of a config on its solved summary.
+    '''
+
+    return Surrogate(config['model'], config['parameters'],
+                     config['parameter_bounds'], method).fit(doe, summary)
+
+
+def surrogate_guesses(config: dict, doe: pd.DataFrame):
+    '''
+    Loads the surrogate of the config entry 'surrogate' (a path written by
+    Surrogate.save) and predicts the parameters of every DOE case with it.
+
+    Returns:
+    - pd.DataFrame of predicted parameters indexed by CASE_NUM, or None if
+      the config has no surrogate
+    '''
+
+    if not config.get('surrogate'):
+        return None
+
+    surrogate = Surrogate.load(config['surrogate'])
+    if (surrogate.model != config['model']
+            or len(surrogate.parameters) != len(config['parameters'])):
+        raise ValueError(f"The surrogate {config['surrogate']} predicts "
+                         f"{surrogate.model} {surrogate.parameters}, not "
+                         f"{config['model']} {config['parameters']}")
+    return surrogate.predict(doe)
@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 import os.path as path
 from src.transonic.modules.plotter import Plotter
+from src.transonic.modules.curve_store import Curve, open_curve
+from src.transonic.modules.preprocessing import RHO, DERIVED_COLUMNS
 
 
 class System:
@@ -11,50 +13,69 @@ class System:
     the independent variables of the system such as flow, volume, and geometry
     specifciations. 
 
+    Curves are loaded on first access, so fitting a case only reads its C
+    curve.
+
     Attributes:
     - ID : the unique value that identifies the system from other systems
     - C : the exit concentration curve
     - Et : the E curve
     - Etheta : the E curve normalized by space time
+    - dtype : None to use the stored float64 curves as they are, or a NumPy 
+      dtype (e.g. np.float32) the curves are converted to
     """
+
+    __slots__ = ('ID', 'wd', 'X', 'dtype', '_curves', 'C_pred')
     
-    def __init__(self, ID, wd):
+    def __init__(self, ID, wd, dtype=None):
         """
-        Initializes the class instance and grabs the experimental curve data
+        Initializes the class instance. The experimental curve data is 
+        fetched when it is first used.
         """
 
         self.ID = ID
         self.wd = wd
-        self.C = self.curve_return('C')
-        self.Et = self.curve_return('Et')
-        self.Etheta = self.curve_return('Etheta')
-    
+        self.dtype = dtype
+        self._curves = {}
+
+    @property
+    def C(self) -> Curve:
+        return self.curve('C')
+
+    @property
+    def Et(self) -> Curve:
+        return self.curve('Et')
+
+    @property
+    def Etheta(self) -> Curve:
+        return self.curve('Etheta')
 
-    def curve_return(self, curve_type: str) -> pd.DataFrame:
+    def curve(self, curve_type: str) -> Curve:
         """
-        Fetches the .csv files for C, Et, & Etheta curves and assigns them to
-        a class attribute of the same name
+        Returns a curve, loading it on first use.
         """
-        
-        path_dict = {'C': f"{path.join(self.wd,'results/')}C_curves",
-                    'Et': f"{path.join(self.wd,'results/')}E_curves",
-                    'Etheta': f"{path.join(self.wd,'results/')}Etheta_curves"}
-        
-        if curve_type not in path_dict:
-            # Raise error if user has messed with valid curve types
-            raise ValueError(f"Invalid Curve Type: Expected one of: \
-                             {list(path_dict.keys())}")
-
-        curve_path = path.join(path_dict[curve_type],  f"sim{self.ID}.csv")
-
-        return pd.read_csv(curve_path, header=0, index_col= 0)
-    
+
+        if curve_type not in self._curves:
+            self._curves[curve_type] = self.curve_return(curve_type)
+        return self._curves[curve_type]
+
+    def curve_return(self, curve_type: str) -> Curve:
+        """
+        Fetches the C, Et, & Etheta curves so they can be assigned to a class 
+        attribute of the same name. Curves are memory mapped from the binary 
+        curve store, falling back to the legacy .csv files for results folders
+        generated before the store existed.
+        """
+
+        return open_curve(self.wd, curve_type, self.ID, self.dtype)
     
     def get_system_characteristics(self, df) -> pd.Series:
         """
         Accepts a design of experiments DataFrame as input. Given the system ID,
-        deep copies the defining parameters of the system to a new pandas series
-        and assigns it to the class attribute 'X'.
+        copies the defining parameters of the system to a new pandas series
+        and assigns it to the class attribute 'X'. The derived rho, N0 and tau
+        are taken from the DOE if preprocessing.doe_characteristics already 
+        added them, else they are computed for this row.
 
         Returns:
         - A pandas series that includes the following information: 
@@ -79,24 +100,29 @@ class System:
               for these experiments, initial mass_fraction was equal to 1.
         """
 
-        X = df.loc[self.ID].copy(deep=True)
-        X['rho'] = 1045
-        X['N0'] = X.FLOW_RATE * 10**-6 * X.rho * X.TIMESTEP_SIZE
-        X['tau'] = X.ARTERIAL_VOLUME/X.FLOW_RATE/10**-6
+        X = df.loc[self.ID]
+        # solve adds the derived columns to the whole DOE up front
+        if not all(column in X.index for column in DERIVED_COLUMNS):
+            X = X.copy()
+            X['rho'] = RHO
+            X['N0'] = X.FLOW_RATE * 10**-6 * X.rho * X.TIMESTEP_SIZE
+            X['tau'] = X.ARTERIAL_VOLUME/X.FLOW_RATE/10**-6
 
         self.X = X
 
     def predicted_curves(self, t_range, C_predicted):
-        self.C_pred = pd.DataFrame({'time': t_range, 'mass_fraction': C_predicted})
-        
-        self.Et_pred = self.C_pred.copy(deep=True)
-        self.Et_pred.rename(columns={'mass_fraction': 'Et'}, inplace=True)
-        self.Et_pred.Et = (self.X.FLOW_RATE * 10**-6 * self.X.rho) * \
-            (self.Et_pred.Et/self.X.N0)
-
-        self.Etheta_pred = self.Et_pred.copy(deep=True)
-        self.Etheta_pred.Et = self.Etheta_pred.Et * self.X.tau
-        self.Etheta_pred.time = self.Etheta_pred.time/self.X.tau
+        self.C_pred = Curve(time=t_range, mass_fraction=C_predicted)
+
+    @property
+    def Et_pred(self) -> Curve:
+        Et = (self.X.FLOW_RATE * 10**-6 * self.X.rho) * \
+            (self.C_pred.mass_fraction / self.X.N0)
+        return Curve(time=self.C_pred.time, Et=Et)
+
+    @property
+    def Etheta_pred(self) -> Curve:
+        Et_pred = self.Et_pred
+        return Curve(time=Et_pred.time / self.X.tau, Et=Et_pred.Et * self.X.tau)
     
     def plotter(self):
         return Plotter(t=self.Et.time, y_gt=self.Et.Et, y_pred=self.Et_pred.Et)
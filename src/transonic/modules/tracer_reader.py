@@ -0,0 +1,140 @@
+import numpy as np
+import os
+import os.path as path
+import re
+from src.transonic.modules.profiling import count_file
+
+
+# Fluent writes one sample per line as: <time step> <mass fraction> <flow time>
+TRACER_FILE_PATTERN = re.compile(r'sim(\d+)_tracer_conc\.out$')
+TRACER_COLUMNS = ('step', 'mass_fraction', 'time')
+
+
+def tracer_case_id(filename: str) -> int:
+    '''
+    Retrieves the case number from the name of a tracer file.
+
+    Parameters:
+    - filename : name of the form simNNN_tracer_conc.out
+
+    Returns:
+    - int : the case number NNN
+    '''
+
+    match = TRACER_FILE_PATTERN.search(path.basename(filename))
+    if match is None:
+        raise ValueError(f"{filename} does not follow the "
+                         f"simNNN_tracer_conc.out naming convention.")
+    return int(match.group(1))
+
+
+def _last_line(file_path: str) -> bytes:
+    '''
+    Returns the last non-empty line of a file without reading all of it.
+    '''
+
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(size - 1024, 0))
+        lines = f.read().split(b'\n')
+    return next((line for line in reversed(lines) if line.strip()), b'')
+
+
+def read_tracer_out(file_path: str) -> tuple:
+    '''
+    Reads a Fluent tracer concentration .out file into contiguous float64
+    arrays and validates its schema.
+
+    Parameters:
+    - file_path : path to a simNNN_tracer_conc.out file
+
+    Returns:
+    - tuple : (time, mass_fraction) as 1D np.arrays of equal length
+
+    Notes:
+    - The step column is only used for validation, so it is not parsed.
+      Instead the file must start at step 0 and end at step T-1 for T rows.
+    - np.loadtxt parses the numbers exactly, unlike the default pandas float
+      parser which can be off in the last digit.
+    '''
+
+    with open(file_path, 'rb') as f:
+        first = f.readline().split()
+
+    if len(first) != len(TRACER_COLUMNS):
+        raise ValueError(f"{file_path}: expected {len(TRACER_COLUMNS)} columns "
+                         f"{TRACER_COLUMNS} but found {len(first)}.")
+
+    data = np.loadtxt(file_path, usecols=(1, 2), dtype=np.float64, ndmin=2)
+    count_file('bytes_read', file_path)
+    mass_fraction = np.ascontiguousarray(data[:, 0])
+    time = np.ascontiguousarray(data[:, 1])
+
+    last_step = int(float(_last_line(file_path).split()[0]))
+    if int(float(first[0])) != 0 or last_step != len(time) - 1:
+        raise ValueError(f"{file_path}: time steps must run from 0 to "
+                         f"{len(time) - 1} without gaps.")
+    if not (np.all(np.isfinite(time)) and np.all(np.isfinite(mass_fraction))):
+        raise ValueError(f"{file_path}: contains non-finite values.")
+    if np.any(np.diff(time) < 0):
+        raise ValueError(f"{file_path}: flow time is not monotonic.")
+
+    return time, mass_fraction
+
+
+def find_tracer_files(directory: str) -> dict:
+    '''
+    Walks a directory for tracer files.
+
+    Returns:
+    - dict : {case number: file path} sorted by case number
+    '''
+
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith('.out'):
+                files[tracer_case_id(filename)] = path.join(dirpath, filename)
+    return dict(sorted(files.items()))
+
+
+def stack_curves(curves: list) -> tuple:
+    '''
+    Aligns curves of different lengths sample by sample into 2D arrays.
+
+    Parameters:
+    - curves : list of (time, mass_fraction) 1D array pairs
+
+    Returns:
+    - tuple : (time, mass_fraction) as (n_cases, T) float64 arrays, where T
+      is the length of the longest curve and shorter rows are padded with NaN
+    '''
+
+    n_samples = max((len(t) for t, _ in curves), default=0)
+    time = np.full((len(curves), n_samples), np.nan)
+    mass_fraction = np.full((len(curves), n_samples), np.nan)
+    for i, (t, c) in enumerate(curves):
+        time[i, :len(t)] = t
+        mass_fraction[i, :len(c)] = c
+    return time, mass_fraction
+
+
+def load_tracer_directory(directory: str) -> tuple:
+    '''
+    Batch loads every tracer file of a directory (e.g. raw_data/C_curves) into
+    contiguous 2D arrays with one row per case.
+
+    Parameters:
+    - directory : folder that is walked for simNNN_tracer_conc.out files
+
+    Returns:
+    - tuple : (case_ids, time, mass_fraction) where case_ids is a 1D int array
+      and time and mass_fraction are (n_cases, T) float64 arrays. Cases with
+      fewer than T samples are padded with NaN.
+    '''
+
+    files = find_tracer_files(directory)
+    time, mass_fraction = stack_curves(
+        [read_tracer_out(file_path) for file_path in files.values()])
+    return np.fromiter(files.keys(), dtype=np.int64), time, mass_fraction
@@ -0,0 +1,339 @@
+import numpy as np
+from statistics import NormalDist
+from src.transonic.modules.model_registry import get_spec
+
+# Confidence intervals of fitted model parameters, selected by the optional
+# 'uncertainty' config entry. 'laplace' uses the curvature of the least squares
+# problem at the fit, which costs one jacobian evaluation. 'bootstrap' refits
+# resampled data with least squares, which costs one gradient based fit per
+# replicate but does not assume the parameters are normally distributed and
+# accounts for the model penalty and bounds. The refits of models that
+# broadcast over parameter vectors are run together, see batch_refits.
+
+UNCERTAINTY_METHODS = ('none', 'laplace', 'bootstrap')
+INTERVAL_BOUNDS = ('lo', 'hi')
+BOOTSTRAP_SEED = 69
+# Condition number of the scaled J^T W J above which the Laplace approximation
+# gives no intervals
+LAPLACE_MAX_COND = 1e10
+# Bootstrap replicates refitted together, at most this many predicted samples
+# at a time, and the iteration limit and relative tolerances of the refits
+REFIT_BATCH_ELEMENTS = 2**16
+REFIT_MAX_ITER = 100
+REFIT_FTOL = 1e-10
+REFIT_XTOL = 1e-8
+
+
+def uncertainty_settings(config: dict) -> dict:
+    '''
+    Returns the config entries that select the parameter confidence
+    intervals, empty when they are disabled so existing summary stream keys
+    stay valid.
+
+    Parameters:
+    - config : the loaded config file, whose optional 'uncertainty' entry is
+      one of UNCERTAINTY_METHODS (default 'none'), with 'uncertainty_level'
+      (default 0.95) and for the bootstrap 'bootstrap_samples' (default 200)
+    '''
+
+    method = config.get('uncertainty', 'none')
+    if method not in UNCERTAINTY_METHODS:
+        raise ValueError(f"Invalid uncertainty method: {method}. Expected one "
+                         f"of: {list(UNCERTAINTY_METHODS)}")
+    if method == 'none':
+        return {}
+
+    settings = {'uncertainty': method,
+                'uncertainty_level': float(config.get('uncertainty_level', 0.95))}
+    if method == 'bootstrap':
+        settings['bootstrap_samples'] = int(config.get('bootstrap_samples', 200))
+    return settings
+
+
+def interval_columns(parameters: list) -> list:
+    '''
+    Summary columns of the confidence interval of every parameter, in the
+    order of parameter_intervals().ravel().
+    '''
+
+    return [f"{name}_{bound}" for name in parameters for bound in INTERVAL_BOUNDS]
+
+
+def fit_residuals(model_instance, xdata, ytrue, weights=None) -> tuple:
+    '''
+    Residuals and jacobian of a fitted model on the samples where both are
+    finite.
+
+    Returns:
+    - tuple : (time, residuals, jacobian of shape (n, n_params), weights) of
+      those samples, with weights of one without fit weights
+    '''
+
+    params = np.asarray(model_instance.params, dtype=float)
+    t = np.asarray(xdata, dtype=float)
+    residuals = np.asarray(ytrue, dtype=float) - model_instance.function(t, *params)
+    J = np.asarray(model_instance.jacobian(t, *params), dtype=float)
+    w = np.ones_like(t) if weights is None else np.asarray(weights, dtype=float)
+
+    mask = np.isfinite(residuals) & np.all(np.isfinite(J), axis=1)
+    return t[mask], residuals[mask], J[mask], w[mask]
+
+
+def laplace_intervals(model_instance, xdata, ytrue, weights=None,
+                      level=0.95) -> np.ndarray:
+    '''
+    Confidence intervals of the fitted parameters from the Gaussian (Laplace)
+    approximation of the least squares problem around the fit.
+
+    Parameters:
+    - model_instance : fitted model with an analytic jacobian
+    - xdata : time sequence the model was fitted over
+    - ytrue : the fitted data
+    - weights : number of original samples each point stands for (e.g. the
+      weights of a fit grid), or None
+    - level : confidence level of the intervals
+
+    Returns:
+    - np.array of shape (n_params, 2) with the lower and upper bound of each
+      parameter, NaN for the parameters the approximation cannot bound (see
+      Notes)
+
+    Notes:
+    - The covariance is s^2 (J^T W J)^-1 with s^2 the weighted residual sum of
+      squares over sum(w) - n_params degrees of freedom. Model penalties are
+      not part of it.
+    - The approximation only holds for an interval well inside the parameter
+      bounds. The interval of a parameter that reaches past a bound (also of
+      one fitted at a bound) is NaN rather than clipped, and so are all
+      intervals when J^T W J is singular or its condition number, once
+      scaled to a unit diagonal, exceeds LAPLACE_MAX_COND (parameters the data
+      cannot tell apart). The bootstrap does not rely on the approximation.
+    '''
+
+    params = np.asarray(model_instance.params, dtype=float)
+    _, residuals, J, w = fit_residuals(model_instance, xdata, ytrue, weights)
+    dof = max(w.sum() - len(params), 1)
+    variance = w @ residuals**2 / dof
+
+    normal = J.T @ (J * w[:, np.newaxis])
+    scale = np.sqrt(np.diag(normal))
+    if not np.all(scale > 0) or \
+            np.linalg.cond(normal / np.outer(scale, scale)) > LAPLACE_MAX_COND:
+        return np.full((len(params), 2), np.nan)
+
+    std = np.sqrt(np.diag(variance * np.linalg.inv(normal)))
+    half_width = NormalDist().inv_cdf(0.5 + level / 2) * std
+    intervals = np.column_stack([params - half_width, params + half_width])
+
+    bounds = getattr(model_instance, 'bounds', None)
+    if bounds is not None:
+        lower, upper = np.asarray(bounds, dtype=float).T
+        outside = (intervals[:, 0] < lower) | (intervals[:, 1] > upper)
+        intervals[outside] = np.nan
+    return intervals
+
+
+def batch_refits(model_instance, xdata, Y, x0, weights=None) -> np.ndarray:
+    '''
+    Least squares fits of a model to every row of Y at once, with the loss of
+    Model.least_squares_fit.
+
+    Parameters:
+    - model_instance : model whose function and jacobian broadcast over
+      parameter vectors, with bounds
+    - xdata : time sequence of length T
+    - Y : np.array of shape (S, T), one data set per row
+    - x0 : starting parameters of every fit
+    - weights : per point weights, or None
+
+    Returns:
+    - np.array of shape (S, n_params) with the fitted parameters of each row
+
+    Notes:
+    - The S problems form one block diagonal least squares problem. It is
+      solved with a Levenberg-Marquardt iteration that keeps a damping per
+      block, so every row converges at its own pace and rows stop being
+      evaluated once they converge. Steps are projected onto the bounds.
+    - Predictions and jacobians are computed for all active rows in one
+      broadcast call of the model, REFIT_BATCH_ELEMENTS samples at a time.
+    '''
+
+    t = np.asarray(xdata, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    lower, upper = np.asarray(model_instance.bounds, dtype=float).T
+    P = np.tile(np.clip(np.asarray(x0, dtype=float), lower, upper),
+                (len(Y), 1))
+    rows = max(REFIT_BATCH_ELEMENTS // len(t), 1)
+    for start in range(0, len(Y), rows):
+        P[start:start + rows] = _lm_refits(model_instance, t,
+                                           Y[start:start + rows],
+                                           P[start:start + rows], weights,
+                                           lower, upper)
+    return P
+
+
+def _lm_refits(model_instance, t, Y, P, weights, lower, upper):
+    # The batched Levenberg-Marquardt iteration of batch_refits. The model
+    # penalty is one extra residual sqrt(T * penalty) per row, as in
+    # Model.least_squares_fit, whose derivative is taken numerically
+    scale = 1 if weights is None else np.sqrt(len(t) * weights / weights.sum())
+
+    def residuals(P, Y):
+        r = model_instance.batch_function(t, P.T) - Y
+        r *= scale
+        return r
+
+    def penalty(P):
+        return np.sqrt(len(t) * np.broadcast_to(
+            model_instance.penalty(*P.T), len(P)))
+
+    def cost(r, p):
+        return np.einsum('st,st->s', r, r) + p**2
+
+    def normal_equations(rows, shared=False):
+        # J^T J and J^T r of the rows, from a single jacobian when the rows
+        # share their parameters
+        Q = P[rows[:1]] if shared else P[rows]
+        J = model_instance.jacobian(t[np.newaxis, :], *Q.T[..., np.newaxis])
+        JT = (J * np.reshape(scale, (1, -1, 1))).transpose(0, 2, 1)
+        step = 1e-8 * np.maximum(np.abs(Q), 1)
+        dp = np.empty(Q.shape)
+        for j in range(Q.shape[1]):
+            h = np.zeros(Q.shape)
+            h[:, j] = step[:, j]
+            dp[:, j] = (penalty(Q + h) - penalty(Q - h)) / (2 * step[:, j])
+        A[rows] = JT @ JT.transpose(0, 2, 1) + \
+            dp[:, :, np.newaxis] * dp[:, np.newaxis, :]
+        g[rows] = (JT @ r[rows][..., np.newaxis])[..., 0] + \
+            dp * p[rows][:, np.newaxis]
+
+    r, p = residuals(P, Y), penalty(P)
+    f = cost(r, p)
+    damping = np.full(len(P), 1e-3)
+    active = np.isfinite(f)
+    A = np.empty((len(P), P.shape[1], P.shape[1]))
+    g = np.empty(P.shape)
+    # Every row starts from the same parameters
+    normal_equations(np.flatnonzero(active), shared=True)
+    refresh = np.zeros(len(P), dtype=bool)
+
+    for _ in range(REFIT_MAX_ITER):
+        if not active.any():
+            break
+        if refresh.any():
+            normal_equations(np.flatnonzero(refresh))
+
+        i = np.flatnonzero(active)
+        diagonal = np.maximum(np.einsum('sjj->sj', A[i]), 1e-300)
+        damped = A[i] + (damping[i, np.newaxis] * diagonal)[..., np.newaxis] \
+            * np.eye(P.shape[1])
+        step = np.linalg.solve(damped, -g[i][..., np.newaxis])[..., 0]
+        trial = np.clip(P[i] + step, lower, upper)
+        r_trial, p_trial = residuals(trial, Y[i]), penalty(trial)
+        f_trial = cost(r_trial, p_trial)
+
+        # A row has converged once its step stops moving the parameters or
+        # decreasing the cost significantly
+        better = f_trial < f[i]
+        small_step = np.abs(trial - P[i]).max(axis=1) <= \
+            REFIT_XTOL * (np.abs(P[i]).max(axis=1) + REFIT_XTOL)
+        done = small_step | (damping[i] > 1e16) | \
+            (better & (f[i] - f_trial <= REFIT_FTOL * f[i]))
+
+        accepted = i[better]
+        P[accepted], r[accepted] = trial[better], r_trial[better]
+        p[accepted], f[accepted] = p_trial[better], f_trial[better]
+        damping[i] = np.where(better, damping[i] / 3, damping[i] * 10)
+        active[i[done]] = False
+        refresh[:] = False
+        refresh[accepted] = True
+        refresh &= active
+    return P
+
+
+def bootstrap_intervals(model_instance, xdata, ytrue, weights=None,
+                        level=0.95, n_samples=200, seed=BOOTSTRAP_SEED,
+                        batched=True) -> np.ndarray:
+    '''
+    Percentile confidence intervals of the fitted parameters from a residual
+    bootstrap.
+
+    Parameters:
+    - model_instance : fitted model with an analytic jacobian
+    - xdata, ytrue, weights, level : see laplace_intervals
+    - n_samples : number of bootstrap replicates
+    - seed : seed of the resampling
+    - batched : refit the replicates together with batch_refits, which
+      requires a model that broadcasts over parameter vectors, rather than
+      one Model.least_squares_fit at a time
+
+    Returns:
+    - np.array of shape (n_params, 2) with the lower and upper bound of each
+      parameter, which lie within the parameter bounds as the refits do
+
+    Notes:
+    - Every replicate adds residuals drawn with replacement (with probability
+      proportional to the weights) to the fitted curve and is refitted with
+      least squares, started from the point estimate. No differential
+      evolution is run.
+    - The replicates are centered on the fitted curve, so their refits are
+      spread around the point estimate even when it is not quite at the least
+      squares optimum of the data (e.g. after a loose differential evolution
+      tol).
+    '''
+
+    params = np.array(model_instance.params, dtype=float)
+    diagnostics = getattr(model_instance, 'diagnostics', None)
+    t, residuals, _, w = fit_residuals(model_instance, xdata, ytrue, weights)
+    fitted = model_instance.function(t, *params)
+
+    # Resampled residuals are centered so a misfit does not shift every
+    # replicate the same way
+    rng = np.random.default_rng(seed)
+    if weights is None:
+        draws = rng.integers(len(t), size=(n_samples, len(t)))
+    else:
+        cdf = np.cumsum(w) / w.sum()
+        draws = np.minimum(np.searchsorted(cdf, rng.random((n_samples, len(t))),
+                                           side='right'), len(t) - 1)
+    centered = residuals - w @ residuals / w.sum()
+    Y = fitted + centered[draws]
+
+    if batched:
+        P = batch_refits(model_instance, t, Y, params,
+                         None if weights is None else w)
+    else:
+        P = np.empty((n_samples, len(params)))
+        try:
+            for i, y in enumerate(Y):
+                model_instance.least_squares_fit(
+                    t, y, params, weights=None if weights is None else w)
+                P[i] = model_instance.params
+        finally:
+            # The refits overwrite the fit of the model
+            model_instance.params = params
+            model_instance.diagnostics = diagnostics
+
+    alpha = (1 - level) / 2
+    return np.quantile(P, [alpha, 1 - alpha], axis=0).T
+
+
+def parameter_intervals(model_instance, xdata, ytrue, weights, config: dict):
+    '''
+    Confidence intervals of a fitted model with the method of the config, see
+    uncertainty_settings.
+
+    Returns:
+    - np.array of shape (n_params, 2), or None if the config disables them
+    '''
+
+    settings = uncertainty_settings(config)
+    if not settings:
+        return None
+    if settings['uncertainty'] == 'laplace':
+        return laplace_intervals(model_instance, xdata, ytrue, weights,
+                                 settings['uncertainty_level'])
+    return bootstrap_intervals(model_instance, xdata, ytrue, weights,
+                               settings['uncertainty_level'],
+                               settings['bootstrap_samples'],
+                               batched=get_spec(config['model']).vectorized)
@@ -2,12 +2,48 @@ import numpy as np
 import pandas as pd
 import argparse
 import yaml
-from importlib import import_module
 import os.path as path
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 from src.transonic.modules.system_class import System
-from src.transonic.scripts.model_eval import fit_model, generate_model_summary, append_model_summary, visualize_fit
+from src.transonic.modules.model_registry import get_spec
+from src.transonic.modules.fit_cache import FitCache
+from src.transonic.modules.warm_start import warm_start_guess, warm_start_report
+from src.transonic.modules.surrogate import surrogate_guesses
+from src.transonic.scripts.model_eval import (
+    build_model,
+    fit_model, 
+    fit_settings,
+    fit_workers,
+    fit_grid_settings,
+    summary_columns,
+    fit_data,
+    generate_model_summary, 
+    append_model_summary, 
+    fit_labels
+)
+from src.transonic.modules.profiling import (
+    StageProfile, 
+    run_profile, 
+    activate, 
+    stage, 
+    count, 
+    case_profiler
+)
+from src.transonic.modules.plotter import (
+    plot_settings, 
+    save_predictions, 
+    plot_jobs, 
+    render_plots
+)
+from src.transonic.modules.summary_stream import SummaryStream, case_keys
+from src.transonic.modules.preprocessing import doe_characteristics
+from src.transonic.modules.uncertainty import (
+    uncertainty_settings,
+    parameter_intervals
+)
 
 
 
@@ -92,32 +128,198 @@ def ID_retrieval(df: pd.DataFrame, criteria: dict):
     return df.index[filter_series]
 
 
-def parse_args():
-    parser = argparse.ArgumentParser(description='Pull YAML file entries and optionally add GUI.')
-    # parser.add_argument('--config','-c', required=False, const=None help='Enter location '
-    #                     ' of config file.')
-    parser.add_argument('--gui', '-w', action='store_true', help='Deploys the GUI.')
-    return parser.parse_args()
+def add_run_arguments(parser, defaults=True):
+    '''
+    Adds the options shared by every way of running configs. Subcommands add
+    them with defaults=False so they do not overwrite options given before 
+    the subcommand.
+    '''
 
+    unset = argparse.SUPPRESS
+    parser.add_argument('--workers', '-j', type=int, 
+                        default=None if defaults else unset, 
+                        help='Number of worker processes used to fit cases. '
+                        'Overrides the n_jobs entry of the config file.')
+    parser.add_argument('--no-cache', action='store_true', 
+                        default=False if defaults else unset,
+                        help='Ignore the fit cache and refit every case.')
+    parser.add_argument('--rebuild-curves', action='store_true', 
+                        default=False if defaults else unset, 
+                        help='Regenerate every curve even if the curve store '
+                        'is up to date.')
+    parser.add_argument('--profile', action='store_true', 
+                        default=False if defaults else unset,
+                        help='Record stage timings and I/O counters to '
+                        'timings.csv and run_profile.json in the results '
+                        'folder.')
+    parser.add_argument('--profile-case', type=int, 
+                        default=None if defaults else unset,
+                        help='Run a profiler around the fit of this case and '
+                        'save its output to the results folder.')
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], 
+                        default=None if defaults else unset,
+                        help='Profiler used by --profile-case (default '
+                        'cprofile).')
+    parser.add_argument('--resume', action='store_true', 
+                        default=False if defaults else unset,
+                        help='Skip the cases already in eval_outputs.jsonl '
+                        'from an interrupted run with the same settings.')
+
+
+def config_overrides(args) -> dict:
+    '''
+    Config entries set by command line options, which take priority over the
+    entries of the config files.
+    '''
+
+    overrides = {}
+    if args.profile:
+        overrides['profile'] = True
+    if args.profile_case is not None:
+        overrides['profile_case'] = args.profile_case
+    if args.profiler is not None:
+        overrides['profiler'] = args.profiler
+    if args.resume:
+        overrides['resume'] = True
+    return overrides
 
-def load_config(path):
-    with open(path, 'r') as file:
-        config = yaml.safe_load(file)
 
-    for row in config['parameter_bounds']:
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Pull YAML file entries and optionally add GUI.')
+    parser.add_argument('--gui', '-w', action='store_true', help='Deploys the GUI.')
+    parser.add_argument('--config', '-c', default=None, help='Location of the '
+                        'config file. Prompted for if neither this nor the run '
+                        'command is given.')
+    add_run_arguments(parser)
+
+    subparsers = parser.add_subparsers(dest='command')
+    run = subparsers.add_parser('run', help='Solve one or more config files '
+                                'without any prompt.')
+    run.add_argument('configs', nargs='+', help='Config files or glob patterns '
+                     '(e.g. "configs/*.yaml"). A config with a sweep entry is '
+                     'run once per sweep item.')
+    run.add_argument('--output', '-o', default='transonic_summary.csv', 
+                     help='Path of the consolidated summary of every run.')
+    add_run_arguments(run, defaults=False)
+
+    plot = subparsers.add_parser('plot', help='Redraw the figures of solved '
+                                 'runs from their stored predictions.')
+    plot.add_argument('results_dirs', nargs='+', help='Results folders holding '
+                      'a predictions.npz file.')
+    plot.add_argument('--plots', choices=['summary', 'all'], default='all', 
+                      help='Draw only the summary figure or every figure.')
+    plot.add_argument('--dpi', type=int, default=300)
+    plot.add_argument('--format', default='png', help='Figure file format, '
+                      'e.g. png, pdf or svg.')
+    add_run_arguments(plot, defaults=False)
+
+    subparsers.add_parser('models', help='List the available models with '
+                          'their default parameters and bounds.')
+
+    surrogate = subparsers.add_parser('surrogate', help='Train a surrogate of '
+                                      'the fitted parameters over the DOE, or '
+                                      'predict new DOE rows with one.')
+    actions = surrogate.add_subparsers(dest='surrogate_command', required=True)
+    train = actions.add_parser('train', help='Train on the eval_outputs.csv '
+                               'of a solved config.')
+    train.add_argument('config', help='Config file of the solved run.')
+    train.add_argument('--method', choices=['gp', 'gbr'], default='gp', 
+                       help='Gaussian process (default) or gradient boosted '
+                       'trees.')
+    train.add_argument('--summary', default=None, help='Summary to train on '
+                       '(default the eval_outputs.csv of the results folder).')
+    train.add_argument('--output', '-o', default=None, help='Path of the '
+                       'surrogate (default surrogate.pkl in the results '
+                       'folder).')
+    predict = actions.add_parser('predict', help='Predict the parameters and '
+                                 'E(t) curves of DOE rows.')
+    predict.add_argument('surrogate', help='Surrogate written by train.')
+    predict.add_argument('doe', help='DOE file of the cases to predict.')
+    predict.add_argument('--output', '-o', default='surrogate_predictions.csv',
+                         help='Path of the predicted parameters.')
+    predict.add_argument('--curves', default=None, help='Also write the '
+                         'predicted E(t) curves to this .npz file.')
+    return parser.parse_args(argv)
+
+
+def parse_bounds(bounds):
+    '''
+    Converts the 'INF' and '-INF' entries of a parameter_bounds list to floats.
+    '''
+
+    for row in bounds:
         for i, value in enumerate(row):
             if value == 'INF':
                 row[i] = np.inf 
             elif value == '-INF':
                 row[i] = -np.inf
+    return bounds
+
+
+def check_model(config: dict) -> dict:
+    '''
+    Validates the model entries of a config against the model registry.
+
+    Parameters:
+    - config : a config naming one model, which is updated in place
+
+    Returns:
+    - dict : config, with the default parameters and parameter_bounds of the
+      model filled in where they are missing
+
+    Notes:
+    - Parameters may be named freely, but there must be one per parameter of
+      the model and each must have a [lower, upper] bound.
+    - Raises ValueError for unknown models, a wrong number of parameters or
+      bounds, or fit or uncertainty settings the model does not support.
+    '''
 
+    spec = get_spec(config['model'])
+    config.setdefault('parameters', list(spec.parameters))
+    config.setdefault('parameter_bounds', spec.default_bounds())
+
+    n_params = len(spec.parameters)
+    if len(config['parameters']) != n_params:
+        raise ValueError(f"{spec.name} has {n_params} parameters "
+                         f"{spec.parameters}, got {config['parameters']}")
+    bounds = config['parameter_bounds']
+    if len(bounds) != n_params or any(len(row) != 2 for row in bounds):
+        raise ValueError(f"parameter_bounds of {spec.name} must be one "
+                         f"[lower, upper] pair per parameter, got {bounds}")
+
+    if config.get('vectorized', False) and not spec.vectorized:
+        raise ValueError(f"{spec.name} does not support vectorized evaluation")
+    if (config.get('fit_method', 'de') in ('lm', 'trf', 'de+trf') 
+            and not spec.gradients):
+        raise ValueError(f"The {config['fit_method']} fit method requires an "
+                         f"analytic jacobian, which {spec.name} does not have")
+    if uncertainty_settings(config) and not spec.gradients:
+        raise ValueError(f"Confidence intervals require an analytic jacobian, "
+                         f"which {spec.name} does not have")
+    return config
+
+
+def load_config(path):
+    with open(path, 'r') as file:
+        config = yaml.safe_load(file)
+
+    parse_bounds(config.get('parameter_bounds', []))
+    for entry in [*config.get('sweep', []), *config.get('models', [])]:
+        if isinstance(entry, dict) and 'parameter_bounds' in entry:
+            parse_bounds(entry['parameter_bounds'])
+
+    # Sweeps and model comparisons are checked once they are expanded
+    if 'model' in config and not config.get('sweep') and not config.get('models'):
+        check_model(config)
     return config
 
 def get_model_class(config_yaml_data):
-    model_name = config_yaml_data['model']
-    module_name = f"src.transonic.models.{model_name}"
-    module = import_module(module_name)
-    return getattr(module, model_name)
+    '''
+    Returns the class of the config's model from the model registry, which
+    only imports that model.
+    '''
+
+    return get_spec(config_yaml_data['model']).load()
 
 
 
@@ -132,37 +334,493 @@ def create_results_folder(wd):
     os.makedirs(result_dir, exist_ok=True)
     return result_dir
 
-def solve(doe: pd.DataFrame, config: dict, results_dir: str, model_class) -> pd.DataFrame:
+def resolve_workers(config: dict, workers=None) -> int:
+    '''
+    Determines how many worker processes should be used for fitting cases.
+
+    Parameters:
+    - config : the loaded config file, which may contain an 'n_jobs' entry
+    - workers : explicit number of workers, takes priority over the config
+
+    Returns:
+    - int : the number of workers, where -1 (or 0) means every available core
+    '''
 
-    summary_df = pd.DataFrame(
-        columns=[
-            *config['parameters'],
-            'RAE',
-            'MAE', 
-            'avg_residual', 
-            'std_of_residual'], 
-        index=doe.index
-    )
+    if workers is None:
+        workers = config.get('n_jobs', 1)
 
-    for id in tqdm(doe.index):
-        S = System(id, config['wd'])
-        S.get_system_characteristics(doe)
+    if workers is None:
+        workers = 1
+    elif workers <= 0:
+        workers = os.cpu_count() or 1
 
-        model_instance = fit_model(model_class, None, S, config)
+    return int(workers)
 
-        S.predicted_curves(S.C.time, model_instance.predict(S.C.time))
 
-        metrics = generate_model_summary(S) 
+def make_fit_cache(config: dict, results_dir: str, use_cache=True):
+    '''
+    Creates the fit cache described by the config file.
+
+    Parameters:
+    - config : the loaded config file. 'cache' (default True) turns the cache
+      on or off, 'cache_max_entries' and 'cache_max_age_days' set the eviction
+      policy.
+    - results_dir : folder the cache is kept in
+    - use_cache : False disables the cache regardless of the config 
+      (e.g. --no-cache)
+
+    Returns:
+    - FitCache or None if caching is disabled
+    '''
 
-        summary_df = append_model_summary(
-            summary_df, 
-            id, 
-            metrics, 
-            model_instance
+    if not use_cache or not config.get('cache', True):
+        return None
+
+    return FitCache(results_dir, 
+                    max_entries=config.get('cache_max_entries', 10000),
+                    max_age_days=config.get('cache_max_age_days', 30))
+
+
+def case_prediction(system_attr) -> tuple:
+    '''
+    Returns the (title, file stem, C_pred) the plot stage draws for a System
+    whose predicted curves are set. The plot stage reads the time and CFD 
+    curve back from the curve store, so worker processes do not send them.
+    '''
+
+    return (*fit_labels(system_attr), 
+            np.asarray(system_attr.C_pred.mass_fraction))
+
+
+def load_system(id, doe: pd.DataFrame, config: dict) -> System:
+    '''
+    Returns the System of a case with its characteristics set.
+    '''
+
+    S = System(id, config.get('curves_wd', config['wd']), 
+               dtype=config.get('curve_dtype'))
+    S.get_system_characteristics(doe)
+    return S
+
+
+def solve_case(id, doe: pd.DataFrame, config: dict, results_dir: str, model_class,
+               cache=None, initial_guess=None, system=None):
+    '''
+    Fits and evaluates a single case of the design of experiments. This is 
+    the unit of work that solve hands out to worker processes, so it only 
+    depends on its arguments.
+
+    Parameters:
+    - id : the case number in the DOE
+    - doe : design of experiments (only the row for this case is required)
+    - config : the loaded config file
+    - results_dir : folder of the run's results
+    - model_class : the model class to fit
+    - cache : FitCache to serve unchanged fits from, or None
+    - initial_guess : parameter vector(s) the fit is seeded from, or None
+    - system : the System of the case if it is already loaded, else it is 
+      loaded from the curve store
+
+    Returns:
+    - tuple : (id, fitted model instance, list of fit metrics, prediction, 
+      profile). prediction is the (title, file stem, C_pred) the plot
+      stage draws, or None if the config disables plots. profile is the 
+      StageProfile of the case if the config enables profiling, else None.
+      The model instance holds the (n_params, 2) confidence intervals of its
+      parameters in intervals if the config enables them, and whether its
+      fit was served from the cache in cache_hit.
+    '''
+
+    profile = StageProfile() if config.get('profile', False) else None
+    with activate(profile), case_profiler(config, id, results_dir):
+        S = system
+        if S is None:
+            with stage('load_curves'):
+                S = load_system(id, doe, config)
+
+        model_instance = build_model(model_class, None, S, config, initial_guess)
+        hit = None
+        if cache is not None:
+            with stage('cache'):
+                key = cache.key(model_instance, model_class, 
+                                {**fit_settings(config), 
+                                 **fit_grid_settings(config)},
+                                S.C.time, S.C.mass_fraction)
+                hit = cache.get(key)
+
+        uncertainty = uncertainty_settings(config)
+        if hit is None or uncertainty:
+            with stage('fit_data'):
+                xdata, ytrue, weights = fit_data(S, config)
+
+        model_instance.cache_hit = hit is not None
+        if hit is not None:
+            count('cache_hits')
+            model_instance.params = np.asarray(hit['params'])
+            model_instance.diagnostics = hit['diagnostics']
+            with stage('predict'):
+                S.predicted_curves(S.C.time, model_instance.predict(S.C.time))
+            metrics = hit['metrics']
+        else:
+            with stage('fit'):
+                model_instance.fit(xdata, ytrue, weights=weights, 
+                                   **fit_settings(config), **fit_workers(config))
+            count('nfev', model_instance.diagnostics['nfev'])
+            count('nit', model_instance.diagnostics['nit'])
+            with stage('predict'):
+                S.predicted_curves(S.C.time, model_instance.predict(S.C.time))
+            with stage('metrics'):
+                metrics = generate_model_summary(S)
+            if cache is not None:
+                with stage('cache'):
+                    cache.put(key, model_instance.params, metrics, 
+                              model_instance.diagnostics)
+
+        # Intervals are not cached, a cache hit only saves the fit itself
+        if uncertainty:
+            with stage('uncertainty'):
+                model_instance.intervals = parameter_intervals(
+                    model_instance, xdata, ytrue, weights, config)
+
+        prediction = None
+        if plot_settings(config)['plots'] != 'none':
+            prediction = case_prediction(S)
+
+    return id, model_instance, metrics, prediction, profile
+
+
+def solve_case_group(args_list: list) -> list:
+    '''
+    Solves one case for several runs that read the same curves, e.g. the
+    models of a comparison, loading the System of the case only once.
+
+    Parameters:
+    - args_list : solve_case arguments of each run, see SolveRun.submit_args
+
+    Returns:
+    - list : the solve_case result of each run
+    '''
+
+    if len(args_list) == 1:
+        return [solve_case(*args_list[0])]
+
+    id, doe, config = args_list[0][:3]
+    S = load_system(id, doe, config)
+    return [solve_case(*args, system=S) for args in args_list]
+
+
+class SolveRun:
+    """
+    Bookkeeping of one config being solved: the summary table, the fitted
+    parameters that warm starts are seeded from and the evaluation counts of
+    the warm start report.
+
+    Attributes:
+    - doe : design of experiments
+    - config : the loaded config file
+    - results_dir : folder the predictions and figures are saved to
+    - model_class : the model class to fit
+    - cache : FitCache of the run, or None
+    - plot_settings : plot level, DPI and format of the run, see plot_settings
+    - group : name of the model comparison the run belongs to (config entry 
+      'comparison'), or None. solve_runs fits a case for every run of a 
+      group in one go
+    - profile : RunProfile of the run if its config enables profiling, else 
+      None
+    - summary_df : fitted parameters, metrics and optimizer diagnostics, one
+      row per DOE case
+    - stream : SummaryStream every row is appended to as its case finishes
+    - resumed : case numbers whose rows were read back from the stream of an
+      earlier run (config entry 'resume'), which are not solved again
+    - pending : case numbers still to solve
+    - surrogate_guesses : parameters of every case predicted by the surrogate
+      of the config entry 'surrogate', or None
+    - solved : {case number: fitted parameters} of the cases solved so far
+    - predictions : {case number: prediction} for the plot stage
+    """
+
+    def __init__(self, doe: pd.DataFrame, config: dict, results_dir: str, 
+                 model_class, use_cache=True, profile=None):
+        # The derived characteristics of every case in one vectorized pass
+        self.doe = doe_characteristics(doe)
+        self.config = config
+        self.results_dir = results_dir
+        self.model_class = model_class
+        self.cache = make_fit_cache(config, results_dir, use_cache)
+        self.warm_start = config.get('warm_start', False)
+        self.surrogate_guesses = surrogate_guesses(config, self.doe)
+        self.plot_settings = plot_settings(config)
+        self.group = config.get('comparison')
+        self.profile = profile if profile is not None else run_profile(config)
+        self.summary_df = pd.DataFrame(
+            columns=summary_columns(config['parameters'], 
+                                    bool(uncertainty_settings(config))), 
+            index=doe.index
         )
-        visualize_fit(S, results_dir)
-        
-    return summary_df
+        self.solved, self.nfev_cold, self.nfev_warm = {}, [], []
+        self.predictions = {}
+
+        parameters = config['parameters']
+        self.stream = SummaryStream(results_dir, 
+                                    case_keys(config, model_class, doe.index), 
+                                    resume=config.get('resume', False))
+        self.resumed = [id for id in doe.index if id in self.stream.rows]
+        for id in self.resumed:
+            row = self.stream.rows[id]
+            self.summary_df.loc[id] = [row.get(column) 
+                                       for column in self.summary_df.columns]
+            self.solved[id] = np.array([row[name] for name in parameters])
+        self.pending = [id for id in doe.index if id not in self.stream.rows]
+        if self.resumed:
+            print(f"Resuming {results_dir}: {len(self.resumed)} of "
+                  f"{len(doe)} case(s) already solved.")
+
+    def guess(self, id):
+        # The surrogate prediction comes first, so the least squares fit 
+        # methods start from it
+        guesses = []
+        if self.surrogate_guesses is not None:
+            lower, upper = np.asarray(self.config['parameter_bounds'], 
+                                      dtype=float).T
+            guesses.append(np.clip(self.surrogate_guesses.loc[[id]].to_numpy(),
+                                   lower, upper))
+        if self.warm_start:
+            neighbours = warm_start_guess(
+                self.doe, id, self.solved, 
+                self.config.get('warm_start_neighbours', 3))
+            if neighbours is not None:
+                guesses.append(neighbours)
+        return np.vstack(guesses) if guesses else None
+
+    def submit_args(self, id, single_row=False):
+        '''
+        Arguments of solve_case for a case of this run. Worker processes only
+        receive the DOE row of their case.
+        '''
+
+        doe = self.doe.loc[[id]] if single_row else self.doe
+        return (id, doe, self.config, self.results_dir, self.model_class, 
+                self.cache, self.guess(id))
+
+    def record(self, id, model_instance, metrics, prediction=None, 
+               profile=None):
+        self.solved[id] = model_instance.params
+        if prediction is not None:
+            self.predictions[id] = prediction
+        if self.profile is not None and profile is not None:
+            self.profile.cases[id] = profile
+        # Cached fits did no work on this run, so they are left out of the
+        # warm start report
+        if not getattr(model_instance, 'cache_hit', False):
+            nfev = model_instance.diagnostics['nfev']
+            if model_instance.initial_guess is None:
+                self.nfev_cold.append(nfev)
+            else:
+                self.nfev_warm.append(nfev)
+        self.summary_df = append_model_summary(self.summary_df, id, metrics, 
+                                               model_instance)
+        self.stream.append(id, self.summary_df.loc[id].to_dict())
+
+    def resumed_prediction(self, id):
+        '''
+        Rebuilds the plotted prediction of a resumed case from its fitted 
+        parameters.
+        '''
+
+        S = load_system(id, self.doe, self.config)
+        model_instance = build_model(self.model_class, None, S, self.config)
+        model_instance.params = self.solved[id]
+        S.predicted_curves(S.C.time, model_instance.predict(S.C.time))
+        return case_prediction(S)
+
+    def finish(self):
+        self.stream.close()
+        if self.warm_start or self.surrogate_guesses is not None:
+            print(warm_start_report(self.nfev_cold, self.nfev_warm))
+        with activate(self.profile):
+            if self.cache is not None:
+                self.cache.evict()
+            if self.plot_settings['plots'] != 'none':
+                for id in self.resumed:
+                    self.predictions[id] = self.resumed_prediction(id)
+                save_predictions(self.results_dir, self.predictions,
+                                 self.config.get('curves_wd', 
+                                                 self.config['wd']))
+                self.predictions = {}
+
+    def save_profile(self, **info):
+        '''
+        Writes timings.csv and run_profile.json next to eval_outputs.csv and 
+        prints where the time went.
+        '''
+
+        report = self.profile.save(self.results_dir, model=self.config['model'],
+                                   **info)
+        stages = {**report['case_stages'], **report['stages']}
+        print(f"Profile of {self.results_dir}: " + ', '.join(
+            f"{name} {seconds:.2f} s" for name, seconds in stages.items()) + 
+            f" | {report['counters'].get('nfev', 0)} objective evaluations, "
+            f"{report['counters'].get('bytes_read', 0) / 1e6:.1f} MB read, "
+            f"{report['counters'].get('bytes_written', 0) / 1e6:.1f} MB written")
+
+
+def solve_runs(runs: list, workers=None, progress_callback=None, 
+               should_stop=None) -> list:
+    '''
+    Fits every case of several runs, scheduling all (run, case) fits on a 
+    single pool of worker processes, then runs the plot stage.
+
+    Parameters:
+    - runs : list of SolveRun
+    - workers : number of worker processes. If None the 'n_jobs' entry of the
+      first run's config is used (default 1, serial). -1 uses every core.
+    - progress_callback : called as progress_callback(done, total, id, params)
+      after every solved case, e.g. to drive a progress bar
+    - should_stop : called between cases; once it returns True no further
+      cases are started and the cases solved so far are returned
+
+    Returns:
+    - list : the summary DataFrame of each run, in the order of runs. Rows of
+      cases skipped by should_stop are left empty (NaN).
+
+    Notes:
+    - Every case is independent and the fit is seeded, so the parallel path 
+      gives the same numbers as the serial path.
+    - Cases that are already running in worker processes when should_stop 
+      returns True are finished and kept.
+    - Figures are not drawn while fitting. Each run stores its predictions in
+      its results folder and the figures selected by its 'plots' entry are
+      then rendered on a fresh pool of the same size, see plotter.plot_jobs.
+    - Runs whose config enables profiling write timings.csv and 
+      run_profile.json to their results folder, see profiling.RunProfile.
+    - The runs of a model comparison (see comparison.expand_models) are 
+      solved one case at a time, so the case is loaded once for all models.
+    - Each summary row is appended to eval_outputs.jsonl in the run's results
+      folder as soon as its case finishes. Runs whose config sets 'resume' 
+      only solve the cases missing from that file, see SolveRun.
+    '''
+
+    tasks = [(run, id) for run in runs for id in run.pending]
+
+    # Units of work: a single (run, case) fit, or a case of every run of a
+    # model comparison group so its System is loaded once
+    units, grouped = [], {}
+    for run, id in tasks:
+        if run.group is None:
+            units.append([(run, id)])
+        elif (run.group, id) in grouped:
+            grouped[(run.group, id)].append((run, id))
+        else:
+            grouped[(run.group, id)] = [(run, id)]
+            units.append(grouped[(run.group, id)])
+
+    workers = max(min(resolve_workers(runs[0].config, workers), len(units)), 1)
+    progress = tqdm(total=len(tasks))
+    done = 0
+    start = time.perf_counter()
+
+    def record(run, id, model_instance, metrics, prediction, profile):
+        nonlocal done
+        run.record(id, model_instance, metrics, prediction, profile)
+        done += 1
+        progress.update()
+        if progress_callback is not None:
+            progress_callback(done, len(tasks), id, model_instance.params)
+
+    def stopped():
+        return should_stop is not None and should_stop()
+
+    if workers <= 1:
+        for unit in units:
+            if stopped():
+                break
+            results = solve_case_group([run.submit_args(id) for run, id in unit])
+            for (run, _), result in zip(unit, results):
+                record(run, *result)
+    else:
+        # Warm started cases are seeded from cases solved in earlier waves, so
+        # the cases are then handed out one wave (one case per worker) at a time
+        warm_start = any(run.warm_start for run in runs)
+        wave_size = workers if warm_start else len(units)
+        waves = [units[i:i + wave_size] for i in range(0, len(units), wave_size)]
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for wave in waves:
+                if stopped():
+                    break
+                futures = {
+                    pool.submit(solve_case_group, 
+                                [run.submit_args(id, True) for run, id in unit]): 
+                    unit for unit in wave
+                }
+
+                # Rows are labelled by case ID so out of order completion still
+                # produces a summary in DOE order
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    for (run, _), result in zip(futures[future], 
+                                                future.result()):
+                        record(run, *result)
+                    if stopped():
+                        # Only cases that have not started yet can be cancelled
+                        for pending in futures:
+                            pending.cancel()
+    progress.close()
+
+    if done < len(tasks):
+        print(f"Stopped early: {done} of {len(tasks)} case(s) solved.")
+
+    solve_time = time.perf_counter() - start
+
+    for run in runs:
+        run.finish()
+
+    jobs = [(run, job) for run in runs 
+            for job in plot_jobs(run.results_dir, **run.plot_settings)]
+    figures = render_plots([job for _, job in jobs], workers)
+
+    for run in runs:
+        if run.profile is None:
+            continue
+        # The fits of every run share one pool, so the solve stage is the wall
+        # time of the whole batch
+        run.profile.add_time('solve', solve_time)
+        for (job_run, _), (file_path, seconds) in zip(jobs, figures):
+            if job_run is run:
+                run.profile.add_time('plot', seconds)
+                run.profile.count('figures')
+                run.profile.count('bytes_written', path.getsize(file_path))
+        run.save_profile(workers=workers, runs_in_batch=len(runs))
+    return [run.summary_df for run in runs]
+
+
+def solve(doe: pd.DataFrame, config: dict, results_dir: str, model_class, 
+          workers=None, use_cache=True, progress_callback=None, 
+          should_stop=None, profile=None) -> pd.DataFrame:
+    '''
+    Fits the model class to every case in the design of experiments.
+
+    Parameters:
+    - doe : design of experiments
+    - config : the loaded config file
+    - results_dir : folder the predictions and figures are saved to
+    - model_class : the model class to fit
+    - workers : number of worker processes. If None the 'n_jobs' entry of the
+      config is used (default 1, serial). -1 uses every available core.
+    - use_cache : serve unchanged cases from the fit cache in results_dir
+    - progress_callback, should_stop : see solve_runs
+    - profile : RunProfile that already holds earlier stages of the run (e.g.
+      generate_curves). If None, one is created when the config enables 
+      profiling
+
+    Returns:
+    - pd.DataFrame : fitted parameters and metrics for each case in DOE order.
+      Rows of cases skipped by should_stop are left empty (NaN).
+    '''
+
+    run = SolveRun(doe, config, results_dir, model_class, use_cache, profile)
+    return solve_runs([run], workers, progress_callback, should_stop)[0]
 
 if __name__ == '__main__':
     doe = pd.read_csv("data/CASE_PARAMETERS.csv", 
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+
+# DOE columns the fitted parameters are expected to vary smoothly with
+WARM_START_FEATURES = ('FLOW_RATE', 'PERC_DS', 'RAMP_ANGLE')
+
+
+def nearest_cases(doe: pd.DataFrame, case_id, candidates, k=3,
+                  features=WARM_START_FEATURES) -> list:
+    '''
+    Finds the candidate cases closest to a case in DOE space. Every feature is
+    scaled by its range over the whole DOE so that e.g. flow rates in mL/s and
+    ramp angles in degrees weigh the same.
+
+    Parameters:
+    - doe : design of experiments
+    - case_id : the case to find neighbours for
+    - candidates : case numbers that may be returned (e.g. already solved ones)
+    - k : maximum number of neighbours
+    - features : DOE columns that span the distance
+
+    Returns:
+    - list : up to k case numbers ordered from nearest to farthest
+    '''
+
+    candidates = [c for c in candidates if c != case_id]
+    if not candidates:
+        return []
+
+    X = doe.loc[:, [f for f in features if f in doe.columns]].astype(float)
+    spread = (X.max() - X.min()).replace(0, 1)
+    X = (X - X.min()) / spread
+
+    distance = np.linalg.norm(X.loc[candidates].to_numpy() -
+                              X.loc[case_id].to_numpy(), axis=1)
+    order = np.argsort(distance, kind='stable')[:k]
+    return [candidates[i] for i in order]
+
+
+def warm_start_guess(doe: pd.DataFrame, case_id, solved: dict, k=3):
+    '''
+    Builds an initial guess for Model.fit from the fitted parameters of the
+    nearest already solved cases.
+
+    Parameters:
+    - doe : design of experiments
+    - case_id : the case about to be fitted
+    - solved : {case number: fitted parameters} of the cases solved so far
+    - k : number of neighbours to seed from
+
+    Returns:
+    - np.array of shape (n_neighbours, n_params), or None if nothing is solved
+    '''
+
+    neighbours = nearest_cases(doe, case_id, list(solved.keys()), k)
+    if not neighbours:
+        return None
+    return np.array([solved[n] for n in neighbours], dtype=float)
+
+
+def warm_start_report(nfev_cold: list, nfev_warm: list) -> str:
+    '''
+    Summarizes how many objective evaluations warm starting (from neighbours
+    or a surrogate) saved, estimated against the mean evaluation count of the
+    cold started cases of the run.
+    '''
+
+    if not nfev_warm:
+        return "Warm start: no case was seeded."
+    if not nfev_cold:
+        return (f"Warm start: {len(nfev_warm)} seeded case(s) used "
+                f"{np.mean(nfev_warm):.0f} evaluations on average.")
+
+    saved = (np.mean(nfev_cold) - np.mean(nfev_warm)) * len(nfev_warm)
+    return (f"Warm start: {len(nfev_warm)} seeded case(s) used "
+            f"{np.mean(nfev_warm):.0f} evaluations on average vs "
+            f"{np.mean(nfev_cold):.0f} for {len(nfev_cold)} cold start(s), "
+            f"an estimated {saved:.0f} evaluations saved.")
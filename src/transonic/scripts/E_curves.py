@@ -4,6 +4,21 @@ import os
 import os.path as path
 from src.transonic.modules.utilities import create_results_folder
 from src.transonic.modules.utilities import load_DOE
+from src.transonic.modules.curve_store import (
+    Curve,
+    write_curve, 
+    load_manifest, 
+    save_manifest, 
+    manifest_entry, 
+    is_up_to_date
+)
+from src.transonic.modules.tracer_reader import (
+    find_tracer_files, 
+    read_tracer_out, 
+    stack_curves
+)
+from src.transonic.modules.preprocessing import normalize_curves
+from src.transonic.modules.profiling import count_file
 
 
 def E_curve_generator(c_curve: pd.DataFrame, dt: float, flow_rate: float):
@@ -21,6 +36,8 @@ def E_curve_generator(c_curve: pd.DataFrame, dt: float, flow_rate: float):
     - Implementation is based off of the definition of the E(t) curve: 
                         E(t) = flow_rate*C(t) / N_0
         where, N0 is the initial amount of tracer injected
+    - generate_curves normalizes every case at once with 
+      preprocessing.normalize_curves instead.
     '''
 
     E_curve = c_curve.copy(deep=True)  # creates a new df in memory
@@ -60,59 +77,84 @@ def E_theta_generator(E_curve, artery_volume, flow_rate):
                                       'time': 'theta'})
     return E_curve
 
-def generate_curves(wd: str, cCurves: str, doe_path: str) -> None:
+
+# Cases normalized per vectorized pass, which keeps the stacked arrays of 11740
+# sample curves around 120 MB
+CHUNK_CASES = 256
+
+
+def generate_curves(wd: str, cCurves: str, doe_path: str, 
+                    export_csv: bool = False, force: bool = False) -> None:
+    '''Builds the C, E and E_theta curves of every case and saves them to the
+    binary curve store in wd/results/curve_store. A build manifest records the 
+    tracer file and DOE row each case was generated from, so only new or 
+    changed cases are regenerated on later runs.
+
+    Parameters:
+    - wd : working directory of the run
+    - cCurves : directory holding the simNNN_tracer_conc.out files
+    - doe_path : path to the design of experiments document
+    - export_csv : additionally write the legacy C_curves, E_curves and 
+      Etheta_curves .csv files
+    - force : regenerate every case regardless of the manifest
+
+    Notes:
+    - The curves of up to CHUNK_CASES cases are stacked sample by sample and
+      normalized in one 2D array operation, see normalize_curves.
+    '''
     print(f"{cCurves}")
     # Define save location for C curves and create folder
     C_CURVES_DEST_FOLDER = path.join(wd, 'results/C_curves')
-    os.makedirs(C_CURVES_DEST_FOLDER, exist_ok=True)
-    os.makedirs(path.join(wd, 'results/E_curves'), exist_ok=True)
-    os.makedirs(path.join(wd, 'results/Etheta_curves'), exist_ok=True)
+    if export_csv:
+        os.makedirs(C_CURVES_DEST_FOLDER, exist_ok=True)
+        os.makedirs(path.join(wd, 'results/E_curves'), exist_ok=True)
+        os.makedirs(path.join(wd, 'results/Etheta_curves'), exist_ok=True)
 
     # Load DOE document for getting case parameters
     doe = load_DOE(doe_path)
-    # Iterate over every concentration curve in the data directory.
-    for dirpath, dirnames, filenames in os.walk(cCurves):
-        for filename in filenames:
-            if filename.endswith('.out'):
-            # Path to each concentration curve in cCurves directory
-                src_path = path.join(dirpath, filename)  
-
-                # Concentration curve from CFD simulations
-                c_curve = pd.read_csv(src_path, 
-                                    index_col=0, 
-                                    sep='\s+', 
-                                    names=['mass_fraction', 'time'],
-                                    header=None)
-            
-
-                # Retrive current case number and get necessary parameters from 
-                # design of experiment spreadsheet
-                case_num=int(
-                        filename.replace('sim', '').replace('_tracer_conc.out', '')
-                )
-                
-                case_params = doe.loc[case_num]
-
-
-                # Create save name for curves files
+    manifest = {} if force else load_manifest(wd)
+
+    # Cases whose tracer file or DOE row changed since they were generated
+    tracer_files = find_tracer_files(cCurves)
+    stale = [(case_num, src_path) for case_num, src_path in tracer_files.items()
+             if not is_up_to_date(wd, case_num, manifest.get(str(case_num)), 
+                                  src_path, doe.loc[case_num], export_csv)]
+    n_skipped = len(tracer_files) - len(stale)
+
+    for i in range(0, len(stale), CHUNK_CASES):
+        chunk = stale[i:i + CHUNK_CASES]
+        # Concentration curves from CFD simulations
+        curves = [read_tracer_out(src_path) for _, src_path in chunk]
+        time, C = stack_curves(curves)
+        case_params = doe.loc[[case_num for case_num, _ in chunk]]
+        Et, theta, Etheta = normalize_curves(time, C, 
+                                             case_params.TIMESTEP_SIZE, 
+                                             case_params.FLOW_RATE,
+                                             case_params.ARTERIAL_VOLUME)
+
+        for row, (case_num, src_path) in enumerate(chunk):
+            n = len(curves[row][0])
+            case_curves = {
+                'C': Curve(mass_fraction=C[row, :n], time=time[row, :n]),
+                'Et': Curve(Et=Et[row, :n], time=time[row, :n]),
+                'Etheta': Curve(Et=Etheta[row, :n], time=theta[row, :n])
+            }
+            for curve_type, curve in case_curves.items():
+                write_curve(wd, curve_type, case_num, curve)
+            if export_csv:
                 save_name = "sim"+str(case_num)+".csv"
-
-                # Save C curve .csv
-                c_curve.to_csv(path.join(C_CURVES_DEST_FOLDER, save_name))
-
-
-                # Create the E curve and save
-                E_curve = E_curve_generator(c_curve, 
-                                            case_params.TIMESTEP_SIZE, 
-                                            case_params.FLOW_RATE)
-                E_curve.to_csv(path.join(wd,'results/E_curves', save_name))
-
-                E_theta = E_theta_generator(E_curve, 
-                                            case_params.ARTERIAL_VOLUME,
-                                            case_params.FLOW_RATE)
-                E_curve.to_csv(path.join(wd, 'results/Etheta_curves', save_name))
-
-
-
-
-
+                for folder, curve_type in (('results/C_curves', 'C'), 
+                                           ('results/E_curves', 'Et'),
+                                           ('results/Etheta_curves', 'Etheta')):
+                    csv_path = path.join(wd, folder, save_name)
+                    case_curves[curve_type].to_frame().to_csv(csv_path)
+                    count_file('bytes_written', csv_path)
+
+            manifest[str(case_num)] = manifest_entry(src_path, 
+                                                     doe.loc[case_num], 
+                                                     export_csv)
+        save_manifest(wd, manifest)
+
+    save_manifest(wd, manifest)
+    print(f"Generated curves for {len(stale)} case(s), "
+          f"{n_skipped} already up to date.")
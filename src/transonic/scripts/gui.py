@@ -1,22 +1,34 @@
 import sys
 import os
+import time
+import threading
 import pandas as pd
-
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QMessageBox
 from PyQt5.uic import loadUi
 from src.transonic.modules.utilities import solve, load_config, get_model_class, load_DOE, create_results_folder
+from src.transonic.modules.batch import run_batch
 from src.transonic.scripts.E_curves import generate_curves
-from PyQt5.QtCore import pyqtSignal
+from src.transonic.modules.profiling import run_profile, activate, stage
+from src.transonic.modules.model_registry import get_spec, model_names
+from PyQt5.QtCore import pyqtSignal, QObject, QThread, QTimer
+
+
+def default_params(model):
+    '''
+    YAML list of the default parameter names of a registered model.
+    '''
+
+    return ''.join(f"\n- '{name}'" for name in get_spec(model).parameters)
+
+
+def default_bounds(model):
+    '''
+    YAML list of the default parameter bounds of a registered model.
+    '''
 
-default_params ={
-    'LFR_DZ_CSTR': '\n- [0.01, 0.99]\n- [0.01, 0.99]',
-    'TANKS_IN_SERIES': '\n- \'n\''
-}
+    return ''.join(f"\n- [{lower}, {upper}]" 
+                   for lower, upper in get_spec(model).bounds)
 
-default_bounds ={
-    'LFR_DZ_CSTR': '\n- [0.01, 0.99]\n- [0.01, 0.99]',
-    'TANKS_IN_SERIES': '\n- [1, \'105\']'
-}
 
 class ConfigSettings(QWidget):
     # Define a signal to emit when the configuration is done
@@ -33,26 +45,27 @@ class ConfigSettings(QWidget):
         
         #Actions
         self.cwd_label.setText(f"CWD: {os.getcwd()}")
+        self.model_select.clear()
+        self.model_select.addItems(model_names())
+        self.model_select.setCurrentText('LFR_DZ_CSTR')
 
         #Initialize variables
         self.tmp_dir = ''
     
     def create_config_file(self):
-        model = self.model_select.currentIndex()
-        if model == 0:
-            model = 'LFR_DZ_CSTR'
-        elif model == 1:
-            model = 'TANKS_IN_SERIES'
+        model = self.model_select.currentText()
          
         self.doe_path  = self.doe_path.displayText()
         self.wd = self.wd.displayText()
         self.input_path = self.input_path.displayText()
 
+        # Entries left out are filled in from the model registry by load_config
+        entries = ''
         if self.default_parameters.isChecked() == True:
-            parameters = default_params[model]
+            entries += f"\n\nparameters:{default_params(model)}"
             
         if self.default_bounds.isChecked() == True: 
-            param_bounds = default_bounds[model]
+            entries += f"\n\nparameter_bounds:{default_bounds(model)}"
 
 
         self.tmp_dir = os.path.join(self.wd, 'tmp')
@@ -62,7 +75,7 @@ class ConfigSettings(QWidget):
 
         try:
             with open(os.path.join((self.tmp_dir),"config.yaml"),"w") as f:
-                f.write(f"model: \'{model}\'\n\ndoe: \'{self.doe_path}\'\n\nwd: \'{self.wd}\'\n\ninput: \'{self.input_path}\'\n\nparameters:{parameters}\n\nparameter_bounds: {param_bounds}")
+                f.write(f"model: \'{model}\'\n\ndoe: \'{self.doe_path}\'\n\nwd: \'{self.wd}\'\n\ninput: \'{self.input_path}\'{entries}")
         except:
             pass
         print("Success! Config file generated")
@@ -95,6 +108,7 @@ class MainWindow(QMainWindow):
         #Buttons
         self.config_button.clicked.connect(self.create_config)
         self.run_button.clicked.connect(self.run_config)
+        self.stop_button.clicked.connect(self.stop_run)
     
     def create_config(self):
         print('Creating config file...')
@@ -108,41 +122,162 @@ class MainWindow(QMainWindow):
 
 
     def run_config(self):
-
-        config_path = self.path_attrs['config_path']
+        config_path = getattr(self, 'path_attrs', {}).get('config_path', '')
     
         if os.path.exists(config_path) == False:
-            self.warning_label.setText(f"Warning: No file found in the provided path: {config_path}")
-        
-        try: 
-            config_data = load_config(config_path)
-            results_dir = create_results_folder(config_data['wd'])
-        except FileNotFoundError:
-            print(f"Error in finding config file.\n")
-            pass
+            self.completion_label.setText(f"Warning: No file found in the "
+                                          f"provided path: {config_path}")
+            return
+
+        # The run happens on a worker thread so the window stays responsive
+        self.run_thread = QThread()
+        self.worker = SolveWorker(config_path)
+        self.worker.moveToThread(self.run_thread)
+        self.run_thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.update_progress)
+        self.worker.case_solved.connect(self.show_case)
+        self.worker.finished.connect(self.run_finished)
+        self.worker.failed.connect(self.run_failed)
+        self.worker.finished.connect(self.run_thread.quit)
+        self.worker.failed.connect(self.run_thread.quit)
+
+        self.run_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.completion_label.setText('')
+        self.status_label.setText('Generating curves...')
+        self.run_thread.start()
+
+    def stop_run(self):
+        self.worker.stop()
+        self.stop_button.setEnabled(False)
+        self.status_label.setText('Stopping once the running case(s) finish...')
+
+    def update_progress(self, done, total, eta):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+        minutes, seconds = divmod(int(round(eta)), 60)
+        hours, minutes = divmod(minutes, 60)
+        self.eta_text = (f"{done}/{total} cases solved, "
+                         f"ETA {hours:d}:{minutes:02d}:{seconds:02d}")
+
+    def show_case(self, id, params):
+        params = ', '.join(f"{p:.4g}" for p in params)
+        self.status_label.setText(f"{getattr(self, 'eta_text', '')}\n"
+                                  f"Case {id}: [{params}]")
+
+    def run_finished(self, results_path, stopped):
+        self.run_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        state = 'Stopped early! Partial results' if stopped else 'Results created!'
+        self.completion_label.setText(f"{state} They can be found in "
+                                      f"{results_path}")
+
+    def run_failed(self, message):
+        self.run_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.completion_label.setText(f"Error: {message}")
 
-        # Generates the E curves and E_theta curves
-        generate_curves(config_data['wd'], config_data['input'], config_data['doe'])
+    def closeEvent(self, event):
+        # A running solve is stopped and the window closes once its current 
+        # case(s) finish, without blocking the event loop meanwhile
+        if getattr(self, 'run_thread', None) is not None and self.run_thread.isRunning():
+            if not getattr(self, 'close_pending', False):
+                self.close_pending = True
+                self.worker.stop()
+                self.run_thread.finished.connect(self.close)
+                if self.run_thread.isFinished():
+                    # Finished before the connection was made
+                    QTimer.singleShot(0, self.close)
+                self.run_button.setEnabled(False)
+                self.stop_button.setEnabled(False)
+                self.status_label.setText('Closing once the running case(s) '
+                                          'finish...')
+            event.ignore()
+            return
+        super().closeEvent(event)
 
-        # Grabs the desired model class specified in config file
-        model_class = get_model_class(config_data)
 
-        # Load design of experiments document
-        doe = load_DOE(config_data['doe'])
+class SolveWorker(QObject):
+    """
+    Runs a config file (curve generation and solve) away from the Qt event 
+    loop. MainWindow moves it to a QThread and listens to its signals.
 
-        # Solve for the given system
-        summary_df = solve(doe, config_data, results_dir, model_class)
-        
-        # Save results to specified results folder in config file
-        summary_df.to_csv(os.path.join(results_dir, 'eval_outputs.csv'))
-        print(f"Results created! They can be found in {results_dir}/eval_outputs.csv\n")
+    Signals:
+    - progress(done, total, eta) : after every solved case, with the estimated
+      seconds left based on the average time per case so far
+    - case_solved(id, params) : the case number and its fitted parameters
+    - finished(results_path, stopped) : path of eval_outputs.csv (the 
+      results folder for a model comparison) and whether the run was stopped
+      early
+    - failed(message) : the run raised an exception
+    """
 
-        
+    progress = pyqtSignal(int, int, float)
+    case_solved = pyqtSignal(int, list)
+    finished = pyqtSignal(str, bool)
+    failed = pyqtSignal(str)
 
+    def __init__(self, config_path):
+        super().__init__()
+        self.config_path = config_path
+        self._stop = threading.Event()
 
+    def stop(self):
+        '''
+        Requests the run to stop. Thread safe, the solve loop checks it between
+        cases.
+        '''
 
+        self._stop.set()
+
+    def report(self, done, total, id, params):
+        # The ETA of the cases left from the average time per case so far
+        elapsed = time.perf_counter() - self._start
+        self.progress.emit(done, total, elapsed / done * (total - done))
+        self.case_solved.emit(int(id), [float(p) for p in params])
+
+    def run(self):
+        try:
+            config_data = load_config(self.config_path)
+            results_dir = create_results_folder(config_data['wd'])
+
+            # A model comparison is solved as a batch of one run per model, 
+            # each writing to its own folder in results_dir
+            if config_data.get('models'):
+                self._start = time.perf_counter()
+                run_batch([self.config_path], progress_callback=self.report,
+                          should_stop=self._stop.is_set)
+                self.finished.emit(results_dir, self._stop.is_set())
+                return
+
+            # Generates the E curves and E_theta curves
+            profile = run_profile(config_data)
+            with activate(profile), stage('generate_curves'):
+                generate_curves(config_data['wd'], config_data['input'], 
+                                config_data['doe'],
+                                export_csv=config_data.get('export_csv', False))
+
+            # Grabs the desired model class specified in config file
+            model_class = get_model_class(config_data)
+
+            # Load design of experiments document
+            doe = load_DOE(config_data['doe'])
+
+            # Solve for the given system
+            self._start = time.perf_counter()
+            summary_df = solve(doe, config_data, results_dir, model_class,
+                               progress_callback=self.report, 
+                               should_stop=self._stop.is_set, profile=profile)
+
+            # Save results to specified results folder in config file
+            results_path = os.path.join(results_dir, 'eval_outputs.csv')
+            summary_df.to_csv(results_path)
+            print(f"Results created! They can be found in {results_path}\n")
+            self.finished.emit(results_path, self._stop.is_set())
+        except Exception as e:
+            self.failed.emit(f"{type(e).__name__}: {e}")
 
-            
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
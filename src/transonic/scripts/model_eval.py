@@ -1,11 +1,11 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import os.path as path
 import numpy as np
 
-from sklearn.metrics import mean_absolute_error
-from scipy.stats import shapiro, normaltest, anderson
 from src.transonic.modules.utilities import *
+from src.transonic.modules.fit_grid import build_fit_grid
+from src.transonic.modules.plotter import plot_fit
+from src.transonic.modules.uncertainty import interval_columns
 
 
 def calculate_relative_absolute_error(S_true, S_pred):
@@ -40,7 +40,7 @@ def calculate_mean_absolute_error(S_true, S_pred):
     if len(S_true) != len(S_pred):
         raise ValueError('Cannot perform RAE on sequences of different length.')
 
-    return mean_absolute_error(S_true, S_pred)
+    return np.mean(np.abs(np.asarray(S_true) - np.asarray(S_pred)))
 
 
 def residual_analysis(S_true, S_pred):
@@ -57,7 +57,12 @@ def residual_analysis(S_true, S_pred):
     return mu, sigma
 
 
-def fit_model(model_class, model_name, system_attr, config):
+def build_model(model_class, model_name, system_attr, config, 
+                initial_guess=None):
+    '''
+    Creates an unfitted model instance for a system.
+    '''
+
     attrs = system_attr.X
 
     if model_name=='TAYLOR_DISPERSION':
@@ -66,14 +71,96 @@ def fit_model(model_class, model_name, system_attr, config):
         C0=1
 
 
-    model_instance = model_class(
+    return model_class(
         attrs.TIMESTEP_SIZE, 
         attrs.tau, 
         C0=C0,
-        bounds=config['parameter_bounds']
+        bounds=config['parameter_bounds'],
+        initial_guess=initial_guess
     )
 
-    model_instance.fit(system_attr.C.time, system_attr.C.mass_fraction)
+
+# Optional config entries of the fit strategy and the Model.fit argument each
+# one sets
+FIT_STRATEGY = {'fit_popsize': 'popsize',
+                'fit_maxiter': 'maxiter',
+                'fit_tol': 'tol',
+                'fit_patience': 'patience',
+                'fit_plateau_tol': 'plateau_tol',
+                'fit_starts': 'starts',
+                'fit_restarts': 'restarts',
+                'fit_max_nfev': 'max_nfev'}
+
+SUMMARY_METRICS = ['RAE', 'MAE', 'avg_residual', 'std_of_residual']
+FIT_DIAGNOSTICS = ['nfev', 'nit', 'status']
+
+
+def fit_settings(config):
+    '''
+    Returns the config entries that change the outcome of Model.fit. These
+    are part of the fit cache key, so the fit strategy entries are only
+    included when they are set.
+    '''
+
+    settings = {'vectorized': bool(config.get('vectorized', False)),
+                'method': config.get('fit_method', 'de'),
+                'loss': config.get('fit_loss', 'mse')}
+    settings.update({argument: config[key] 
+                     for key, argument in FIT_STRATEGY.items() if key in config})
+    return settings
+
+
+def fit_workers(config):
+    '''
+    Returns the Model.fit arguments that only change how fast a fit runs.
+    '''
+
+    return {'start_workers': int(config.get('fit_start_workers', 1))}
+
+
+def fit_grid_settings(config):
+    '''
+    Returns the config entries that select the fit grid, empty for the full
+    grid so existing fit cache keys stay valid.
+    '''
+
+    method = config.get('fit_grid', 'full')
+    if method == 'full':
+        return {}
+    return {'fit_grid': method, 
+            'fit_grid_points': int(config.get('fit_grid_points', 500))}
+
+
+def fit_data(system_attr, config):
+    '''
+    Returns the data a case is fitted on.
+
+    Parameters:
+    - system_attr : the System of the case
+    - config : the loaded config file, whose optional 'fit_grid' (one of
+      FIT_GRID_METHODS) and 'fit_grid_points' entries select a fit grid
+
+    Returns:
+    - tuple : (xdata, ytrue, weights) with weights None on the full grid
+    '''
+
+    time = system_attr.C.time
+    C = system_attr.C.mass_fraction
+    settings = fit_grid_settings(config)
+    if not settings:
+        return time, C, None
+
+    indices, weights = build_fit_grid(time, C, settings['fit_grid'], 
+                                      settings['fit_grid_points'])
+    return time[indices], C[indices], weights
+
+
+def fit_model(model_class, model_name, system_attr, config):
+    model_instance = build_model(model_class, model_name, system_attr, config)
+
+    xdata, ytrue, weights = fit_data(system_attr, config)
+    model_instance.fit(xdata, ytrue, weights=weights, **fit_settings(config),
+                       **fit_workers(config))
     
     return model_instance
 
@@ -99,38 +186,46 @@ def generate_model_summary(system_attrs):
     return [RAE, MAE, mean_residual, std_deviation_of_residuals]
 
 
+def summary_columns(parameters, intervals=False):
+    # Columns of eval_outputs.csv, with the confidence interval of every 
+    # parameter last when the config enables them
+    columns = [*parameters, *SUMMARY_METRICS, *FIT_DIAGNOSTICS]
+    if intervals:
+        columns += interval_columns(parameters)
+    return columns
+
+
 def append_model_summary(summary_df, id, metrics, model_instance):
     new_row = model_instance.params
-    new_row = np.append(new_row, metrics, axis=0)
-    summary_df.loc[id] = new_row.tolist()
+    new_row = np.append(new_row, metrics, axis=0).tolist()
+    diagnostics = getattr(model_instance, 'diagnostics', None) or {}
+    new_row += [diagnostics.get(key) for key in FIT_DIAGNOSTICS]
+    intervals = getattr(model_instance, 'intervals', None)
+    if intervals is not None:
+        new_row += np.ravel(intervals).tolist()
+    summary_df.loc[id] = new_row
     return summary_df
 
 
-def visualize_fit(system_attrs, results_folder):
-    # Visualize each fitted line
-    plt.figure()
-    plt.plot(system_attrs.C.time, system_attrs.C.mass_fraction, label='CFD')
-    plt.plot(
-            system_attrs.C_pred.time, 
-            system_attrs.C_pred.mass_fraction, 
-            label='Predicted', 
-            linestyle='--'
-    )
+def fit_labels(system_attrs):
+    '''
+    Returns the (figure title, file stem) of a case.
+    '''
 
     title = (f'Q={system_attrs.X.FLOW_RATE} mL/s,'
         + f'%DS={system_attrs.X.PERC_DS},' 
         + f'SRA={system_attrs.X.RAMP_ANGLE}\u00B0'
     )
-    
-    plt.title(title)
-    plt.legend()
-    plt.xlabel('Normalized Time')
-    plt.ylabel('Normalized E(t)')
+    name = f'Q{system_attrs.X.FLOW_RATE}_DS{system_attrs.X.PERC_DS}_SRA{system_attrs.X.RAMP_ANGLE}'
+    return title, name
 
-    file_name = f'Q{system_attrs.X.FLOW_RATE}_DS{system_attrs.X.PERC_DS}_SRA{system_attrs.X.RAMP_ANGLE}.png'
 
-    plt.savefig(path.join(results_folder, file_name))
-    plt.close()
+def visualize_fit(system_attrs, results_folder, dpi=300, fmt='png'):
+    # Visualize a single fitted line, solve defers this to the plot stage
+    title, name = fit_labels(system_attrs)
+    plot_fit(path.join(results_folder, f'{name}.{fmt}'), title,
+             system_attrs.C.time, system_attrs.C.mass_fraction,
+             system_attrs.C_pred.mass_fraction, dpi)
 
 
 
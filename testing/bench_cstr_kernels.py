@@ -0,0 +1,81 @@
+import time
+import numpy as np
+from scipy.special import expi
+from src.transonic.modules.cstr_kernels import cstr_outlet, cstr_gradient
+from testing.synthetic import DT, TAU
+from testing.test_cstr_kernels import unscaled_outlet
+
+'''
+Microbenchmark of the CSTR kernels against the unscaled expressions the LFR ->
+CSTR models evaluated before modules/cstr_kernels.py, for LFR_DZ_CSTR
+parameters: one parameter set at a time, as least squares and the serial
+differential evolution evaluate them, and a whole population, as the
+vectorized differential evolution does. Run from the repository root with
+
+    PYTHONPATH=. python testing/bench_cstr_kernels.py
+'''
+
+N_POINTS = 11740
+POPULATION = 30
+
+
+def unscaled_gradient(t, m, n, t0):
+    '''
+    The partial derivatives of unscaled_outlet with respect to m, n and t0.
+    '''
+
+    F = lambda x: np.exp(m*x)*(m*x + 1)/x**2 - m**2*expi(m*x)
+    F_m = lambda x: 2*np.exp(m*x)/x - 2*m*expi(m*x)
+    decay = 1/np.exp(m*t)
+    dC_dn = 0.5*decay*(F(t0) - F(t))
+    dC_dm = -t*n*dC_dn + 0.5*n*decay*(F_m(t0) - F_m(t))
+    dC_dt0 = -n*np.exp(m*t0)*decay/t0**3
+    return [np.where(t < t0, 0, d) for d in (dC_dm, dC_dn, dC_dt0)]
+
+
+def paired_times(legacy, kernel, repeat=15):
+    '''
+    Median wall times of legacy and kernel in seconds, called alternately so
+    both see the same machine load.
+    '''
+
+    times = []
+    for _ in range(repeat):
+        pair = []
+        for function in (legacy, kernel):
+            start = time.perf_counter()
+            function()
+            pair.append(time.perf_counter() - start)
+        times.append(pair)
+    return np.median(times, axis=0)
+
+
+def kernel_args(a, b):
+    # m, n and t0 of LFR_DZ_CSTR with C0 = 1
+    m = 1 / (b*TAU)
+    return m, (a*TAU)**2 * DT / 2 / (b*TAU), a*TAU/2
+
+
+def main():
+    t = np.arange(N_POINTS) * DT
+    rng = np.random.default_rng(0)
+    a, b = rng.uniform(0.01, 0.99, size=(2, POPULATION, 1))
+    cases = [('typical', kernel_args(0.85, 0.12)),
+             ('small CSTR', kernel_args(0.3, 0.02)),
+             (f'population of {POPULATION}', kernel_args(a, b))]
+
+    print(f"{'kernel':<10}{'parameters':<20}{'legacy ms':>12}{'ms':>10}"
+          f"{'speedup':>10}")
+    for name, args in cases:
+        for kernel, legacy in ((cstr_outlet, unscaled_outlet),
+                               (cstr_gradient, unscaled_gradient)):
+            with np.errstate(all='ignore'):
+                legacy_time, new_time = paired_times(
+                    lambda: legacy(t, *args), lambda: kernel(t, *args))
+            print(f"{kernel.__name__[5:]:<10}{name:<20}"
+                  f"{1e3 * legacy_time:>12.2f}{1e3 * new_time:>10.2f}"
+                  f"{legacy_time / new_time:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_squared_error
+from src.transonic.modules.objective import Objective
+from src.transonic.models.LFR_DZ_CSTR import LFR_DZ_CSTR
+from src.transonic.models.LFR_CSTR_DZ_BYPASS import LFR_CSTR_DZ_BYPASS
+from src.transonic.models.TAYLOR_DISPERSION import TAYLOR_DISPERSION
+from src.transonic.models.TANKS_IN_SERIES import TANKS_IN_SERIES
+from testing.synthetic import DT, TAU
+
+'''
+Microbenchmark of the objective evaluated by differential evolution. The
+legacy path is what each model's objective used to do: sklearn's
+mean_squared_error on the pandas Series taken straight from System.C. The new
+path is one Objective per fit working on contiguous arrays and preallocated
+buffers. Run from the repository root with
+
+    PYTHONPATH=. python testing/bench_objective.py
+'''
+
+N_POINTS = 11740
+
+
+def legacy_objective(model, params, xdata, ytrue):
+    return mean_squared_error(ytrue, model.function(xdata, *params))
+
+
+def evaluations_per_second(evaluate, population, min_time=1.0):
+    '''
+    Evaluates a population repeatedly for at least min_time seconds.
+    '''
+
+    n_evals, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min_time:
+        for params in population:
+            evaluate(params)
+        n_evals += len(population)
+    return n_evals / (time.perf_counter() - start)
+
+
+def main():
+    t = pd.Series(np.arange(N_POINTS) * DT, name='time')
+    cases = [(LFR_DZ_CSTR(DT, TAU, bounds=[[0.01, 0.99]] * 2), (0.85, 0.12)),
+             (LFR_CSTR_DZ_BYPASS(DT, TAU, bounds=[[0.01, 0.99]] * 3),
+              (0.3, 0.4, 0.6)),
+             (TAYLOR_DISPERSION(DT, TAU, C0=1, bounds=[[0.1, 100], [0.001, 10]]),
+              (30, 0.2)),
+             (TANKS_IN_SERIES(DT, TAU, bounds=[[1, 50]]), (3.5,))]
+
+    rng = np.random.default_rng(0)
+    print(f"{'model':<22}{'loss':<10}{'legacy evals/s':>16}{'evals/s':>12}"
+          f"{'speedup':>10}")
+    for model, params in cases:
+        y = model.function(t.to_numpy(), *params)
+        y = pd.Series(y * (1 + 0.01 * rng.standard_normal(N_POINTS)),
+                      name='mass_fraction')
+
+        bounds = np.asarray(model.bounds, dtype=float)
+        population = rng.uniform(bounds[:, 0], bounds[:, 1],
+                                 size=(20, len(bounds)))
+
+        legacy = evaluations_per_second(
+            lambda p: legacy_objective(model, p, t, y), population)
+        for loss in ('mse', 'mae', 'log'):
+            objective = Objective(model, t, y, loss=loss)
+            lean = evaluations_per_second(objective, population)
+            print(f"{type(model).__name__:<22}{loss:<10}{legacy:>16.0f}"
+                  f"{lean:>12.0f}{lean / legacy:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+import argparse
+import json
+import os.path as path
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from src.transonic.modules.objective import Objective
+from src.transonic.modules.system_class import System
+from src.transonic.modules.utilities import (
+    create_results_folder,
+    get_model_class,
+    load_DOE,
+    solve
+)
+from src.transonic.scripts.E_curves import generate_curves
+from testing.bench_objective import evaluations_per_second
+from testing.synthetic import (
+    MODEL_CASES,
+    synthetic_doe,
+    synthetic_model,
+    synthetic_curve,
+    synthetic_study
+)
+
+'''
+Benchmark suite of the solve pipeline, from the model kernels to end-to-end
+solves of synthetic studies. Run from the repository root with
+
+    PYTHONPATH=. python testing/bench_suite.py [groups ...] [--cases N]
+
+where the groups are models, objective, fit, io and solve (default all).
+Every benchmark is reported in seconds per operation, next to the objective
+evaluations each fit took. --save writes them to a JSON file and --compare
+checks a run against such a baseline, exiting with 1 when a benchmark got
+slower by more than --threshold.
+'''
+
+GROUPS = ('models', 'objective', 'fit', 'io', 'solve')
+EXAMPLE = 'examples/stenosed_tube'
+EXAMPLE_CASE = 241
+
+
+def timed(function, repeat=3):
+    '''
+    Median wall time of repeat calls of function, in seconds.
+    '''
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def example_case(model_name, rng):
+    '''
+    A model built for case EXAMPLE_CASE of a synthetic DOE, its parameter
+    vector and a noisy curve on the full N_POINTS grid.
+    '''
+
+    case_params = synthetic_doe(1, first_case=EXAMPLE_CASE).loc[EXAMPLE_CASE]
+    t, y, params = synthetic_curve(model_name, case_params, rng)
+    return synthetic_model(model_name, case_params), params, t, y
+
+
+def bench_models(results, args):
+    rng = np.random.default_rng(0)
+    for model_name in args.models:
+        model, params, t, _ = example_case(model_name, rng)
+        rate = evaluations_per_second(lambda p: model.function(t, *p),
+                                      [params], args.min_time)
+        results[f'models.{model_name}.function'] = 1 / rate
+
+
+def bench_objective(results, args):
+    rng = np.random.default_rng(0)
+    for model_name in args.models:
+        model, _, t, y = example_case(model_name, rng)
+        bounds = np.asarray(model.bounds, dtype=float)
+        population = rng.uniform(bounds[:, 0], bounds[:, 1],
+                                 size=(20, len(bounds)))
+
+        objective = Objective(model, t, y)
+        rate = evaluations_per_second(objective, population, args.min_time)
+        results[f'objective.{model_name}.call'] = 1 / rate
+
+        # One batch call scores the whole population at once
+        batch = evaluations_per_second(objective.batch, [population.T],
+                                       args.min_time)
+        results[f'objective.{model_name}.batch_per_row'] = (
+            1 / (batch * len(population)))
+
+
+def bench_fit(results, args):
+    rng = np.random.default_rng(0)
+    for model_name in args.models:
+        model, _, t, y = example_case(model_name, rng)
+        results[f'fit.{model_name}'] = timed(lambda: model.fit(t, y),
+                                             args.repeat)
+        results[f'fit.{model_name}.nfev'] = model.diagnostics['nfev']
+
+
+def time_io(results, name, wd, config, repeat):
+    '''
+    Times a forced regeneration of every curve of a study and loading the
+    System of every case.
+    '''
+
+    doe = load_DOE(config['doe'])
+    results[f'io.{name}.generate_curves'] = timed(
+        lambda: generate_curves(wd, config['input'], config['doe'],
+                                force=True), repeat)
+
+    def load_systems():
+        for id in doe.index:
+            S = System(id, wd)
+            S.get_system_characteristics(doe)
+    results[f'io.{name}.load_system'] = timed(load_systems,
+                                              repeat) / len(doe)
+
+
+def bench_io(results, args, tmp):
+    # The example is read in place and its curves written to a scratch wd
+    example = {'doe': path.join(EXAMPLE, 'DOE.csv'),
+               'input': path.join(EXAMPLE, 'raw_data', 'C_curves')}
+    wd = path.join(tmp, 'example')
+    create_results_folder(wd)
+    time_io(results, 'example', wd, example, args.repeat)
+
+    config = synthetic_study(path.join(tmp, 'io'), args.cases)
+    time_io(results, f'synthetic_{args.cases}', config['wd'], config,
+            args.repeat)
+
+
+def bench_solve(results, args, tmp):
+    config = synthetic_study(path.join(tmp, 'solve'), args.cases,
+                             model_name=args.solve_model)
+    config.pop('true_params')
+    generate_curves(config['wd'], config['input'], config['doe'])
+    doe = load_DOE(config['doe'])
+    model_class = get_model_class(config)
+    results_dir = create_results_folder(config['wd'])
+
+    seconds = timed(lambda: solve(doe, config, results_dir, model_class,
+                                  workers=args.workers, use_cache=False),
+                    args.repeat)
+    name = f'solve.{args.solve_model}.{args.cases}_cases'
+    results[name] = seconds
+    results[f'{name}.per_case'] = seconds / args.cases
+
+
+def compare(results, baseline_path, threshold):
+    '''
+    Prints every benchmark against a saved baseline.
+
+    Returns:
+    - list : names of the benchmarks slower than the baseline by more than
+      threshold (relative)
+    '''
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\n{'benchmark':<50}{'baseline':>12}{'now':>12}{'change':>10}")
+    regressions = []
+    for name, value in results.items():
+        if name not in baseline or name.endswith('.nfev'):
+            continue
+        change = value / baseline[name] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  slower'
+        print(f"{name:<50}{baseline[name]:>12.4g}{value:>12.4g}"
+              f"{change:>10.1%}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmarks of the TRANSONIC solve pipeline.')
+    parser.add_argument('groups', nargs='*', metavar='group',
+                        help=f'any of {GROUPS}, default all')
+    parser.add_argument('--models', nargs='+', default=list(MODEL_CASES),
+                        choices=list(MODEL_CASES))
+    parser.add_argument('--cases', type=int, default=30,
+                        help='cases of the synthetic io and solve studies')
+    parser.add_argument('--solve-model', default='TANKS_IN_SERIES',
+                        choices=list(MODEL_CASES))
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help='seconds each throughput benchmark runs for')
+    parser.add_argument('--save', help='write the results to a JSON file')
+    parser.add_argument('--compare', help='JSON baseline to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown reported as a regression')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    unknown = set(args.groups) - set(GROUPS)
+    if unknown:
+        raise ValueError(f"Unknown benchmark group(s) {sorted(unknown)}, "
+                         f"expected any of {GROUPS}")
+    results = {}
+    tmp = tempfile.mkdtemp(prefix='transonic_bench_')
+    try:
+        for group in args.groups or GROUPS:
+            start = time.perf_counter()
+            # The dispersion models divide by t = 0 on purpose
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if group in ('io', 'solve'):
+                    globals()[f'bench_{group}'](results, args, tmp)
+                else:
+                    globals()[f'bench_{group}'](results, args)
+            print(f"{group} done in {time.perf_counter() - start:.1f} s")
+    finally:
+        shutil.rmtree(tmp)
+
+    print(f"\n{'benchmark':<50}{'seconds':>12}")
+    for name, value in results.items():
+        print(f"{name:<50}{value:>12.4g}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare and compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
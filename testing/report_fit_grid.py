@@ -0,0 +1,98 @@
+import argparse
+import time
+import numpy as np
+from src.transonic.modules.utilities import load_config, load_DOE, get_model_class
+from src.transonic.modules.system_class import System
+from src.transonic.modules.fit_grid import FIT_GRID_METHODS
+from src.transonic.scripts.model_eval import build_model, fit_data, fit_settings
+from src.transonic.scripts.E_curves import generate_curves
+
+'''
+Accuracy vs speed report of the fit grids. Every case of each config is fitted
+on the full curve and on every fit grid, and the grid fits are scored on the
+full-resolution curve. Run from the repository root with
+
+    PYTHONPATH=. python testing/report_fit_grid.py [configs ...]
+
+which defaults to the stenosed tube example configs.
+'''
+
+EXAMPLE_CONFIGS = ['examples/stenosed_tube/TIS.yaml',
+                   'examples/stenosed_tube/TAYLOR_DISPERSION.yaml',
+                   'examples/stenosed_tube/LFR_DZ_CSTR.yaml']
+
+
+def fit_case(model_class, S, config):
+    '''
+    Fits a case as solve_case does and returns (params, full-resolution MSE,
+    number of fitted points, fit time in seconds).
+    '''
+
+    model_instance = build_model(model_class, None, S, config)
+    xdata, ytrue, weights = fit_data(S, config)
+    start = time.perf_counter()
+    model_instance.fit(xdata, ytrue, weights=weights, **fit_settings(config))
+    elapsed = time.perf_counter() - start
+
+    residual = model_instance.predict(S.C.time) - S.C.mass_fraction
+    return (np.asarray(model_instance.params, dtype=float),
+            float(np.mean(residual**2)), len(xdata), elapsed)
+
+
+def report(config_path, methods, n_points, max_cases=None):
+    config = load_config(config_path)
+    doe = load_DOE(config['doe'])
+    generate_curves(config['wd'], config['input'], config['doe'])
+    model_class = get_model_class(config)
+
+    bounds = np.asarray(config['parameter_bounds'], dtype=float)
+    rows = {method: [] for method in methods}
+    degenerate = []
+    for id in list(doe.index)[:max_cases]:
+        S = System(id, config['wd'])
+        S.get_system_characteristics(doe)
+
+        params, mse, N, elapsed = fit_case(model_class, S, config)
+        # A full fit stuck on the bounds has no optimum for a grid to preserve
+        if np.any(np.isclose(params[:, np.newaxis], bounds, rtol=1e-3)):
+            degenerate.append(id)
+            continue
+        for method in methods:
+            grid_config = {**config, 'fit_grid': method,
+                           'fit_grid_points': n_points}
+            g_params, g_mse, g_N, g_elapsed = fit_case(model_class, S,
+                                                       grid_config)
+            rows[method].append((N / g_N, elapsed / g_elapsed,
+                                 g_mse / mse - 1,
+                                 np.max(np.abs(g_params / params - 1))))
+
+    print(f"\n{config['model']} ({len(rows[methods[0]])} cases, "
+          f"{n_points} target points)")
+    if degenerate:
+        print(f"Skipped case(s) {degenerate}, whose full fit ends on a "
+              f"parameter bound.")
+    print(f"{'grid':<12}{'point reduction':>16}{'fit speedup':>13}"
+          f"{'median dMSE':>13}{'max dMSE':>11}{'max dparam':>12}")
+    for method, values in rows.items():
+        reduction, speedup, d_mse, d_param = np.array(values).T
+        print(f"{method:<12}{np.mean(reduction):>15.1f}x{np.mean(speedup):>12.1f}x"
+              f"{np.median(d_mse):>13.2%}{np.max(d_mse):>11.2%}"
+              f"{np.max(d_param):>12.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit grid accuracy vs speed '
+                                     'report.')
+    parser.add_argument('configs', nargs='*', default=EXAMPLE_CONFIGS)
+    parser.add_argument('--points', type=int, default=500)
+    parser.add_argument('--cases', type=int, default=None, help='Only report '
+                        'the first CASES cases of the DOE.')
+    args = parser.parse_args()
+
+    methods = [m for m in FIT_GRID_METHODS if m != 'full']
+    for config_path in args.configs:
+        report(config_path, methods, args.points, args.cases)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import os
+import os.path as path
+import numpy as np
+import pandas as pd
+import yaml
+from src.transonic.modules.utilities import get_model_class
+
+'''
+Synthetic stenosed tube studies for benchmarks and tests. A study is a DOE,
+one Fluent style simNNN_tracer_conc.out file per case, computed from a model
+with jittered parameters plus multiplicative noise, and a config to solve it,
+so the pipeline can be timed on any number of cases.
+'''
+
+# Samples per curve and flow time in spacetimes of the stenosed tube example
+N_POINTS = 11740
+N_SPACETIMES = 5
+ARTERIAL_VOLUME = 6.76254e-07
+# Time step and spacetime of case 241 of the stenosed tube example
+DT = 7.20006e-05
+TAU = ARTERIAL_VOLUME / 4e-6
+
+# Parameter names, bounds and a realistic parameter vector of each model
+MODEL_CASES = {
+    'TANKS_IN_SERIES': (['n'], [[1, 50]], (3.5,)),
+    'TAYLOR_DISPERSION': (['Pe', 'tau'], [[0.1, 100], [0.001, 10]], (30, 0.2)),
+    'LFR_DZ_CSTR': (['alpha', 'beta'], [[0.01, 0.99]] * 2, (0.85, 0.12)),
+    'LFR_CSTR_DZ_BYPASS': (['alpha', 'beta', 'gamma'],
+                           [[0.075, 0.95], [0.075, 0.95], [0.05, 0.95]],
+                           (0.3, 0.4, 0.6)),
+    'LFR_CSTR_PFR_PARALLEL': (['alpha', 'beta', 'gamma'], [[0, 1]] * 3,
+                              (0.3, 0.4, 0.6)),
+    'DOUBLE_DISPERSION': (['Pe1', 'Pe2', 'tau1', 'tau2'],
+                          [[0.1, 100], [0.1, 100], [0.001, 10], [0.001, 10]],
+                          (30, 10, 0.1, 0.3)),
+}
+
+
+def case_time(dt: float, n_points=N_POINTS) -> np.ndarray:
+    return np.arange(n_points) * dt
+
+
+def synthetic_doe(n_cases: int, n_points=N_POINTS, first_case=1,
+                  seed=0) -> pd.DataFrame:
+    '''
+    Random design of experiments with the columns of the stenosed tube DOE.
+
+    Parameters:
+    - n_cases : number of cases
+    - n_points : time steps of every case
+    - first_case : CASE_NUM of the first case
+    - seed : seed of the random generator
+
+    Returns:
+    - pd.DataFrame : indexed by CASE_NUM. Every case is simulated for
+      N_SPACETIMES spacetimes, like the example data.
+    '''
+
+    rng = np.random.default_rng(seed)
+    flow_rate = rng.choice(np.arange(2, 5.25, 0.25), n_cases)
+    volume = ARTERIAL_VOLUME * rng.uniform(0.8, 1.2, n_cases)
+    tau = volume / (flow_rate * 10**-6)
+
+    doe = pd.DataFrame({
+        'COHORT': 1,
+        'GEOMETRY': rng.integers(1, 20, n_cases),
+        'FLOW_RATE': flow_rate,
+        'PERC_DS': rng.choice([50, 60, 70], n_cases),
+        'RAMP_ANGLE': rng.choice([30, 45, 60], n_cases),
+        'VISCOUS_MODEL': 'TURBULENT',
+        'ARTERIAL_VOLUME': volume,
+        'TIMESTEP_SIZE': N_SPACETIMES * tau / n_points,
+        'NO_TIMESTEPS': float(n_points),
+    }, index=pd.RangeIndex(first_case, first_case + n_cases, name='CASE_NUM'))
+    doe['VISCOUS_MODEL'] = doe.VISCOUS_MODEL.astype('string')
+    return doe
+
+
+def synthetic_model(model_name: str, case_params: pd.Series):
+    '''
+    Model instance for one DOE row, built the way build_model does.
+    '''
+
+    tau = case_params.ARTERIAL_VOLUME / case_params.FLOW_RATE / 10**-6
+    C0 = 1
+    if model_name == 'TAYLOR_DISPERSION':
+        C0 = (case_params.FLOW_RATE * 10**-6 * case_params.TIMESTEP_SIZE
+              / case_params.ARTERIAL_VOLUME)
+    return get_model_class({'model': model_name})(
+        case_params.TIMESTEP_SIZE, tau, C0=C0,
+        bounds=MODEL_CASES[model_name][1])
+
+
+def synthetic_curve(model_name: str, case_params: pd.Series, rng,
+                    jitter=0.1, noise=0.01) -> tuple:
+    '''
+    Concentration curve of one case.
+
+    Parameters:
+    - model_name : one of MODEL_CASES
+    - case_params : DOE row of the case
+    - rng : np.random.Generator
+    - jitter : relative spread of the parameters around those of MODEL_CASES
+    - noise : relative standard deviation of the multiplicative noise
+
+    Returns:
+    - tuple : (time, mass_fraction, params)
+    '''
+
+    model = synthetic_model(model_name, case_params)
+    _, bounds, params = MODEL_CASES[model_name]
+    bounds = np.asarray(bounds, dtype=float)
+    params = np.asarray(params, dtype=float)
+    params = np.clip(params * rng.uniform(1 - jitter, 1 + jitter, len(params)),
+                     bounds[:, 0], bounds[:, 1])
+
+    time = case_time(case_params.TIMESTEP_SIZE, int(case_params.NO_TIMESTEPS))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mass_fraction = np.nan_to_num(model.function(time, *params))
+    mass_fraction *= 1 + noise * rng.standard_normal(len(time))
+    return time, np.clip(mass_fraction, 0, None), params
+
+
+def write_tracer_file(folder: str, case_num, time, mass_fraction) -> str:
+    '''
+    Writes a curve in the format of Fluent's simNNN_tracer_conc.out files.
+    '''
+
+    file_path = path.join(folder, f'sim{case_num}_tracer_conc.out')
+    np.savetxt(file_path,
+               np.column_stack([np.arange(len(time)), mass_fraction, time]),
+               fmt=['%d', '%.17g', '%.17g'])
+    return file_path
+
+
+def synthetic_study(wd: str, n_cases: int, model_name='LFR_DZ_CSTR',
+                    n_points=N_POINTS, noise=0.01, seed=0) -> dict:
+    '''
+    Writes a complete study to wd: DOE.csv, the tracer files in
+    raw_data/C_curves and config.yaml.
+
+    Parameters:
+    - wd : folder of the study, created if needed
+    - n_cases : number of cases
+    - model_name : model the curves are computed from and fitted with
+    - n_points : samples per curve
+    - noise : relative standard deviation of the multiplicative noise
+    - seed : seed of the DOE and the curves
+
+    Returns:
+    - dict : the config of the study, whose 'true_params' entry holds
+      {case number: parameters the curve was computed from}
+    '''
+
+    input_dir = path.join(wd, 'raw_data', 'C_curves')
+    os.makedirs(input_dir, exist_ok=True)
+
+    doe = synthetic_doe(n_cases, n_points, seed=seed)
+    doe.to_csv(path.join(wd, 'DOE.csv'))
+
+    rng = np.random.default_rng(seed + 1)
+    true_params = {}
+    for case_num, case_params in doe.iterrows():
+        time, mass_fraction, params = synthetic_curve(model_name, case_params,
+                                                      rng, noise=noise)
+        write_tracer_file(input_dir, case_num, time, mass_fraction)
+        true_params[int(case_num)] = params.tolist()
+
+    parameters, bounds, _ = MODEL_CASES[model_name]
+    config = {'model': model_name,
+              'doe': path.join(wd, 'DOE.csv'),
+              'wd': wd,
+              'input': input_dir,
+              'parameters': parameters,
+              'parameter_bounds': bounds,
+              'plots': 'none'}
+    with open(path.join(wd, 'config.yaml'), 'w') as f:
+        yaml.safe_dump(config, f)
+
+    return {**config, 'true_params': true_params}
@@ -0,0 +1,64 @@
+import os.path as path
+import tempfile
+import unittest
+from src.transonic.modules.batch import expand_config_paths, expand_sweep
+
+SWEEP_CONFIG = """
+model: 'TAYLOR_DISPERSION'
+doe: 'DOE.csv'
+wd: '.'
+input: 'C_curves'
+parameters: ['Pe', 'tau']
+parameter_bounds:
+- [0.1, 100]
+- [0.001, INF]
+sweep:
+- name: wide
+- parameter_bounds:
+  - [1, 50]
+  - [0.01, 5]
+- name: tis
+  model: 'TANKS_IN_SERIES'
+  parameters: ['n']
+  parameter_bounds:
+  - [1, INF]
+"""
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config_path = path.join(self.tmp.name, 'taylor.yaml')
+        with open(self.config_path, 'w') as f:
+            f.write(SWEEP_CONFIG)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_expand_sweep(self):
+        runs = expand_sweep(self.config_path)
+        self.assertEqual([name for name, _ in runs],
+                         ['taylor-wide', 'taylor-1', 'taylor-tis'])
+        for _, config in runs:
+            self.assertNotIn('sweep', config)
+            self.assertEqual(config['doe'], 'DOE.csv')
+
+        self.assertEqual(runs[0][1]['parameter_bounds'][1][1], float('inf'))
+        self.assertEqual(runs[1][1]['parameter_bounds'], [[1, 50], [0.01, 5]])
+        self.assertEqual(runs[2][1]['model'], 'TANKS_IN_SERIES')
+        self.assertEqual(runs[2][1]['parameter_bounds'], [[1, float('inf')]])
+
+    def test_expand_config_paths(self):
+        other = path.join(self.tmp.name, 'a.yaml')
+        open(other, 'w').close()
+        pattern = path.join(self.tmp.name, '*.yaml')
+
+        self.assertEqual(expand_config_paths([self.config_path, pattern]),
+                         [self.config_path, other])
+        with self.assertRaises(FileNotFoundError):
+            expand_config_paths([path.join(self.tmp.name, '*.yml')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.transonic.modules.comparison import (
+    expand_models,
+    information_criteria,
+    compare_models,
+    best_models
+)
+
+
+def summary(avg, std, parameters):
+    summary_df = pd.DataFrame({'avg_residual': avg, 'std_of_residual': std,
+                               **parameters}, index=pd.Index([1, 2],
+                                                             name='CASE_NUM'))
+    return summary_df.reindex(columns=[
+        *parameters, 'avg_residual', 'std_of_residual', 'RAE', 'MAE',
+        'nfev', 'nit', 'status'])
+
+
+class TestComparison(unittest.TestCase):
+
+    def test_expand_models(self):
+        config = {'model': 'TAYLOR_DISPERSION', 'parameters': ['Pe', 'tau'],
+                  'models': [{'model': 'TANKS_IN_SERIES', 'parameters': ['n']},
+                             {'model': 'TAYLOR_DISPERSION'}]}
+        runs = dict(expand_models('study', config))
+        self.assertEqual(list(runs), ['study-TANKS_IN_SERIES',
+                                      'study-TAYLOR_DISPERSION'])
+        self.assertEqual(runs['study-TANKS_IN_SERIES']['parameters'], ['n'])
+        self.assertEqual(runs['study-TAYLOR_DISPERSION']['parameters'],
+                         ['Pe', 'tau'])
+        self.assertTrue(all(c['comparison'] == 'study' and 'models' not in c
+                            for c in runs.values()))
+
+        self.assertEqual(expand_models('study', {'model': 'X'}),
+                         [('study', {'model': 'X'})])
+        with self.assertRaises(ValueError):
+            expand_models('study',
+                          {'models': [{'model': 'TANKS_IN_SERIES'}] * 2})
+
+    def test_information_criteria(self):
+        aic, bic = information_criteria(2.0, 100, 3)
+        self.assertAlmostEqual(aic, 100 * np.log(0.02) + 6)
+        self.assertAlmostEqual(bic, 100 * np.log(0.02) + 3 * np.log(100))
+
+    def test_compare_models(self):
+        # One extra parameter has to buy a large enough drop of the residuals
+        summaries = {'simple': summary([0, 0], [0.10, 0.10], {'n': [3, 4]}),
+                     'complex': summary([0, 0], [0.05, 0.0999],
+                                        {'Pe': [1, 2], 'tau': [1, 1]})}
+        parameters = {'simple': ['n'], 'complex': ['Pe', 'tau']}
+        comparison = compare_models(summaries, parameters,
+                                    pd.Series({1: 200, 2: 200}))
+
+        self.assertEqual(len(comparison), 4)
+        self.assertAlmostEqual(comparison.loc[(1, 'simple'), 'rss'], 2.0)
+        self.assertTrue(np.isnan(comparison.loc[(1, 'simple'), 'Pe']))
+        best = best_models(comparison)
+        self.assertEqual(list(best.best_model), ['complex', 'simple'])
+        self.assertEqual(comparison.best.sum(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
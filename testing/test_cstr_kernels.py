@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+from scipy.special import expi
+from src.transonic.modules.cstr_kernels import (ASYMPTOTIC_THRESHOLD,
+                                                TABLE_MIN, _extended_H,
+                                                cstr_outlet, cstr_gradient,
+                                                scaled_expi_terms)
+from src.transonic.models.LFR_DZ_CSTR import LFR_DZ_CSTR
+from testing.synthetic import DT, TAU
+
+
+def unscaled_outlet(t, m, n, t0):
+    '''
+    The CSTR outlet as the models evaluated it before the kernels were scaled
+    '''
+
+    F = lambda x: np.exp(m*x)*(m*x + 1)/x**2 - m**2*expi(m*x)
+    return np.where(t < t0, 0, 0.5*n*(F(t0) - F(t))/np.exp(m*t))
+
+
+class TestCSTRKernels(unittest.TestCase):
+
+    def setUp(self):
+        self.t = np.arange(11740) * DT
+
+    def test_matches_unscaled_outlet(self):
+        for m, t0 in [(2.0, 0.01), (30.0, 0.05), (400.0, 0.08)]:
+            with np.errstate(all='ignore'):
+                expected = unscaled_outlet(self.t, m, 1e-5, t0)
+            np.testing.assert_allclose(cstr_outlet(self.t, m, 1e-5, t0),
+                                       expected, rtol=1e-9, atol=1e-20)
+
+    def test_continuous_across_series_threshold(self):
+        z = ASYMPTOTIC_THRESHOLD * np.array([1 - 1e-12, 1 + 1e-12])
+        J, H = scaled_expi_terms(z)
+        self.assertAlmostEqual(J[0] / J[1], 1, places=10)
+        self.assertAlmostEqual(H[0] / H[1], 1, places=10)
+
+    def test_table_matches_extended_precision(self):
+        # Piece boundaries and points inside pieces of every octave
+        z = np.geomspace(TABLE_MIN, ASYMPTOTIC_THRESHOLD, 5001)[:-1]
+        z = np.concatenate([z, 2.0**np.arange(-4, 10) * (1 + 1 / 16)])
+        J, H = scaled_expi_terms(z)
+        expected = _extended_H(z)
+        np.testing.assert_allclose(H, expected.astype(float), rtol=1e-13,
+                                   atol=1e-14)
+        np.testing.assert_allclose(J, ((expected - 1) / z).astype(float),
+                                   rtol=1e-13, atol=1e-14)
+
+    def test_finite_over_parameter_box(self):
+        model = LFR_DZ_CSTR(DT, TAU)
+        for a in (1e-3, 0.5, 0.999):
+            for b in (1e-4, 1e-2, 0.5, 0.999):
+                C = model.function(self.t, a, b)
+                self.assertTrue(np.all(np.isfinite(C)), (a, b))
+                self.assertTrue(np.all(np.isfinite(model.jacobian(self.t, a, b))))
+
+    def test_population_broadcasting(self):
+        m = np.array([[5.0], [5000.0]])
+        C = cstr_outlet(self.t, m, 1e-5, 0.02)
+        self.assertEqual(C.shape, (2, len(self.t)))
+        for i in range(2):
+            np.testing.assert_array_equal(C[i], cstr_outlet(self.t, m[i, 0],
+                                                            1e-5, 0.02))
+            np.testing.assert_array_equal(
+                cstr_gradient(self.t, m, 1e-5, 0.02)[0][i],
+                cstr_gradient(self.t, m[i, 0], 1e-5, 0.02)[0])
+
+    def test_unsorted_time(self):
+        # Only sorted time sequences are sliced at t0, the rest is masked
+        C = cstr_outlet(self.t, 30.0, 1e-5, 0.05)
+        np.testing.assert_array_equal(
+            cstr_outlet(self.t[::-1], 30.0, 1e-5, 0.05), C[::-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import os.path as path
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from src.transonic.modules.curve_store import load_curve
+from src.transonic.modules.utilities import load_DOE
+from src.transonic.scripts import E_curves
+from testing.synthetic import synthetic_study, write_tracer_file
+
+
+class TestCurveManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = synthetic_study(self.tmp.name, 3, 'TANKS_IN_SERIES',
+                                      n_points=500)
+        self.generate()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def generate(self, force=False) -> list:
+        '''
+        Generates the curves of the study and returns the rebuilt cases.
+        '''
+
+        with mock.patch.object(E_curves, 'write_curve',
+                               wraps=E_curves.write_curve) as write:
+            E_curves.generate_curves(self.config['wd'], self.config['input'],
+                                     self.config['doe'], force=force)
+        return sorted({call.args[2] for call in write.call_args_list})
+
+    def test_unchanged_cases_are_skipped(self):
+        self.assertEqual(self.generate(), [])
+        self.assertEqual(self.generate(force=True), [1, 2, 3])
+
+    def test_changed_cases_are_rebuilt(self):
+        # A new tracer file for case 2
+        C = load_curve(self.config['wd'], 'C', 2)
+        write_tracer_file(self.config['input'], 2, C.time,
+                          2 * np.asarray(C.mass_fraction))
+        self.assertEqual(self.generate(), [2])
+        np.testing.assert_allclose(load_curve(self.config['wd'], 'C', 2)
+                                   .mass_fraction, 2 * C.mass_fraction)
+
+        # A changed DOE row for case 3
+        doe = load_DOE(self.config['doe'])
+        doe.loc[3, 'FLOW_RATE'] += 0.25
+        doe.to_csv(self.config['doe'])
+        self.assertEqual(self.generate(), [3])
+        self.assertTrue(path.exists(path.join(self.config['wd'], 'results',
+                                              'curve_store', 'manifest.json')))
+
+    def test_csv_export_with_relative_wd(self):
+        # Example configs give wd relative to the repository root
+        cwd = os.getcwd()
+        os.chdir(path.dirname(self.tmp.name))
+        self.addCleanup(os.chdir, cwd)
+        wd = path.basename(self.config['wd'])
+        E_curves.generate_curves(wd, self.config['input'], self.config['doe'],
+                                 export_csv=True)
+        for folder in ('C_curves', 'E_curves', 'Etheta_curves'):
+            self.assertEqual(sorted(os.listdir(path.join(wd, 'results',
+                                                         folder))),
+                             ['sim1.csv', 'sim2.csv', 'sim3.csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+import numpy as np
+from src.transonic.models.LFR_DZ_CSTR import LFR_DZ_CSTR
+from src.transonic.models.TANKS_IN_SERIES import TANKS_IN_SERIES
+from src.transonic.modules.fit_cache import FitCache, package_imports
+from testing.synthetic import DT, TAU
+
+BOUNDS = [[0.01, 0.99], [0.01, 0.99]]
+SETTINGS = {'vectorized': False, 'method': 'de', 'loss': 'mse'}
+
+
+class TestFitCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = FitCache(self.tmp.name, max_entries=2, max_age_days=1)
+        self.t = np.arange(0, 11740, 100) * DT
+        self.y = LFR_DZ_CSTR(DT, TAU).function(self.t, 0.85, 0.12)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def key(self, bounds=BOUNDS, settings=SETTINGS, y=None, guess=None):
+        model = LFR_DZ_CSTR(DT, TAU, bounds=bounds, initial_guess=guess)
+        return self.cache.key(model, LFR_DZ_CSTR, settings, self.t,
+                              self.y if y is None else y)
+
+    def test_hit(self):
+        key = self.key()
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, np.array([0.85, 0.12]), [1, 2, 3, 4],
+                       {'nfev': 10, 'status': 'converged'})
+
+        entry = self.cache.get(self.key())
+        self.assertEqual(entry['params'], [0.85, 0.12])
+        self.assertEqual(entry['metrics'], [1, 2, 3, 4])
+        self.assertEqual(entry['diagnostics']['nfev'], 10)
+
+    def test_key_invalidation(self):
+        key = self.key()
+        changed = [self.key(bounds=[[0.01, 0.9], [0.01, 0.99]]),
+                   self.key(settings={**SETTINGS, 'method': 'de+trf'}),
+                   self.key(y=self.y * 1.001),
+                   self.key(guess=[0.8, 0.1])]
+        self.assertEqual(len({key, *changed}), 5)
+
+    def test_source_hash_covers_imported_modules(self):
+        modules = package_imports([sys.modules[LFR_DZ_CSTR.__module__]])
+        self.assertIn('src.transonic.modules.cstr_kernels', modules)
+        self.assertIn('src.transonic.modules.objective', modules)
+        self.assertNotEqual(FitCache.source_hash(LFR_DZ_CSTR),
+                            FitCache.source_hash(TANKS_IN_SERIES))
+
+    def test_evict(self):
+        now = time.time()
+        ages = {'old': 2 * 86400, 'a': 300, 'b': 200, 'c': 100}
+        for name, age in ages.items():
+            self.cache.put(name, [1], [1], {})
+            os.utime(self.cache.entry_path(name), (now - age, now - age))
+
+        # A hit makes the least recently written entry the most recently used
+        self.cache.get('a')
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertEqual(sorted(os.listdir(self.cache.cache_dir)),
+                         ['a.json', 'c.json'])
+        self.assertEqual(FitCache(os.path.join(self.tmp.name, 'x')).evict(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from src.transonic.modules.fit_grid import build_fit_grid, FIT_GRID_METHODS
+from src.transonic.modules.objective import Objective
+from src.transonic.models.TANKS_IN_SERIES import TANKS_IN_SERIES
+from testing.synthetic import DT, TAU
+
+
+class TestFitGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.model = TANKS_IN_SERIES(DT, TAU)
+        self.t = np.arange(11740) * DT
+        self.C = self.model.function(self.t, 3.5)
+
+    def test_grid_covers_curve(self):
+        for method in FIT_GRID_METHODS:
+            indices, weights = build_fit_grid(self.t, self.C, method, 400)
+            self.assertEqual(weights.sum(), len(self.t))
+            self.assertTrue(np.all(np.diff(indices) > 0))
+            for required in (0, len(self.t) - 1, np.argmax(self.C)):
+                self.assertIn(required, indices)
+            if method != 'full':
+                self.assertLessEqual(len(indices), 403)
+
+    def test_weighted_loss_approximates_full_loss(self):
+        for method in ('peak', 'arclength', 'quantile'):
+            indices, weights = build_fit_grid(self.t, self.C, method, 400)
+            for n in (2.5, 3.0, 5.0):
+                full = Objective(self.model, self.t, self.C)([n])
+                grid = Objective(self.model, self.t[indices], self.C[indices],
+                                 weights=weights)([n])
+                self.assertAlmostEqual(grid / full, 1, delta=0.02)
+
+    def test_invalid_method(self):
+        with self.assertRaises(ValueError):
+            build_fit_grid(self.t, self.C, 'random')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+from src.transonic.modules.model_class import PlateauStop
+from src.transonic.models.LFR_DZ_CSTR import LFR_DZ_CSTR
+from testing.synthetic import DT, TAU
+
+
+class Generation(dict):
+    __getattr__ = dict.__getitem__
+
+
+class TestFitStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.t = np.arange(0, 11740, 100) * DT
+        self.y = LFR_DZ_CSTR(DT, TAU).function(self.t, 0.85, 0.12)
+
+    def fit(self, **settings):
+        model = LFR_DZ_CSTR(DT, TAU, bounds=[[0.01, 0.99]] * 2)
+        model.fit(self.t, self.y, **settings)
+        return model
+
+    def test_plateau_stop(self):
+        stop = PlateauStop(patience=2, plateau_tol=1e-3)
+        for fun in (1.0, 0.5, 0.4999):
+            self.assertFalse(stop(Generation(fun=fun, nfev=10)))
+        self.assertTrue(stop(Generation(fun=0.49995, nfev=10)))
+        self.assertEqual(stop.reason, 'plateau')
+
+        stop = PlateauStop(max_nfev=100)
+        self.assertFalse(stop(Generation(fun=1.0, nfev=60)))
+        self.assertTrue(stop(Generation(fun=0.5, nfev=120)))
+        self.assertEqual(stop.reason, 'budget')
+
+    def test_default_fit(self):
+        model = self.fit()
+        np.testing.assert_allclose(model.params, [0.85, 0.12], rtol=1e-3)
+        self.assertEqual(model.diagnostics['status'], 'converged')
+        self.assertEqual(model.diagnostics['restarts'], 0)
+
+    def test_strategies(self):
+        single = self.fit()
+        best_of = self.fit(starts=3)
+        self.assertLessEqual(best_of.diagnostics['fun'],
+                             single.diagnostics['fun'])
+        self.assertGreater(best_of.diagnostics['nfev'],
+                           2 * single.diagnostics['nfev'])
+
+        budget = self.fit(max_nfev=200, restarts=2)
+        self.assertEqual(budget.diagnostics['status'], 'budget')
+        self.assertEqual(budget.diagnostics['restarts'], 0)
+        self.assertLess(budget.diagnostics['nfev'], 300)
+
+        short = self.fit(maxiter=3)
+        self.assertEqual(short.diagnostics['status'], 'maxiter')
+        restarted = self.fit(maxiter=3, restarts=2)
+        self.assertGreater(restarted.diagnostics['restarts'], 0)
+        self.assertGreater(restarted.diagnostics['nfev'],
+                           short.diagnostics['nfev'])
+        self.assertLessEqual(restarted.diagnostics['fun'],
+                             short.diagnostics['fun'])
+
+        # A vectorized objective counts parameter vectors, not calls
+        vectorized = self.fit(vectorized=True, maxiter=3)
+        self.assertGreaterEqual(vectorized.diagnostics['nfev'],
+                                short.diagnostics['nfev'])
+        budget = self.fit(vectorized=True, max_nfev=200)
+        self.assertEqual(budget.diagnostics['status'], 'budget')
+        self.assertLess(budget.diagnostics['nfev'], 300)
+
+        # The trf refinement keeps the strategy of its differential evolution
+        refined = self.fit(method='de+trf', starts=2, maxiter=3, restarts=1)
+        self.assertEqual(refined.diagnostics['starts'], 2)
+        self.assertEqual(refined.diagnostics['restarts'],
+                         self.fit(starts=2, maxiter=3,
+                                  restarts=1).diagnostics['restarts'])
+
+
+if __name__ == '__main__':
+    unittest.main()
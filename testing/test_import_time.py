@@ -0,0 +1,47 @@
+import os
+import os.path as path
+import re
+import subprocess
+import sys
+import unittest
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+# Cumulative import time of the CLI in ms, about twice what it measures once
+# the heavy dependencies are deferred (it was ~1900 ms before)
+IMPORT_BUDGET_MS = 1000
+# Only imported by the GUI, the plot stage or not at all on the CLI path
+DEFERRED_MODULES = ['PyQt5', 'matplotlib', 'sklearn', 'scipy.stats']
+
+
+def import_times(module: str) -> dict:
+    '''
+    Imports a module in a fresh interpreter and returns the cumulative
+    import time in microseconds of every module it imported.
+    '''
+
+    env = {**os.environ, 'PYTHONPATH': ROOT}
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             f'import {module}'], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in output.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| +(\S+)', line)
+        if match:
+            times[match[2]] = int(match[1])
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_cli_import_budget(self):
+        runs = [import_times('src.transonic.main') for _ in range(3)]
+        for module in DEFERRED_MODULES:
+            self.assertNotIn(module, runs[0])
+
+        best = min(times['src.transonic.main'] for times in runs) / 1000
+        self.assertLess(best, IMPORT_BUDGET_MS,
+                        f"Importing the CLI took {best:.0f} ms")
+
+
+if __name__ == '__main__':
+    unittest.main()
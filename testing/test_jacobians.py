@@ -0,0 +1,57 @@
+import unittest
+import warnings
+import numpy as np
+from src.transonic.models.LFR_DZ_CSTR import LFR_DZ_CSTR
+from src.transonic.models.LFR_CSTR_DZ_BYPASS import LFR_CSTR_DZ_BYPASS
+from src.transonic.models.LFR_CSTR_PFR_PARALLEL import LFR_CSTR_PFR_PARALLEL
+from src.transonic.models.LFR_CSTR_WITH_BYPASS import LFR_CSTR_WITH_BYPASS
+from src.transonic.models.TAYLOR_DISPERSION import TAYLOR_DISPERSION
+from src.transonic.models.DOUBLE_DISPERSION import DOUBLE_DISPERSION
+from src.transonic.models.TANKS_IN_SERIES import TANKS_IN_SERIES
+from testing.synthetic import DT, TAU
+
+
+class TestJacobians(unittest.TestCase):
+
+    def setUp(self):
+        self.t = np.arange(11740) * DT
+        self.cases = [
+            (LFR_DZ_CSTR(DT, TAU), (0.85, 0.12)),
+            (LFR_CSTR_DZ_BYPASS(DT, TAU), (0.3, 0.4, 0.6)),
+            (LFR_CSTR_PFR_PARALLEL(DT, TAU), (0.3, 0.4, 0.6)),
+            (LFR_CSTR_WITH_BYPASS(DT, TAU), (0.6, 0.3)),
+            (TAYLOR_DISPERSION(DT, TAU, C0=1), (30, 0.2)),
+            (DOUBLE_DISPERSION(DT, TAU), (30, 5, 0.1, 0.4)),
+            (TANKS_IN_SERIES(DT, TAU), (3.5,)),
+        ]
+
+    def finite_difference(self, model, params):
+        params = np.asarray(params, dtype=float)
+        columns = []
+        for i in range(len(params)):
+            step = np.zeros_like(params)
+            step[i] = 1e-6 * abs(params[i])
+            columns.append((model.function(self.t, *(params + step)) - 
+                            model.function(self.t, *(params - step))) 
+                           / (2 * step[i]))
+        return np.stack(columns, axis=-1)
+
+    def test_against_finite_differences(self):
+        for model, params in self.cases:
+            with self.subTest(model=type(model).__name__):
+                with warnings.catch_warnings(), np.errstate(all='ignore'):
+                    warnings.simplefilter('ignore')
+                    J = model.jacobian(self.t, *params)
+                    J_fd = self.finite_difference(model, params)
+
+                self.assertEqual(J.shape, (len(self.t), len(params)))
+                self.assertTrue(np.all(np.isfinite(J)))
+                for i in range(len(params)):
+                    np.testing.assert_allclose(
+                        J[:, i], J_fd[:, i], rtol=1e-4, 
+                        atol=1e-6 * np.abs(J_fd[:, i]).max()
+                    )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import inspect
+import unittest
+from importlib.metadata import EntryPoint
+from unittest import mock
+from src.transonic.modules import model_registry
+from src.transonic.modules.model_class import Model
+from src.transonic.modules.model_registry import (
+    MODELS,
+    ModelSpec,
+    get_spec,
+    model_names,
+    register_model
+)
+from src.transonic.modules.utilities import check_model
+
+
+@register_model(['k'], [[0.1, 10]], name='TEST_DECAY', gradients=False)
+class Decay(Model):
+    pass
+
+
+# Target of the fake entry point below
+PLUGIN_SPEC = ModelSpec('TEST_PLUGIN', Decay, ['k'], [[1, 2]])
+
+
+class TestModelRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        MODELS.pop('TEST_PLUGIN', None)
+
+    def test_builtin_models(self):
+        for name in ['TANKS_IN_SERIES', 'TAYLOR_DISPERSION', 'LFR_DZ_CSTR',
+                     'LFR_CSTR_DZ_BYPASS', 'LFR_CSTR_PFR_PARALLEL',
+                     'DOUBLE_DISPERSION', 'LFR_CSTR_WITH_BYPASS']:
+            spec = get_spec(name)
+            model_class = spec.load()
+            self.assertEqual(model_class.__name__, name)
+            n_args = len(inspect.signature(model_class.function).parameters)
+            self.assertEqual(n_args - 2, len(spec.parameters))
+
+        with self.assertRaises(ValueError):
+            get_spec('NOT_A_MODEL')
+
+    def test_check_model(self):
+        config = check_model({'model': 'TAYLOR_DISPERSION'})
+        self.assertEqual(config['parameters'], ['Pe', 'tau'])
+        config['parameter_bounds'][0][0] = 1
+        self.assertEqual(get_spec('TAYLOR_DISPERSION').bounds[0][0], 0.1)
+
+        for config in [{'model': 'TANKS_IN_SERIES', 'parameters': ['n', 'm']},
+                       {'model': 'TANKS_IN_SERIES', 
+                        'parameter_bounds': [[1], [50]]},
+                       {'model': 'TEST_DECAY', 'fit_method': 'trf'}]:
+            with self.assertRaises(ValueError):
+                check_model(config)
+
+    def test_entry_point(self):
+        entry_point = EntryPoint('TEST_PLUGIN', 
+                                 'testing.test_model_registry:PLUGIN_SPEC',
+                                 model_registry.ENTRY_POINT_GROUP)
+        with mock.patch.object(model_registry, 'entry_points',
+                               return_value=[entry_point]):
+            spec = get_spec('TEST_PLUGIN')
+        self.assertEqual(spec.bounds, [[1, 2]])
+        self.assertEqual(spec.load().__name__, 'Decay')
+        self.assertIn('TEST_PLUGIN', model_names())
+
+        # Entry points must register the model they point to
+        entry_point = EntryPoint('TEST_UNREGISTERED',
+                                 'src.transonic.modules.model_class:Model',
+                                 model_registry.ENTRY_POINT_GROUP)
+        with mock.patch.object(model_registry, 'entry_points',
+                               return_value=[entry_point]):
+            with self.assertRaises(ValueError):
+                get_spec('TEST_UNREGISTERED')
+        self.assertIn('TEST_DECAY', model_names())
+
+
+if __name__ == '__main__':
+    unittest.main()
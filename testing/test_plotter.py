@@ -0,0 +1,87 @@
+import os
+import os.path as path
+import tempfile
+import unittest
+import numpy as np
+from src.transonic.modules.plotter import (
+    plot_settings,
+    save_predictions,
+    load_predictions,
+    plot_jobs,
+    render_plots
+)
+from src.transonic.modules.curve_store import Curve, write_curve
+
+
+class TestPlotter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.t = np.linspace(0, 5, 200)
+        self.predictions = {
+            id: (f'case {id}', f'case{id}', self.t * np.exp(-1.1 * self.t))
+            for id in (242, 241, 243)
+        }
+        # The CFD curves are read back from the curve store
+        for id in self.predictions:
+            write_curve(self.tmp.name, 'C', id,
+                        Curve(time=self.t, mass_fraction=id * self.t))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_plot_settings(self):
+        self.assertEqual(plot_settings({}),
+                         {'plots': 'all', 'dpi': 300, 'fmt': 'png'})
+        self.assertEqual(plot_settings({'plots': ['pred_vs_gt']})['plots'],
+                         'all')
+        self.assertEqual(plot_settings({'plots': None})['plots'], 'none')
+        settings = plot_settings({'plots': 'summary', 'plot_dpi': 100,
+                                  'plot_format': '.pdf'})
+        self.assertEqual(settings, {'plots': 'summary', 'dpi': 100,
+                                    'fmt': 'pdf'})
+        with self.assertRaises(ValueError):
+            plot_settings({'plots': 'some'})
+
+    def test_predictions_round_trip(self):
+        save_predictions(self.tmp.name, self.predictions, self.tmp.name)
+        loaded = load_predictions(self.tmp.name)
+        self.assertEqual(list(loaded), [241, 242, 243])
+        for id, (title, name, t, C, C_pred) in loaded.items():
+            self.assertEqual((title, name), self.predictions[id][:2])
+            np.testing.assert_array_equal(t, self.t)
+            np.testing.assert_array_equal(C, id * self.t)
+            np.testing.assert_array_equal(C_pred, self.predictions[id][2])
+
+    def test_legacy_curves(self):
+        # A working directory with the .csv curves only
+        wd = path.join(self.tmp.name, 'legacy')
+        os.makedirs(path.join(wd, 'results', 'C_curves'))
+        for id in self.predictions:
+            Curve(mass_fraction=id * self.t, time=self.t).to_frame().to_csv(
+                path.join(wd, 'results', 'C_curves', f'sim{id}.csv'))
+        save_predictions(self.tmp.name, self.predictions, wd)
+        for id, (_, _, t, C, _) in load_predictions(self.tmp.name).items():
+            np.testing.assert_allclose(t, self.t, rtol=1e-15)
+            np.testing.assert_allclose(C, id * self.t, rtol=1e-15)
+
+        os.remove(path.join(wd, 'results', 'C_curves', 'sim241.csv'))
+        with self.assertRaisesRegex(FileNotFoundError, '--rebuild-curves'):
+            load_predictions(self.tmp.name)
+
+    def test_plot_stage(self):
+        self.assertEqual(plot_jobs(self.tmp.name), [])
+        save_predictions(self.tmp.name, self.predictions, self.tmp.name)
+        self.assertEqual(plot_jobs(self.tmp.name, 'none'), [])
+        self.assertEqual(len(plot_jobs(self.tmp.name, 'summary')), 1)
+
+        figures = render_plots(plot_jobs(self.tmp.name, 'all', dpi=30))
+        self.assertEqual(len(figures), 4)
+        for file_path, seconds in figures:
+            self.assertTrue(path.isfile(file_path))
+            self.assertGreater(seconds, 0)
+        self.assertTrue(path.isfile(path.join(self.tmp.name, 'case241.png')))
+
+
+if __name__ == '__main__':
+    unittest.main()
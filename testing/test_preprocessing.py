@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.transonic.modules.preprocessing import (
+    doe_characteristics,
+    normalize_curves
+)
+from src.transonic.modules.system_class import System
+from src.transonic.modules.tracer_reader import stack_curves
+from src.transonic.scripts.E_curves import E_curve_generator, E_theta_generator
+from testing.synthetic import synthetic_doe, synthetic_curve
+
+
+class TestPreprocessing(unittest.TestCase):
+
+    def setUp(self):
+        self.doe = synthetic_doe(4, n_points=300)
+        rng = np.random.default_rng(0)
+        self.curves = [synthetic_curve('TANKS_IN_SERIES', row, rng)[:2]
+                       for _, row in self.doe.iterrows()]
+        # Cases of different lengths are padded to a common one
+        self.curves[1] = tuple(x[:200] for x in self.curves[1])
+
+    def test_doe_characteristics(self):
+        derived = doe_characteristics(self.doe)
+        self.assertNotIn('tau', self.doe.columns)
+        for id in self.doe.index:
+            vectorized, per_row = System(id, '.'), System(id, '.')
+            vectorized.get_system_characteristics(derived)
+            per_row.get_system_characteristics(self.doe)
+            pd.testing.assert_series_equal(vectorized.X, per_row.X,
+                                           check_dtype=False)
+
+    def test_normalize_curves(self):
+        time, C = stack_curves(self.curves)
+        Et, theta, Etheta = normalize_curves(time, C, self.doe.TIMESTEP_SIZE,
+                                             self.doe.FLOW_RATE,
+                                             self.doe.ARTERIAL_VOLUME)
+        self.assertTrue(np.all(np.isnan(Et[1, 200:])))
+
+        for row, (t, c) in enumerate(self.curves):
+            case = self.doe.iloc[row]
+            E_curve = E_curve_generator(
+                pd.DataFrame({'mass_fraction': c, 'time': t}),
+                case.TIMESTEP_SIZE, case.FLOW_RATE)
+            np.testing.assert_array_equal(Et[row, :len(t)], E_curve.Et)
+            E_theta = E_theta_generator(E_curve, case.ARTERIAL_VOLUME,
+                                        case.FLOW_RATE)
+            np.testing.assert_array_equal(Etheta[row, :len(t)], E_theta.Et)
+            np.testing.assert_array_equal(theta[row, :len(t)], E_theta.theta)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os.path as path
+import tempfile
+import unittest
+import pandas as pd
+from src.transonic.modules import profiling
+from src.transonic.modules.profiling import (
+    StageProfile,
+    RunProfile,
+    activate,
+    stage,
+    count,
+    count_file,
+    case_profiler
+)
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_recording_needs_an_active_profile(self):
+        file_path = path.join(self.tmp.name, 'data.bin')
+        with open(file_path, 'wb') as f:
+            f.write(b'\0' * 100)
+
+        # Nothing is recorded, or raised, without an active profile
+        with stage('idle'):
+            count('nfev', 10)
+        self.assertIsNone(profiling._active)
+
+        run, case = RunProfile(), StageProfile()
+        with activate(run):
+            with activate(case):
+                with stage('fit'):
+                    count('nfev', 10)
+                    count('nfev', 5)
+                count_file('bytes_read', file_path)
+            count_file('bytes_written', file_path)
+        self.assertIsNone(profiling._active)
+
+        self.assertEqual(list(case.stages), ['fit'])
+        self.assertEqual(case.counters, {'nfev': 15, 'bytes_read': 100})
+        self.assertEqual(run.counters, {'bytes_written': 100})
+
+    def test_run_report(self):
+        run = RunProfile()
+        for id, seconds in ((242, 2.0), (241, 1.0)):
+            case = StageProfile()
+            case.add_time('fit', seconds)
+            case.add_time('predict', 0.5)
+            case.count('nfev', 100)
+            run.cases[id] = case
+        run.add_time('plot', 3.0)
+
+        report = run.save(self.tmp.name, model='TANKS_IN_SERIES')
+        self.assertEqual(report['case_stages'], {'fit': 3.0, 'predict': 1.0})
+        self.assertEqual(report['counters'], {'nfev': 200})
+        with open(path.join(self.tmp.name, 'run_profile.json')) as f:
+            self.assertEqual(json.load(f)['stages'], {'plot': 3.0})
+
+        timings = pd.read_csv(path.join(self.tmp.name, 'timings.csv'),
+                              index_col=0)
+        self.assertEqual(list(timings.index), [241, 242])
+        self.assertEqual(list(timings.total), [1.5, 2.5])
+
+    def test_case_profiler(self):
+        config = {'profile_case': 245}
+        for id in (241, 245):
+            with case_profiler(config, id, self.tmp.name):
+                sum(range(1000))
+        self.assertFalse(path.exists(path.join(self.tmp.name,
+                                               'profile_241.prof')))
+        self.assertTrue(path.exists(path.join(self.tmp.name,
+                                              'profile_245.prof')))
+
+        with self.assertRaises(ValueError):
+            with case_profiler({**config, 'profiler': 'perf'}, 245,
+                               self.tmp.name):
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
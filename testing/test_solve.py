@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.transonic.modules.curve_store import load_curve
+from src.transonic.modules.utilities import (
+    load_DOE,
+    get_model_class,
+    create_results_folder,
+    SolveRun,
+    solve_runs
+)
+from src.transonic.scripts.E_curves import generate_curves
+from testing.synthetic import synthetic_study, write_tracer_file
+
+
+class TestSolve(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = synthetic_study(self.tmp.name, 4, 'TANKS_IN_SERIES',
+                                      n_points=2000, noise=0.001)
+        generate_curves(self.config['wd'], self.config['input'],
+                        self.config['doe'])
+        self.doe = load_DOE(self.config['doe'])
+        self.results_dir = create_results_folder(self.config['wd'])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_solve(self, config, workers=1, use_cache=True):
+        run = SolveRun(self.doe, config, self.results_dir,
+                       get_model_class(config), use_cache)
+        return run, solve_runs([run], workers)[0]
+
+    def test_parallel_matches_serial(self):
+        _, serial = self.run_solve(self.config, use_cache=False)
+        _, parallel = self.run_solve(self.config, workers=2, use_cache=False)
+        pd.testing.assert_frame_equal(parallel, serial)
+        self.assertEqual(list(parallel.index), list(self.doe.index))
+        self.assertFalse(parallel.isna().any().any())
+
+    def test_cache_hits_are_not_warm_start_work(self):
+        config = {**self.config, 'warm_start': True}
+        first, summary = self.run_solve(config)
+        self.assertEqual(len(first.nfev_cold) + len(first.nfev_warm), 4)
+
+        second, cached = self.run_solve(config)
+        self.assertEqual((second.nfev_cold, second.nfev_warm), ([], []))
+        pd.testing.assert_frame_equal(cached, summary)
+
+    def test_resume_drops_regenerated_cases(self):
+        config = {**self.config, 'resume': True}
+        self.run_solve(config, use_cache=False)
+        resumed = SolveRun(self.doe, config, self.results_dir,
+                           get_model_class(config), False)
+        resumed.stream.close()
+        self.assertEqual(resumed.pending, [])
+
+        # New tracer data for case 2
+        C = load_curve(self.config['wd'], 'C', 2)
+        write_tracer_file(self.config['input'], 2, C.time,
+                          2 * np.asarray(C.mass_fraction))
+        generate_curves(self.config['wd'], self.config['input'],
+                        self.config['doe'])
+        resumed = SolveRun(self.doe, config, self.results_dir,
+                           get_model_class(config), False)
+        resumed.stream.close()
+        self.assertEqual(resumed.resumed, [1, 3, 4])
+        self.assertEqual(resumed.pending, [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
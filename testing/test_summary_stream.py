@@ -0,0 +1,48 @@
+import os.path as path
+import tempfile
+import unittest
+import numpy as np
+from src.transonic.modules.summary_stream import SummaryStream, read_stream
+
+
+class TestSummaryStream(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file_path = path.join(self.tmp.name, 'eval_outputs.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_resume_after_crash(self):
+        stream = SummaryStream(self.tmp.name, 'a', fsync_every=2)
+        for id in (241, 242):
+            stream.append(id, {'n': np.float64(id / 100), 'nfev': np.int64(7),
+                               'status': 'converged'})
+        stream.close()
+        # A row cut short by a crash and a row solved with other settings
+        with open(self.file_path, 'a') as f:
+            f.write('{"CASE_NUM": 244, "key": "b", "n": 1.0}\n')
+            f.write('{"CASE_NUM": 243, "key": "a", "n"')
+
+        rows = read_stream(self.file_path, 'a')
+        self.assertEqual(rows, {241: {'n': 2.41, 'nfev': 7,
+                                      'status': 'converged'},
+                                242: {'n': 2.42, 'nfev': 7,
+                                      'status': 'converged'}})
+
+        stream = SummaryStream(self.tmp.name, 'a', resume=True)
+        self.assertEqual(list(stream.rows), [241, 242])
+        stream.append(243, {'n': 2.43})
+        stream.close()
+        self.assertEqual(list(read_stream(self.file_path, 'a')),
+                         [241, 242, 243])
+        self.assertEqual(len(read_stream(self.file_path)), 4)
+
+        # Without resume the stream starts over
+        SummaryStream(self.tmp.name, 'a').close()
+        self.assertEqual(read_stream(self.file_path), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
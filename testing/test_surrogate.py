@@ -0,0 +1,79 @@
+import os.path as path
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.transonic.models.LFR_DZ_CSTR import LFR_DZ_CSTR
+from src.transonic.modules.surrogate import Surrogate, surrogate_guesses
+from testing.synthetic import synthetic_doe
+
+PARAMETERS = ['alpha', 'beta']
+BOUNDS = [[0.01, 0.99], [0.01, 0.99]]
+CONFIG = {'model': 'LFR_DZ_CSTR', 'parameters': PARAMETERS,
+          'parameter_bounds': BOUNDS}
+
+
+def smooth_params(doe: pd.DataFrame) -> pd.DataFrame:
+    # Parameters that vary smoothly with the flow rate and stenosis
+    return pd.DataFrame({
+        'alpha': 0.5 + 0.08 * doe.FLOW_RATE - 0.002 * doe.PERC_DS,
+        'beta': 0.05 + 0.001 * doe.PERC_DS + 0.0005 * doe.RAMP_ANGLE,
+    }, index=doe.index)
+
+
+class TestSurrogate(unittest.TestCase):
+
+    def setUp(self):
+        self.doe = synthetic_doe(40, n_points=500)
+        self.summary = smooth_params(self.doe)
+        self.new = synthetic_doe(5, n_points=500, first_case=100, seed=1)
+
+    def test_predicts_unseen_cases(self):
+        for method, rtol in (('gp', 0.02), ('gbr', 0.1)):
+            surrogate = Surrogate('LFR_DZ_CSTR', PARAMETERS, BOUNDS, method)
+            surrogate.fit(self.doe, self.summary)
+            self.assertEqual(surrogate.n_cases, 40)
+            np.testing.assert_allclose(surrogate.predict(self.new),
+                                       smooth_params(self.new), rtol=rtol)
+
+        params, std = surrogate.predict(self.new, return_std=True)
+        self.assertTrue(std.isna().all().all())
+        self.assertEqual(list(params.index), list(self.new.index))
+
+    def test_curves_and_persistence(self):
+        surrogate = Surrogate('LFR_DZ_CSTR', PARAMETERS, BOUNDS)
+        # Unsolved cases are left out
+        summary = self.summary.copy()
+        summary.iloc[0] = np.nan
+        surrogate.fit(self.doe, summary)
+        self.assertEqual(surrogate.n_cases, 39)
+
+        curves = surrogate.predict_curves(self.new, LFR_DZ_CSTR)
+        self.assertEqual(list(curves), list(self.new.index))
+        for id, (time, Et) in curves.items():
+            self.assertEqual(Et.shape, (500,))
+            # E(t) of the whole simulated flow time integrates close to one
+            self.assertAlmostEqual(np.trapezoid(Et, time), 1, delta=0.1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            file_path = path.join(tmp, 'surrogate.pkl')
+            surrogate.save(file_path)
+            guesses = surrogate_guesses({**CONFIG, 'surrogate': file_path},
+                                        self.new)
+            pd.testing.assert_frame_equal(guesses, surrogate.predict(self.new))
+            with self.assertRaises(ValueError):
+                surrogate_guesses({**CONFIG, 'model': 'TANKS_IN_SERIES',
+                                   'parameters': ['n'],
+                                   'surrogate': file_path}, self.new)
+        self.assertIsNone(surrogate_guesses(CONFIG, self.new))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Surrogate('LFR_DZ_CSTR', PARAMETERS, BOUNDS, 'knn')
+        with self.assertRaises(ValueError):
+            Surrogate('LFR_DZ_CSTR', PARAMETERS, BOUNDS).fit(
+                self.doe, self.summary.iloc[:1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import tempfile
+import unittest
+import numpy as np
+from src.transonic.modules.system_class import System
+from src.transonic.modules.utilities import load_DOE, get_model_class
+from src.transonic.scripts.E_curves import generate_curves
+from src.transonic.scripts.model_eval import fit_model
+from testing.synthetic import synthetic_study
+
+
+class TestSynthetic(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_study_round_trip(self):
+        config = synthetic_study(self.tmp.name, 3, 'TANKS_IN_SERIES',
+                                 n_points=2000, noise=0.001)
+        generate_curves(config['wd'], config['input'], config['doe'])
+        doe = load_DOE(config['doe'])
+        self.assertEqual(list(doe.index), [1, 2, 3])
+
+        model_class = get_model_class(config)
+        for id, params in config['true_params'].items():
+            S = System(id, config['wd'])
+            S.get_system_characteristics(doe)
+            self.assertEqual(len(S.C), 2000)
+            self.assertAlmostEqual(S.C.time[-1] / S.X.tau, 5, places=2)
+
+            model_instance = fit_model(model_class, None, S, config)
+            np.testing.assert_allclose(model_instance.params, params,
+                                       rtol=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os.path as path
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from src.transonic.modules.curve_store import CURVE_COLUMNS, load_curve
+from src.transonic.modules.profiling import StageProfile, activate
+from src.transonic.modules.system_class import System
+from src.transonic.modules.utilities import load_DOE
+from src.transonic.scripts.E_curves import generate_curves
+from testing.synthetic import synthetic_study
+
+
+class TestSystem(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.config = synthetic_study(cls.tmp.name, 2, 'TANKS_IN_SERIES',
+                                     n_points=500)
+        generate_curves(cls.config['wd'], cls.config['input'],
+                        cls.config['doe'])
+        cls.doe = load_DOE(cls.config['doe'])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_lazy_loading(self):
+        S = System(1, self.config['wd'])
+        self.assertFalse(hasattr(S, '__dict__'))
+
+        profile = StageProfile()
+        with activate(profile):
+            S.get_system_characteristics(self.doe)
+            self.assertEqual(profile.counters, {})
+            self.assertEqual(len(S.C.mass_fraction), 500)
+            self.assertAlmostEqual(S.C['time'][1], S.X.TIMESTEP_SIZE,
+                                   places=12)
+            C_bytes = profile.counters['bytes_read']
+            S.Et, S.Et
+            self.assertEqual(profile.counters['bytes_read'], 2 * C_bytes)
+
+    def test_curve_dtype(self):
+        S = System(2, self.config['wd'], dtype=np.float32)
+        self.assertEqual(S.C.mass_fraction.dtype, np.float32)
+        self.assertEqual(list(S.C.to_frame().columns),
+                         ['mass_fraction', 'time'])
+
+    def test_legacy_curves(self):
+        # A results folder with the .csv curves only
+        with tempfile.TemporaryDirectory() as tmp:
+            config = synthetic_study(tmp, 1, 'TANKS_IN_SERIES', n_points=500)
+            generate_curves(config['wd'], config['input'], config['doe'],
+                            export_csv=True)
+            stored = {curve_type: load_curve(config['wd'], curve_type, 1)
+                      for curve_type in CURVE_COLUMNS}
+            shutil.rmtree(path.join(config['wd'], 'results', 'curve_store'))
+
+            S = System(1, config['wd'])
+            for curve_type, curve in stored.items():
+                for column in curve.columns:
+                    np.testing.assert_allclose(S.curve(curve_type)[column],
+                                               curve[column], rtol=1e-12)
+
+            with self.assertRaisesRegex(FileNotFoundError,
+                                        '--rebuild-curves'):
+                System(2, config['wd']).C
+
+
+if __name__ == '__main__':
+    unittest.main()
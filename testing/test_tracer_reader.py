@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.transonic.modules.tracer_reader import (
+    read_tracer_out, 
+    load_tracer_directory, 
+    tracer_case_id
+)
+
+
+class TestTracerReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        file_path = os.path.join(self.dir, name)
+        with open(file_path, 'w') as f:
+            f.write(text)
+        return file_path
+
+    def test_columns(self):
+        file_path = self.write('sim1_tracer_conc.out', 
+                               '0 0 0\n1 4.5e-262 7.2e-05\n2  0.25\t0.000144\n')
+        time, mass_fraction = read_tracer_out(file_path)
+        np.testing.assert_array_equal(time, [0, 7.2e-05, 0.000144])
+        np.testing.assert_array_equal(mass_fraction, [0, 4.5e-262, 0.25])
+
+    def test_wrong_column_count(self):
+        file_path = self.write('sim1_tracer_conc.out', '0 0\n1 0.1\n')
+        with self.assertRaises(ValueError):
+            read_tracer_out(file_path)
+
+    def test_missing_steps(self):
+        file_path = self.write('sim1_tracer_conc.out', '0 0 0\n2 0.1 0.2\n')
+        with self.assertRaises(ValueError):
+            read_tracer_out(file_path)
+
+    def test_directory(self):
+        self.write('sim12_tracer_conc.out', '0 0 0\n1 0.1 0.5\n')
+        self.write('sim3_tracer_conc.out', '0 0 0\n1 0.2 0.5\n2 0.3 1.0\n')
+        case_ids, time, mass_fraction = load_tracer_directory(self.dir)
+        np.testing.assert_array_equal(case_ids, [3, 12])
+        self.assertEqual(time.shape, (2, 3))
+        self.assertTrue(np.isnan(mass_fraction[1, 2]))
+
+    def test_case_id(self):
+        self.assertEqual(tracer_case_id('raw/sim241_tracer_conc.out'), 241)
+        with self.assertRaises(ValueError):
+            tracer_case_id('notes.out')
+
+
+if __name__ == '__main__':
+    unittest.main()
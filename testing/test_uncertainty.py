@@ -0,0 +1,144 @@
+import unittest
+import numpy as np
+from src.transonic.models.LFR_DZ_CSTR import LFR_DZ_CSTR
+from src.transonic.models.TAYLOR_DISPERSION import TAYLOR_DISPERSION
+from src.transonic.modules.uncertainty import (
+    uncertainty_settings,
+    interval_columns,
+    laplace_intervals,
+    bootstrap_intervals,
+    batch_refits,
+    parameter_intervals
+)
+from testing.synthetic import DT, TAU
+
+TRUE_PARAMS = np.array([30, 0.2])
+
+
+class TestUncertainty(unittest.TestCase):
+
+    def setUp(self):
+        self.t = np.arange(4000) * DT
+        self.model = TAYLOR_DISPERSION(DT, TAU, C0=1)
+        self.model.bounds = [[0.1, 100], [0.001, 10]]
+        clean = self.model.function(self.t, *TRUE_PARAMS)
+        rng = np.random.default_rng(1)
+        self.noise = 0.01 * clean.max()
+        self.y = clean + self.noise * rng.standard_normal(len(self.t))
+        self.model.least_squares_fit(self.t, self.y, TRUE_PARAMS * 1.1)
+
+    def test_settings(self):
+        self.assertEqual(uncertainty_settings({}), {})
+        self.assertEqual(uncertainty_settings({'uncertainty': 'bootstrap'}),
+                         {'uncertainty': 'bootstrap', 'uncertainty_level': 0.95,
+                          'bootstrap_samples': 200})
+        with self.assertRaises(ValueError):
+            uncertainty_settings({'uncertainty': 'jackknife'})
+        self.assertEqual(interval_columns(['Pe', 'tau']),
+                         ['Pe_lo', 'Pe_hi', 'tau_lo', 'tau_hi'])
+        self.assertIsNone(parameter_intervals(self.model, self.t, self.y,
+                                              None, {}))
+
+    def test_intervals_cover_truth(self):
+        params = self.model.params.copy()
+        laplace = laplace_intervals(self.model, self.t, self.y)
+        bootstrap = bootstrap_intervals(self.model, self.t, self.y,
+                                        n_samples=100)
+        # The bootstrap must leave the fitted parameters as they were
+        np.testing.assert_array_equal(self.model.params, params)
+
+        for intervals in (laplace, bootstrap):
+            self.assertEqual(intervals.shape, (2, 2))
+            self.assertTrue(np.all(intervals[:, 0] <= params))
+            self.assertTrue(np.all(params <= intervals[:, 1]))
+            self.assertTrue(np.all(intervals[:, 0] <= TRUE_PARAMS))
+            self.assertTrue(np.all(TRUE_PARAMS <= intervals[:, 1]))
+
+        # Both approximate the same distribution on a well posed problem
+        widths = np.diff(bootstrap, axis=1) / np.diff(laplace, axis=1)
+        np.testing.assert_array_less(np.abs(np.log(widths)), np.log(1.5))
+
+    def test_weights_and_level(self):
+        # Every other sample weighted twice stands for the full data
+        half = slice(None, None, 2)
+        weights = np.full(len(self.t[half]), 2.0)
+        full = laplace_intervals(self.model, self.t, self.y)
+        grid = laplace_intervals(self.model, self.t[half], self.y[half],
+                                 weights)
+        np.testing.assert_allclose(np.diff(grid, axis=1),
+                                   np.diff(full, axis=1), rtol=0.2)
+
+        narrow = laplace_intervals(self.model, self.t, self.y, level=0.5)
+        self.assertTrue(np.all(np.diff(narrow, axis=1)
+                               < np.diff(full, axis=1)))
+
+    def test_laplace_past_bounds(self):
+        # A Gaussian interval reaching past a bound is not clipped to it
+        full = laplace_intervals(self.model, self.t, self.y)
+        self.model.bounds = [[full[0, 0] + 0.01, 100], [0.001, 10]]
+        intervals = laplace_intervals(self.model, self.t, self.y)
+        self.assertTrue(np.all(np.isnan(intervals[0])))
+        np.testing.assert_array_equal(intervals[1], full[1])
+
+    def test_bootstrap_matches_refits(self):
+        # The spread of least squares refits of fresh noisy data on a
+        # nonlinear model with a noise of 30% of the peak
+        t = np.arange(0, 11740, 10) * DT
+        model = LFR_DZ_CSTR(DT, TAU, bounds=[[0.01, 0.99], [0.01, 0.99]])
+        true_params = np.array([0.5, 0.3])
+        clean = model.function(t, *true_params)
+        rng = np.random.default_rng(2)
+        noisy = lambda: clean + 0.3 * clean.max() * rng.standard_normal(len(t))
+
+        refits = []
+        for _ in range(100):
+            model.least_squares_fit(t, noisy(), true_params)
+            refits.append(model.params)
+        spread = np.diff(np.quantile(refits, [0.025, 0.975], axis=0), axis=0)
+
+        y = noisy()
+        model.least_squares_fit(t, y, true_params)
+        bootstrap = bootstrap_intervals(model, t, y, n_samples=100)
+        self.assertTrue(np.all(bootstrap[:, 0] <= model.params))
+        self.assertTrue(np.all(model.params <= bootstrap[:, 1]))
+        widths = np.diff(bootstrap, axis=1).ravel() / spread.ravel()
+        np.testing.assert_array_less(np.abs(np.log(widths)), np.log(1.5))
+
+    def test_batch_refits_match_least_squares(self):
+        # A model with a penalty, fitted with and without weights
+        t = np.arange(0, 11740, 10) * DT
+        model = LFR_DZ_CSTR(DT, TAU, bounds=[[0.01, 0.99], [0.01, 0.99]])
+        clean = model.function(t, 0.5, 0.3)
+        rng = np.random.default_rng(3)
+        Y = clean + 0.05 * clean.max() * rng.standard_normal((8, len(t)))
+        x0 = np.array([0.52, 0.29])
+        for weights in (None, rng.uniform(0.5, 2, len(t))):
+            expected = []
+            for y in Y:
+                model.least_squares_fit(t, y, x0, weights=weights)
+                expected.append(model.params)
+            np.testing.assert_allclose(batch_refits(model, t, Y, x0, weights),
+                                       expected, rtol=1e-6)
+
+    def test_bootstrap_coverage(self):
+        # 90% intervals of synthetic data sets cover the true parameters of
+        # most of them
+        t = np.arange(0, 11740, 10) * DT
+        model = LFR_DZ_CSTR(DT, TAU, bounds=[[0.01, 0.99], [0.01, 0.99]])
+        true_params = np.array([0.5, 0.3])
+        clean = model.function(t, *true_params)
+        rng = np.random.default_rng(4)
+
+        covered = np.zeros(2)
+        for _ in range(20):
+            y = clean + 0.1 * clean.max() * rng.standard_normal(len(t))
+            model.least_squares_fit(t, y, true_params)
+            intervals = bootstrap_intervals(model, t, y, level=0.9,
+                                            n_samples=100)
+            covered += (intervals[:, 0] <= true_params) & \
+                (true_params <= intervals[:, 1])
+        np.testing.assert_array_less(14, covered)
+
+
+if __name__ == '__main__':
+    unittest.main()